@@ -25,7 +25,48 @@ class Settings(BaseSettings):
     
     # WebSocket
     WS_HEARTBEAT_INTERVAL: int = 30
-    
+
+    # Rubik solver process pool
+    SOLVER_WORKERS: int = 0  # 0 = số CPU cores
+    SOLVER_MAX_QUEUE: int = 64  # số job được phép chờ ngoài các worker đang chạy
+    SOLVER_TIMEOUT_SECONDS: float = 10.0
+    SOLVER_MIN_TIMEOUT_MS: int = 100  # timeout_ms nhỏ nhất client được gửi
+    SOLVER_RECYCLE_AFTER: int = 500  # tạo lại pool sau N jobs (0 = không bao giờ)
+    SOLVER_RETRY_AFTER_SECONDS: int = 2
+    SOLVER_TABLES_DIR: str = ""  # tables của two-phase fallback ("" = app/solver/data)
+    SOLVER_WARMUP: bool = True  # warm-up pruning tables khi server khởi động
+    SOLVER_BATCH_MAX_STATES: int = 1000  # số cube states tối đa mỗi /solve/batch
+    SOLVER_STREAM_SECONDS: float = 3.0  # deadline mặc định của /solve/stream (anytime search)
+    SOLVER_STREAM_MAX_ACTIVE: int = 0  # số /solve/stream search đồng thời (0 = một nửa solver workers, tối thiểu 1)
+
+    # Optimal solver (mode=optimal): pool riêng, priority thấp
+    OPTIMAL_SOLVER_WORKERS: int = 1
+    OPTIMAL_SOLVER_MAX_QUEUE: int = 4
+    OPTIMAL_SOLVER_TIMEOUT_SECONDS: float = 60.0
+    OPTIMAL_SOLVER_NICE: int = 10  # tăng niceness của worker (0 = không đổi)
+
+    # Solution cache (dùng chung cho /solve, /hint, /validate)
+    SOLUTION_CACHE_SIZE: int = 10000
+    SOLUTION_CACHE_TTL_SECONDS: float = 3600.0
+
+    # Random-state scramble pool (sinh trước bởi background worker)
+    SCRAMBLE_POOL_SIZE: int = 200
+    SCRAMBLE_POOL_FILE: str = "scramble_pool.txt"  # "" = chỉ giữ trong memory
+    SCRAMBLE_WORKERS: int = 1  # worker của scramble pool (tách khỏi solver pool)
+    SCRAMBLE_NICE: int = 10  # tăng niceness của worker (0 = không đổi)
+
+    # Phân loại màu khi scan cube (/api/rubik/scan/classify)
+    SCAN_BATCH_MAX_SCANS: int = 50  # số scan tối đa mỗi request
+    CALIBRATION_CACHE_SIZE: int = 1000  # số color profile giữ trong memory
+    CALIBRATION_CACHE_TTL_SECONDS: float = 600.0
+    CALIBRATION_LEARNING_RATE: float = 0.2  # trọng số tối thiểu của scan mới (EMA)
+
+    # Async solve jobs (/api/rubik/jobs)
+    SOLVE_JOB_WORKERS: int = 2  # số job chạy đồng thời (mỗi job có thể dùng nhiều solver workers)
+    SOLVE_JOB_MAX_QUEUE: int = 100  # số job chờ tối đa (tất cả users)
+    SOLVE_JOB_MAX_PER_USER: int = 3  # số job chưa xong tối đa mỗi user
+    SOLVE_JOB_RETENTION_SECONDS: int = 600  # giữ kết quả bao lâu sau khi job xong
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -3,12 +3,16 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.routers import auth, users, matches, chat, friends, admin, rubik
 from app.services.websocket_service import ConnectionManager
+from app.services.solver_executor import SOLVER_AVAILABLE, optimal_executor, scramble_executor, solver_executor
+from app.services.scramble_pool import scramble_pool
+from app.services.solve_jobs import solve_jobs
 from app.utils.dependencies import get_current_user
 from app.utils.security import decode_access_token
 from app.database import engine, Base, get_db
 from app.models.user import User
 from sqlalchemy.orm import Session
 import uvicorn
+import asyncio
 
 # Create database tables (with error handling)
 try:
@@ -36,6 +40,7 @@ if cors_origins == ["*"]:
         allow_credentials=False,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],  # keyset pagination của /api/rubik/solutions
     )
 else:
     app.add_middleware(
@@ -44,6 +49,7 @@ else:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],  # keyset pagination của /api/rubik/solutions
     )
 
 # WebSocket manager
@@ -80,6 +86,39 @@ app.include_router(rubik.router, prefix="/api/rubik", tags=["Rubik Solver"])
 
 # Set manager in chat router
 chat.set_manager(manager)
+# Kết quả solve jobs được push qua WebSocket
+solve_jobs.set_manager(manager)
+
+@app.on_event("startup")
+async def warm_up_solver_pool():
+    """Warm-up solver tables trong background, không chặn startup"""
+    if settings.SOLVER_WARMUP:
+        app.state.solver_warmup_task = asyncio.create_task(solver_executor.warm_up())
+    elif SOLVER_AVAILABLE:
+        # Không warm-up: worker sẽ load tables ở job đầu tiên
+        solver_executor.ready = True
+    else:
+        # Không có solver: /ready giữ 503 thay vì nhận traffic mà mọi /solve đều lỗi
+        solver_executor.warmup_error = "No solver is available"
+
+@app.on_event("startup")
+async def start_scramble_pool():
+    """Load scramble pool từ file và refill trong background"""
+    scramble_pool.start()
+
+@app.on_event("startup")
+async def start_solve_jobs():
+    """Chạy các dispatcher của async solve jobs"""
+    solve_jobs.start()
+
+@app.on_event("shutdown")
+async def shutdown_solver_pool():
+    """Dừng solver process pool khi tắt server"""
+    await scramble_pool.stop()
+    await solve_jobs.stop()
+    solver_executor.shutdown()
+    optimal_executor.shutdown()
+    scramble_executor.shutdown()
 
 @app.websocket("/ws/{user_id}")
 async def websocket_endpoint(
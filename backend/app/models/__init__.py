@@ -3,6 +3,8 @@ from app.models.match import Match
 from app.models.chat_message import ChatMessage
 from app.models.friendship import Friendship
 from app.models.match_invitation import MatchInvitation
+from app.models.solution import CubeState, Solution
+from app.models.color_profile import ColorProfile
 
-__all__ = ["User", "Match", "ChatMessage", "Friendship", "MatchInvitation"]
+__all__ = ["User", "Match", "ChatMessage", "Friendship", "MatchInvitation", "CubeState", "Solution", "ColorProfile"]
 
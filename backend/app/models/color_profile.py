@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class ColorProfile(Base):
+    """Color calibration của user (mỗi cube / điều kiện ánh sáng một profile)"""
+    __tablename__ = "color_profiles"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String(50), nullable=False, default="default")
+    centroids = Column(Text, nullable=False)  # JSON: 6 màu Lab theo thứ tự face URFDLB
+    samples = Column(Integer, nullable=False, default=0)  # số scan đã học
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    user = relationship("User")
+
+    # Unique constraint
+    __table_args__ = (
+        UniqueConstraint('user_id', 'name', name='unique_color_profile'),
+    )
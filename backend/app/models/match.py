@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Enum, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Enum, Boolean, DateTime, ForeignKey, Float
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -18,9 +18,15 @@ class Match(Base):
     player1_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     player2_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     scramble = Column(Text, nullable=False)
+    scramble_state = Column(String(54), nullable=True)  # Kociemba facelets sau khi áp dụng scramble
     status = Column(Enum(MatchStatus), default=MatchStatus.waiting, nullable=False)
     player1_time = Column(Integer, nullable=True)  # milliseconds
     player2_time = Column(Integer, nullable=True)
+    # Chỉ có khi player gửi kèm moves và server đã replay xác nhận solve
+    player1_move_count = Column(Integer, nullable=True)
+    player2_move_count = Column(Integer, nullable=True)
+    player1_tps = Column(Float, nullable=True)  # turns per second
+    player2_tps = Column(Float, nullable=True)
     winner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     is_draw = Column(Boolean, default=False)
     created_at = Column(DateTime, server_default=func.now())
@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, SmallInteger, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class CubeState(Base):
+    """
+    Cube state dùng chung giữa các solution (lưu một lần, tra theo content hash)
+
+    Lưu dạng canonical (xem app.utils.cube_symmetry): cùng một state scan
+    theo hướng cầm cube khác nhau dùng chung một row.
+    """
+    __tablename__ = "cube_states"
+
+    id = Column(Integer, primary_key=True, index=True)
+    state_hash = Column(String(64), unique=True, nullable=False, index=True)  # sha256 của canonical state
+    cube_state = Column(Text, nullable=False)  # canonical state
+    created_at = Column(DateTime, server_default=func.now())
+
+class Solution(Base):
+    __tablename__ = "solutions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    state_id = Column(Integer, ForeignKey("cube_states.id"), nullable=False)
+    cube_state = Column(Text, nullable=False)  # state gốc user gửi (hướng của user)
+    symmetry = Column(SmallInteger, nullable=False, default=0)  # canonical = apply_symmetry(cube_state, symmetry)
+    solution = Column(Text, nullable=False)  # moves đã rút gọn, cách nhau bởi khoảng trắng
+    canonical_solution = Column(Text, nullable=False)  # solution map sang hướng của canonical state
+    move_count = Column(Integer, nullable=False)
+    notes = Column(Text, nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    # Relationships
+    user = relationship("User")
+    state = relationship("CubeState", lazy="joined")
+
+    # Indexes - keyset pagination theo (user_id, created_at, id)
+    __table_args__ = (
+        Index('idx_solutions_user_created', 'user_id', 'created_at', 'id'),
+    )
@@ -9,7 +9,8 @@ from app.utils.permissions import Permissions
 from app.utils.dependencies import get_admin_user
 from app.services.admin_service import AdminService
 from app.schemas.user import UserResponse
-import random
+from app.utils.cube_moves import state_after
+from app.services.scramble_pool import scramble_pool
 from datetime import datetime
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -390,71 +391,43 @@ def get_user_permissions(user_id: int, db: Session = Depends(get_db)) -> Dict[st
         return {"error": str(e)}
 
 @router.patch("/update-scrambles/{match_id}")
-def update_scrambles(match_id: int, new_count: int = 3, db: Session = Depends(get_db)) -> Dict[str, Any]:
-    """Cập nhật số moves trong scramble của trận đấu"""
+def update_scrambles(match_id: int, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """Thay scramble của trận đấu bằng một random-state scramble mới"""
+    # Kiểm tra match trước: mỗi scramble trong pool tốn một lần solve để sinh lại
+    match = db.execute(text("SELECT id FROM matches WHERE id = :match_id"), {"match_id": match_id}).first()
+    if match is None:
+        raise HTTPException(status_code=404, detail="Match not found")
+
     try:
-        # Tạo scramble ngắn với số moves tùy chỉnh
-        def generate_scramble(moves_count: int = 3) -> str:
-            moves = ["R", "R'", "R2", "L", "L'", "L2", "U", "U'", "U2", "D", "D'", "D2", "F", "F'", "F2", "B", "B'", "B2"]
-            
-            scramble_moves = []
-            last_face = ""
-            
-            for _ in range(moves_count):
-                available_moves = [m for m in moves if m[0] != last_face]
-                move = random.choice(available_moves)
-                scramble_moves.append(move)
-                last_face = move[0]
-            
-            return " ".join(scramble_moves)
-        
-        # Tạo scramble mới
-        new_scramble = generate_scramble(new_count)
+        # Tạo scramble mới (lấy từ pool đã sinh sẵn)
+        new_scramble = scramble_pool.pop()
         
         # Update database
-        result = db.execute(text("UPDATE matches SET scramble = :scramble WHERE id = :match_id"), 
-                   {"scramble": new_scramble, "match_id": match_id})
+        db.execute(text("UPDATE matches SET scramble = :scramble, scramble_state = :scramble_state WHERE id = :match_id"), 
+                   {"scramble": new_scramble, "scramble_state": state_after(new_scramble), "match_id": match_id})
         db.commit()
-        
-        if result.rowcount > 0:
-            return {"message": f"Updated match {match_id} with new {new_count}-move scramble", "new_scramble": new_scramble}
-        else:
-            return {"error": "Match not found"}
+        return {"message": f"Updated match {match_id} with a new random-state scramble", "new_scramble": new_scramble}
             
     except Exception as e:
         return {"error": str(e)}
 
 @router.patch("/update-all-scrambles")
-def update_all_scrambles(new_count: int = 3, db: Session = Depends(get_db)) -> Dict[str, Any]:
-    """Cập nhật tất cả scramble về số moves ngắn hơn"""
+def update_all_scrambles(db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """Thay scramble của tất cả trận đấu đang active bằng random-state scrambles mới"""
     try:
-        def generate_scramble(moves_count: int = 3) -> str:
-            moves = ["R", "R'", "R2", "L", "L'", "L2", "U", "U'", "U2", "D", "D'", "D2", "F", "F'", "F2", "B", "B'", "B2"]
-            
-            scramble_moves = []
-            last_face = ""
-            
-            for _ in range(moves_count):
-                available_moves = [m for m in moves if m[0] != last_face]
-                move = random.choice(available_moves)
-                scramble_moves.append(move)
-                last_face = move[0]
-            
-            return " ".join(scramble_moves)
-        
         result = db.execute(text("SELECT id FROM matches WHERE scramble IS NOT NULL AND status = 'active'"))
         matches = result.fetchall()
         
         updated = 0
         for match in matches:
             match_id = match[0]
-            new_scramble = generate_scramble(new_count)
-            db.execute(text("UPDATE matches SET scramble = :scramble WHERE id = :match_id"), 
-                       {"scramble": new_scramble, "match_id": match_id})
+            new_scramble = scramble_pool.pop()
+            db.execute(text("UPDATE matches SET scramble = :scramble, scramble_state = :scramble_state WHERE id = :match_id"), 
+                       {"scramble": new_scramble, "scramble_state": state_after(new_scramble), "match_id": match_id})
             updated += 1
         
         db.commit()
-        return {"message": f"Updated {updated} matches to {new_count}-move scrambles"}
+        return {"message": f"Updated {updated} matches to random-state scrambles"}
         
     except Exception as e:
         return {"error": str(e)}
@@ -67,7 +67,7 @@ async def submit_result(
 ):
     """Submit solve time for a match"""
     service = MatchService(db)
-    match = service.submit_result(match_id, current_user["id"], result.solve_time)
+    match = service.submit_result(match_id, current_user["id"], result.solve_time, result.moves)
     return match
 
 @router.get("/", response_model=list[MatchResponse])
@@ -1,30 +1,50 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status, Depends
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional, Tuple
 from datetime import datetime
+import asyncio
+import json
+import logging
+import numpy as np
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.utils.dependencies import get_current_user
+from app.config import settings
+from app.utils.dependencies import get_admin_user, get_current_user, get_optional_user
+from app.services.solver_executor import (
+    SOLVER_AVAILABLE, SOLVER_NAME, TABLES_DIR, SolverBusyError, SolverExecutor, SolverTimeoutError,
+    optimal_available, optimal_executor, scramble_executor, solver_executor
+)
+from app.solver.endgame import load_endgame
+from app.services.solution_cache import solution_cache
+from app.services.solution_service import SolutionService
+from app.services.calibration_service import CalibrationService
+from app.services.solve_jobs import solve_jobs
+from app.services.single_flight import solve_flights
+from app.services.solver_metrics import current_endpoint, solver_metrics
+from app.models.solution import Solution
+from app.services.scramble_pool import scramble_pool
+from app.utils.cube_validator import check_cube_state
+from app.utils.cube_symmetry import canonicalize, moves_from_canonical
+from app.utils.cube_moves import moves_from_token, moves_to_token, parse_moves, solves, state_after
+from app.utils.move_simplifier import move_metrics, simplify_moves
+from app.utils.cube_codec import KEY_LENGTH, key_to_state, state_to_key
+from app.utils.color_classifier import CENTER_INDICES, align_centroids, classify_stickers, hsv_to_rgb, rgb_to_lab
 
-# Try to import kociemba, but make it optional
-try:
-    import kociemba
-    KOCIEMBA_AVAILABLE = True
-except ImportError:
-    KOCIEMBA_AVAILABLE = False
-    print("WARNING: kociemba module not available. Install it with: pip install kociemba")
-    print("Note: kociemba requires Microsoft Visual C++ Build Tools on Windows")
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# In-memory storage cho solutions (có thể thay bằng database sau)
-_solutions_storage: dict[int, dict] = {}  # {solution_id: solution_data}
-_solution_counter = 0
-
-
 class CubeStateRequest(BaseModel):
     """Request model cho cube state - Kociemba format (54 characters)"""
-    cube_state: str  # 54 characters: URFDLB (6 faces x 9 stickers)
+    cube_state: str  # 54 characters: URFDLB (6 faces x 9 stickers), hoặc cube key 12 ký tự
+    max_length: Optional[int] = Field(None, ge=1, le=30, description="Số moves tối đa của solution")
+    timeout_ms: Optional[int] = Field(
+        None, ge=settings.SOLVER_MIN_TIMEOUT_MS, description="Deadline (ms), từ SOLVER_MIN_TIMEOUT_MS tới SOLVER_TIMEOUT_SECONDS"
+    )
+    mode: Literal["default", "optimal"] = Field(
+        "default", description="optimal = solution ngắn nhất (IDA*, chậm, pool riêng)"
+    )
     
     class Config:
         json_schema_extra = {
@@ -34,26 +54,294 @@ class CubeStateRequest(BaseModel):
         }
 
 
+class MoveMetrics(BaseModel):
+    """Độ dài solution theo các metric (xem app.utils.move_simplifier)"""
+    htm: int
+    qtm: int
+    stm: int
+
+
 class SolveResponse(BaseModel):
     """Response model cho solution"""
     solution: str  # Kociemba solution format (e.g., "R U R' U'")
     moves: List[str]  # List of moves (e.g., ["R", "U", "R'", "U'"])
-    move_count: int  # Số lượng moves
+    move_count: int  # Số lượng moves (HTM, sau khi rút gọn)
+    metrics: Optional[MoveMetrics] = None
+    # True nếu hết deadline trước khi đạt max_length (solution tốt nhất đã tìm được)
+    deadline_exceeded: bool = False
+    optimal: bool = False  # True nếu solution chắc chắn ngắn nhất (mode=optimal)
 
 
-@router.post("/solve", response_model=SolveResponse)
-async def solve_cube(request: CubeStateRequest):
+def _solution_fields(solution: str) -> dict:
+    """solution (đã rút gọn) -> các field chung của SolveResponse"""
+    moves = solution.split() if solution else []
+    return {
+        "solution": solution,
+        "moves": moves,
+        "move_count": len(moves),
+        "metrics": MoveMetrics(**move_metrics(moves)),
+    }
+
+
+def _resolve_cube_state(cube_state: str) -> str:
     """
-    Giải Rubik's Cube sử dụng Kociemba algorithm
-    
-    Input: Cube state dạng Kociemba (54 characters)
-    - Format: URFDLB (Up, Right, Front, Down, Left, Back)
-    - Mỗi face: 9 characters (3x3 grid)
-    - Colors: U=Up, R=Right, F=Front, D=Down, L=Left, B=Back
-    
-    Output: Solution string và list of moves
+    Cube state dạng 54 ký tự, hoặc dạng compact (cube key 12 ký tự,
+    xem app.utils.cube_codec) -> 54 ký tự. Raise ValueError nếu key không hợp lệ.
     """
-    cube_state = request.cube_state.strip().upper()
+    cube_state = cube_state.strip()
+    if len(cube_state) == KEY_LENGTH:
+        return key_to_state(cube_state)
+    return cube_state.upper()
+
+
+def _resolve_or_400(cube_state: str) -> str:
+    try:
+        return _resolve_cube_state(cube_state)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+def _request_timeout(timeout_ms: Optional[int], executor: SolverExecutor = solver_executor) -> Optional[float]:
+    """
+    timeout_ms của client, trong khoảng [SOLVER_MIN_TIMEOUT_MS, timeout của solver pool]
+
+    Hết deadline chỉ làm request trả về solution tốt nhất đã có hoặc 504,
+    không ảnh hưởng worker (xem SolverExecutor.submit).
+    """
+    if timeout_ms is None:
+        return None
+    return min(max(timeout_ms, settings.SOLVER_MIN_TIMEOUT_MS) / 1000.0, executor.timeout)
+
+
+async def _run_until_disconnect(http_request: Request, coro):
+    """
+    Chạy coro, huỷ nếu client ngắt kết nối trước khi có kết quả
+
+    Huỷ task làm SolverExecutor bật cancel flag của job nên search trong
+    worker cũng dừng (trừ kociemba). Client đã đi nên response rỗng chỉ để
+    kết thúc request, không ai nhận.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=0.25)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                task.cancel()
+                logger.info(f"Client disconnected from {http_request.url.path}, solve cancelled")
+                return Response(status_code=status.HTTP_204_NO_CONTENT)
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def _endgame_solution(canonical: str) -> Optional[str]:
+    """
+    Solution ngắn nhất từ endgame table (state gần solved), None nếu chưa
+    build table hoặc state nằm ngoài table. Chỉ là vài binary search trên
+    file mmap nên chạy thẳng trong event loop, không qua solver pool.
+    """
+    table = load_endgame(TABLES_DIR)
+    if table is None:
+        return None
+    with solver_metrics.stage("endgame"):
+        moves = table.solve(canonical)
+    return " ".join(moves) if moves is not None else None
+
+
+# Solution tốt nhất đã tìm được của các bounded job đang chạy (key của solve_flights)
+_bounded_progress: Dict[tuple, str] = {}
+
+
+async def _wait_bounded(canonical: str, max_length: int, timeout: Optional[float]) -> Tuple[str, bool]:
+    """
+    Chờ bounded job chung cho (canonical, max_length), tối đa timeout giây
+
+    Job chạy dạng anytime (solve_stream) và ghi lại solution tốt nhất sau mỗi
+    lần tìm được, nên request hết deadline trước job vẫn nhận được solution
+    tốt nhất hiện có (complete=False). Raise asyncio.TimeoutError nếu chưa có.
+    """
+    key = ("bounded", canonical, max_length)
+
+    async def search() -> Tuple[str, bool]:
+        solution, complete = None, False
+        try:
+            async for solution, finished in solver_executor.solve_stream(canonical, max_length):
+                _bounded_progress[key] = solution
+                if finished is not None:
+                    complete = finished
+        finally:
+            _bounded_progress.pop(key, None)
+        return solution, complete
+
+    try:
+        return await asyncio.wait_for(solve_flights.do(key, search), timeout)
+    except asyncio.TimeoutError:
+        # Đọc ngay: job bị huỷ (nếu không còn ai chờ) chỉ xoá progress ở vòng lặp sau
+        solution = _bounded_progress.get(key)
+        if solution is None:
+            raise
+        return solution, False
+
+
+async def _run_solver(
+    cube_state: str,
+    max_length: Optional[int] = None,
+    timeout: Optional[float] = None
+) -> Tuple[str, bool]:
+    """
+    Giải cube trong solver process pool (không block event loop)
+
+    Cube state được canonicalize theo 48 symmetries trước khi tra cache/solve,
+    nên các state chỉ khác nhau do hướng cầm cube dùng chung một cache entry;
+    solution được map ngược về hướng gốc của caller.
+    State gần solved (có trong endgame table) được trả về solution ngắn nhất
+    ngay, không tra cache và không solve.
+    Kết quả (kể cả state không hợp lệ) được lưu trong solution_cache.
+    Request đồng thời cho cùng canonical state (và max_length) được gộp thành
+    một job (solve_flights) chạy với timeout đầy đủ của solver pool; mỗi
+    request tự áp deadline của mình khi chờ job đó.
+
+    Với max_length: trả về (solution, complete); hết deadline trước khi tìm được
+    solution <= max_length thì trả về solution tốt nhất đã có với complete=False.
+    Raise ValueError nếu cube state không hợp lệ (từ solver),
+    HTTPException 503 nếu pool quá tải, 504 nếu timeout mà chưa có solution nào
+    """
+    canonical, sym = canonicalize(cube_state)
+
+    def to_caller(solution: str) -> str:
+        # Rút gọn sau khi map: face đối diện có thể đổi thứ tự theo symmetry
+        moves = simplify_moves(moves_from_canonical(solution.split(), sym))
+        solver_metrics.record_solution(len(moves))
+        return " ".join(moves)
+
+    solution = _endgame_solution(canonical)
+    if solution is not None:
+        # Đã là ngắn nhất: dài hơn max_length thì cũng không có solution nào ngắn hơn
+        return to_caller(solution), max_length is None or len(solution.split()) <= max_length
+
+    best = None
+    cached = solution_cache.get(canonical)
+    if cached is not None:
+        solution, error = cached
+        if error is not None:
+            raise ValueError(error)
+        if max_length is None or len(solution.split()) <= max_length:
+            return to_caller(solution), True
+        best = solution
+
+    try:
+        # Request đồng thời cho cùng canonical state chờ chung một job, mỗi request với deadline riêng
+        if max_length is None:
+            solution = await asyncio.wait_for(
+                solve_flights.do(("solve", canonical), lambda: solver_executor.solve(canonical)),
+                timeout
+            )
+            complete = True
+        else:
+            solution, complete = await _wait_bounded(canonical, max_length, timeout)
+    except asyncio.TimeoutError:
+        # Deadline của request này (job chung vẫn chạy nếu còn request khác chờ)
+        if best is not None:
+            return to_caller(best), False
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Solver timed out"
+        )
+    except ValueError as e:
+        solution_cache.set_invalid(canonical, str(e))
+        raise
+    except SolverBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Solver is busy, please retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except SolverTimeoutError:
+        if best is not None:
+            return to_caller(best), False
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Solver timed out"
+        )
+
+    if best is not None and len(best.split()) <= len(solution.split()):
+        solution = best
+    else:
+        solution_cache.set_solution(canonical, solution)
+    return to_caller(solution), complete
+
+
+OPTIMAL_MAX_LENGTH = 20  # God's number (HTM)
+
+
+async def _run_optimal(cube_state: str, max_length: Optional[int] = None, timeout: Optional[float] = None) -> str:
+    """
+    Solution ngắn nhất trong optimal pool (priority thấp, tách khỏi solver pool)
+
+    Cache riêng (namespace "optimal") vì solution của mode thường
+    không chắc là ngắn nhất. Cube state phải đã được validate.
+    HTTPException 400 nếu không có solution <= max_length,
+    503 nếu optimal pool quá tải, 504 nếu timeout.
+    """
+    canonical, sym = canonicalize(cube_state)
+    max_length = max_length or OPTIMAL_MAX_LENGTH
+
+    endgame = _endgame_solution(canonical)
+    cached = solution_cache.get(canonical, namespace="optimal") if endgame is None else None
+    if endgame is not None:
+        if len(endgame.split()) > max_length:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"No solution found within {max_length} moves"
+            )
+        solution = endgame
+    elif cached is not None and cached[0] is not None and len(cached[0].split()) <= max_length:
+        solution = cached[0]
+    else:
+        try:
+            solution = await asyncio.wait_for(
+                solve_flights.do(
+                    ("optimal", canonical, max_length),
+                    lambda: optimal_executor.solve_optimal(canonical, max_length)
+                ),
+                timeout
+            )
+        except ValueError as e:
+            # State đã hợp lệ: chỉ có thể là không có solution <= max_length
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except SolverBusyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Optimal solver is busy, please retry later",
+                headers={"Retry-After": str(e.retry_after)}
+            )
+        except (SolverTimeoutError, asyncio.TimeoutError):
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Optimal search timed out"
+            )
+        solution_cache.set_solution(canonical, solution, namespace="optimal")
+    moves = simplify_moves(moves_from_canonical(solution.split(), sym))
+    solver_metrics.record_solution(len(moves), mode="optimal")
+    return " ".join(moves)
+
+
+def _check_solve_request(request: "CubeStateRequest | HintRequest") -> str:
+    """
+    Validate request (không cần solve), trả về cube state 54 ký tự; HTTPException 400/503
+
+    Dùng chung cho /solve, /solve/stream, /solve/batch và /hint (HintRequest
+    không có mode).
+    """
+    cube_state = _resolve_or_400(request.cube_state)
     
     # Validate input
     if len(cube_state) != 54:
@@ -71,26 +359,48 @@ async def solve_cube(request: CubeStateRequest):
             detail=f"Invalid characters in cube state: {invalid_chars}. Only U, R, F, D, L, B are allowed"
         )
     
-    if not KOCIEMBA_AVAILABLE:
+    # Validate cấu trúc (corners, edges, orientation, parity) - không cần solve
+    error = check_cube_state(cube_state)
+    if error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid cube state: {error}"
+        )
+    
+    if not SOLVER_AVAILABLE:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Kociemba solver is not available. Please install kociemba package."
+            detail="No solver is available. Please install kociemba or numpy package."
         )
     
+    if getattr(request, "mode", None) == "optimal" and not optimal_available():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Optimal solver is not available. Build pattern databases with: python -m app.solver.pdb"
+        )
+    return cube_state
+
+
+async def _solve(request: CubeStateRequest, cube_state: str) -> SolveResponse:
+    """Giải cube state (đã qua _check_solve_request) theo mode của request"""
+    if request.mode == "optimal":
+        solution = await _run_optimal(
+            cube_state, request.max_length, _request_timeout(request.timeout_ms, optimal_executor)
+        )
+        return SolveResponse(**_solution_fields(solution), optimal=True)
+    
     try:
-        # Gọi kociemba.solve() - thư viện Python chính thức
-        solution = kociemba.solve(cube_state)
+        # Gọi kociemba.solve() trong solver process pool
+        solution, complete = await _run_solver(
+            cube_state, request.max_length, _request_timeout(request.timeout_ms)
+        )
         
-        # Parse solution thành list of moves
+        # Parse solution thành list of moves (đã rút gọn) + metrics
         # Kociemba format: "R U R' U'" hoặc "R U R' U' R2" (space-separated)
-        moves = solution.split() if solution else []
-        
-        return SolveResponse(
-            solution=solution,
-            moves=moves,
-            move_count=len(moves)
-        )
+        return SolveResponse(**_solution_fields(solution), deadline_exceeded=not complete)
         
+    except HTTPException:
+        raise
     except ValueError as e:
         # Kociemba throws ValueError nếu cube state không hợp lệ
         raise HTTPException(
@@ -105,59 +415,598 @@ async def solve_cube(request: CubeStateRequest):
         )
 
 
+@router.post("/solve", response_model=SolveResponse)
+@solver_metrics.track("solve")
+async def solve_cube(request: CubeStateRequest, http_request: Request):
+    """
+    Giải Rubik's Cube sử dụng Kociemba algorithm
+    (thư viện kociemba, hoặc two-phase solver built-in nếu không cài được)
+    
+    Input: Cube state dạng Kociemba (54 characters), hoặc cube key 12 ký tự
+    - Format: URFDLB (Up, Right, Front, Down, Left, Back)
+    - Mỗi face: 9 characters (3x3 grid)
+    - Colors: U=Up, R=Right, F=Front, D=Down, L=Left, B=Back
+    
+    Tuỳ chọn:
+    - max_length: số moves tối đa mong muốn
+    - timeout_ms: deadline; hết deadline thì trả về solution tốt nhất đã tìm
+      được (deadline_exceeded=true), chưa có solution nào thì 504.
+      Hết deadline hoặc client ngắt kết nối thì search trong worker cũng
+      dừng (two-phase built-in; kociemba không dừng giữa chừng được nhưng
+      chỉ mất vài ms).
+    - mode=optimal: solution ngắn nhất (IDA* + pattern databases) trong pool
+      riêng có priority thấp; chỉ thực tế với state <= ~13 moves, state khó
+      hơn sẽ 504 khi hết timeout (tối đa OPTIMAL_SOLVER_TIMEOUT_SECONDS)
+    
+    Output: Solution string và list of moves
+    """
+    with solver_metrics.stage("validate"):
+        cube_state = _check_solve_request(request)
+    return await _run_until_disconnect(http_request, _solve(request, cube_state))
+
+
+# ========== STREAMING (ANYTIME) SOLVE ==========
+STREAM_TARGET_LENGTH = 20  # HTM; mặc định khi không có max_length (search dừng khi đạt)
+
+# Số /solve/stream đang search (giới hạn riêng, ngoài queue của solver pool)
+_active_streams = 0
+
+
+def _stream_limit() -> int:
+    return settings.SOLVER_STREAM_MAX_ACTIVE or max(solver_executor.max_workers // 2, 1)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _solution_event(moves: List[str], **extra) -> dict:
+    return {**SolveResponse(**_solution_fields(" ".join(moves))).model_dump(), **extra}
+
+
+@router.post("/solve/stream")
+@solver_metrics.track("solve_stream")
+async def solve_cube_stream(request: CubeStateRequest):
+    """
+    Giải cube và stream các solution ngày càng ngắn (Server-Sent Events)
+
+    - event "solution": solution đầu tiên ngay khi có (cache hoặc search),
+      sau đó mỗi solution ngắn hơn hẳn solution trước
+    - event "done": solution tốt nhất, complete=true nếu đạt max_length
+    - event "error": {"detail", "status_code"} nếu lỗi giữa chừng
+
+    Search dừng khi đạt max_length (mặc định STREAM_TARGET_LENGTH = 20 HTM)
+    hoặc hết timeout_ms (mặc định SOLVER_STREAM_SECONDS, tối đa
+    SOLVER_TIMEOUT_SECONDS), nên mỗi request chiếm tối đa một worker trong
+    khoảng đó. Số stream chạy đồng thời bị giới hạn (SOLVER_STREAM_MAX_ACTIVE,
+    mặc định một nửa số solver workers) để /solve luôn còn worker; vượt quá
+    thì 503.
+    Client ngắt kết nối thì ngừng stream. Không hỗ trợ mode=optimal.
+    """
+    if request.mode == "optimal":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="mode=optimal is not supported for streaming, use /solve or /jobs"
+        )
+    with solver_metrics.stage("validate"):
+        cube_state = _check_solve_request(request)
+    if solver_executor.pending >= solver_executor.capacity or _active_streams >= _stream_limit():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Solver is busy, please retry later",
+            headers={"Retry-After": str(solver_executor.retry_after)}
+        )
+
+    canonical, sym = canonicalize(cube_state)
+    max_length = request.max_length or STREAM_TARGET_LENGTH
+    timeout = _request_timeout(request.timeout_ms) or min(settings.SOLVER_STREAM_SECONDS, solver_executor.timeout)
+    cached = solution_cache.get(canonical)
+    initial = cached[0] if cached is not None and cached[0] is not None else None
+
+    def to_caller(solution: str) -> List[str]:
+        return simplify_moves(moves_from_canonical(solution.split(), sym))
+
+    async def events():
+        global _active_streams
+        # Streaming chạy trong task riêng của response (context riêng, không cần reset)
+        current_endpoint.set("solve_stream")
+        best: Optional[List[str]] = None
+        best_canonical: Optional[str] = None
+        complete = False
+        if initial is not None:
+            best, best_canonical = to_caller(initial), initial
+            yield _sse("solution", _solution_event(best))
+        try:
+            if initial is None or len(best) > max_length:
+                # Kiểm tra lại khi thật sự bắt đầu search (nhiều request có thể qua check ở trên cùng lúc)
+                if _active_streams >= _stream_limit():
+                    raise SolverBusyError(solver_executor.retry_after)
+                _active_streams += 1
+                try:
+                    async for solution, finished in solver_executor.solve_stream(
+                        canonical, max_length, timeout=timeout, initial=initial
+                    ):
+                        moves = to_caller(solution)
+                        if best is None or len(moves) < len(best):
+                            best, best_canonical = moves, solution
+                            yield _sse("solution", _solution_event(best))
+                        if finished is not None:
+                            complete = finished
+                finally:
+                    _active_streams -= 1
+            else:
+                complete = True
+        except ValueError as e:
+            solution_cache.set_invalid(canonical, str(e))
+            yield _sse("error", {"detail": f"Invalid cube state: {e}", "status_code": status.HTTP_400_BAD_REQUEST})
+            return
+        except SolverBusyError:
+            yield _sse("error", {"detail": "Solver is busy, please retry later",
+                                 "status_code": status.HTTP_503_SERVICE_UNAVAILABLE})
+            return
+        except SolverTimeoutError:
+            if best is None:
+                yield _sse("error", {"detail": "Solver timed out", "status_code": status.HTTP_504_GATEWAY_TIMEOUT})
+                return
+        except Exception as e:
+            yield _sse("error", {"detail": f"Error solving cube: {e}",
+                                 "status_code": status.HTTP_500_INTERNAL_SERVER_ERROR})
+            return
+
+        if best_canonical is not None and best_canonical is not initial:
+            solution_cache.set_solution(canonical, best_canonical)
+        solver_metrics.record_solution(len(best))
+        yield _sse("done", _solution_event(best, complete=complete))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# ========== BATCH SOLVE ENDPOINT ==========
+class BatchSolveRequest(BaseModel):
+    """Request model cho batch solve"""
+    cube_states: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.SOLVER_BATCH_MAX_STATES,
+        description="Danh sách cube states dạng Kociemba (54 characters mỗi state)"
+    )
+
+
+async def _solve_batch_item(index: int, cube_state: str, semaphore: asyncio.Semaphore,
+                            endpoint: str = "solve_batch") -> dict:
+    """Giải một state trong batch, trả về dict có index (lỗi cũng trả về dạng dict)"""
+    with solver_metrics.endpoint(endpoint):
+        return await _solve_batch_item_inner(index, cube_state, semaphore)
+
+
+async def _solve_batch_item_inner(index: int, cube_state: str, semaphore: asyncio.Semaphore) -> dict:
+    with solver_metrics.stage("validate"):
+        try:
+            cube_state = _resolve_cube_state(cube_state)
+        except ValueError as e:
+            return {"index": index, "error": str(e), "status_code": status.HTTP_400_BAD_REQUEST}
+        error = check_cube_state(cube_state)
+    if error:
+        return {
+            "index": index,
+            "error": f"Invalid cube state: {error}",
+            "status_code": status.HTTP_400_BAD_REQUEST
+        }
+
+    async with semaphore:
+        try:
+            solution, _ = await _run_solver(cube_state)
+        except HTTPException as e:
+            return {"index": index, "error": e.detail, "status_code": e.status_code}
+        except ValueError as e:
+            return {
+                "index": index,
+                "error": f"Invalid cube state: {str(e)}",
+                "status_code": status.HTTP_400_BAD_REQUEST
+            }
+        except Exception as e:
+            return {
+                "index": index,
+                "error": f"Error solving cube: {str(e)}",
+                "status_code": status.HTTP_500_INTERNAL_SERVER_ERROR
+            }
+
+    response = SolveResponse(**_solution_fields(solution))
+    return {"index": index, **response.model_dump()}
+
+
+@router.post("/solve/batch")
+async def solve_cube_batch(request: BatchSolveRequest):
+    """
+    Giải nhiều cube states song song trên tất cả CPU cores
+
+    Output: NDJSON stream (application/x-ndjson), mỗi dòng là một
+    SolveResponse kèm "index" của state trong request, trả về ngay khi
+    state đó giải xong (không theo thứ tự input).
+    Dòng lỗi có dạng {"index": i, "error": "...", "status_code": 400}
+    """
+    if not SOLVER_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="No solver is available. Please install kociemba or numpy package."
+        )
+
+    async def stream_results():
+        # Mỗi batch chỉ chiếm tối đa số worker, không lấp đầy queue của solver pool
+        semaphore = asyncio.Semaphore(solver_executor.max_workers)
+        tasks = [
+            asyncio.ensure_future(_solve_batch_item(i, cube_state, semaphore))
+            for i, cube_state in enumerate(request.cube_states)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                yield json.dumps(result) + "\n"
+        finally:
+            # Client ngắt kết nối - huỷ các state chưa giải
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+# ========== ASYNC SOLVE JOBS ==========
+class SolveJobRequest(CubeStateRequest):
+    """Request model cho solve job: cube_state (một state) hoặc cube_states (batch)"""
+    cube_state: Optional[str] = None
+    cube_states: Optional[List[str]] = Field(
+        None,
+        min_length=1,
+        max_length=settings.SOLVER_BATCH_MAX_STATES,
+        description="Batch (chỉ mode default), kết quả theo thứ tự input"
+    )
+    priority: Optional[Literal["high", "normal", "low"]] = Field(
+        None, description="Mặc định: normal, low cho optimal/batch; high chỉ dành cho admin"
+    )
+
+
+class SolveJobResponse(BaseModel):
+    """Trạng thái solve job (xem app.services.solve_jobs)"""
+    id: str
+    kind: str  # solve | optimal | batch
+    priority: str
+    status: str  # queued | running | done | failed
+    result: Optional[dict] = None  # SolveResponse, hoặc {"results": [...]} với batch
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+
+
+@router.post("/jobs", response_model=SolveJobResponse, status_code=status.HTTP_202_ACCEPTED)
+@solver_metrics.track("jobs_submit")
+async def create_solve_job(
+    request: SolveJobRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Tạo solve job chạy nền, trả về job id ngay
+
+    Dùng cho các solve chậm (mode=optimal, batch lớn): không giữ HTTP request
+    trong lúc solve. Input không hợp lệ bị từ chối ngay (400), giống /solve.
+    Khi job xong, kết quả được push qua WebSocket /ws/{user_id}:
+    {"type": "solve_job", "job": {...}}; hoặc polling GET /jobs/{id}.
+    Kết quả được giữ SOLVE_JOB_RETENTION_SECONDS sau khi job xong.
+    """
+    if (request.cube_state is None) == (request.cube_states is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide either cube_state or cube_states"
+        )
+    if request.priority == "high" and not current_user.get("is_admin", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="High priority jobs require admin access"
+        )
+
+    if request.cube_states is not None:
+        if request.mode == "optimal":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="mode=optimal is not supported for batch jobs"
+            )
+        if not SOLVER_AVAILABLE:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="No solver is available. Please install kociemba or numpy package."
+            )
+        cube_states = request.cube_states
+
+        async def run() -> dict:
+            semaphore = asyncio.Semaphore(solver_executor.max_workers)
+            results = await asyncio.gather(*(
+                _solve_batch_item(i, cube_state, semaphore, endpoint="jobs")
+                for i, cube_state in enumerate(cube_states)
+            ))
+            return {"results": results}
+
+        kind, default_priority = "batch", "low"
+    else:
+        with solver_metrics.stage("validate"):
+            cube_state = _check_solve_request(request)
+
+        async def run() -> dict:
+            with solver_metrics.endpoint("jobs"):
+                return (await _solve(request, cube_state)).model_dump()
+
+        kind = "optimal" if request.mode == "optimal" else "solve"
+        default_priority = "low" if kind == "optimal" else "normal"
+
+    job = solve_jobs.submit(current_user["id"], kind, run, request.priority or default_priority)
+    return SolveJobResponse(**job.to_dict())
+
+
+@router.get("/jobs/{job_id}", response_model=SolveJobResponse)
+async def get_solve_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Trạng thái / kết quả của solve job (404 nếu không có hoặc đã hết hạn)"""
+    return SolveJobResponse(**solve_jobs.get(job_id, current_user["id"]).to_dict())
+
+
+# ========== SCRAMBLE ENDPOINTS ==========
+class ScrambleRequest(BaseModel):
+    """Request model cho scramble (WCA notation, vd: "R U2 F' L")"""
+    scramble: str = Field(..., max_length=1000)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "scramble": "R U R' U' F2 D L'"
+            }
+        }
+
+
+class ScrambleStateResponse(BaseModel):
+    """Response model cho scramble -> cube state"""
+    scramble: str  # Scramble đã chuẩn hoá
+    cube_state: str  # Kociemba format (54 characters)
+    cube_key: str  # Dạng compact (12 ký tự), dùng được thay cho cube_state
+
+
+class ScrambleSolveRequest(ScrambleRequest):
+    """Request model cho solve từ scramble"""
+    max_length: Optional[int] = Field(None, ge=1, le=30, description="Số moves tối đa của solution")
+    timeout_ms: Optional[int] = Field(
+        None, ge=settings.SOLVER_MIN_TIMEOUT_MS, description="Deadline (ms), từ SOLVER_MIN_TIMEOUT_MS tới SOLVER_TIMEOUT_SECONDS"
+    )
+
+
+class ScrambleSolveResponse(SolveResponse):
+    """Response model cho solve từ scramble (kèm cube state của scramble)"""
+    cube_state: str
+
+
+def _scramble_to_state(scramble: str) -> Tuple[str, str]:
+    """Trả về (scramble đã chuẩn hoá, cube state), 400 nếu scramble có move không hợp lệ"""
+    try:
+        moves = parse_moves(scramble)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid scramble: {str(e)}"
+        )
+    return " ".join(moves), state_after(moves)
+
+
+@router.post("/scramble/state", response_model=ScrambleStateResponse)
+async def scramble_to_state(request: ScrambleRequest):
+    """
+    Chuyển scramble (WCA notation) thành cube state dạng Kociemba (54 characters)
+
+    Output: cube state nhận được khi áp dụng scramble lên cube đã giải
+    (U=Up, R=Right, F=Front, D=Down, L=Left, B=Back)
+    """
+    scramble, cube_state = _scramble_to_state(request.scramble)
+    return ScrambleStateResponse(scramble=scramble, cube_state=cube_state, cube_key=state_to_key(cube_state))
+
+
+@router.post("/solve/scramble", response_model=ScrambleSolveResponse)
+@solver_metrics.track("solve_scramble")
+async def solve_from_scramble(request: ScrambleSolveRequest, http_request: Request):
+    """
+    Giải cube từ scramble trong một request (scramble -> cube state -> solution)
+
+    Tuỳ chọn max_length, timeout_ms giống /solve.
+    Output: Solution string, list of moves và cube state của scramble
+    """
+    with solver_metrics.stage("validate"):
+        _, cube_state = _scramble_to_state(request.scramble)
+
+    if not SOLVER_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="No solver is available. Please install kociemba or numpy package."
+        )
+
+    async def solve() -> ScrambleSolveResponse:
+        # State tạo từ scramble luôn hợp lệ, không cần check_cube_state
+        solution, complete = await _run_solver(
+            cube_state, request.max_length, _request_timeout(request.timeout_ms)
+        )
+        return ScrambleSolveResponse(
+            **_solution_fields(solution),
+            deadline_exceeded=not complete,
+            cube_state=cube_state
+        )
+
+    try:
+        return await _run_until_disconnect(http_request, solve())
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error solving cube: {str(e)}"
+        )
+
+
+def _endgame_stats() -> Optional[dict]:
+    table = load_endgame(TABLES_DIR)
+    return table.stats() if table is not None else None
+
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "ok", "solver": "kociemba"}
+    return {
+        "status": "ok",
+        "solver": SOLVER_NAME,
+        "cache": solution_cache.stats(),
+        "scramble_pool": scramble_pool.stats(),
+        "jobs": solve_jobs.stats(),
+        "coalescing": solve_flights.stats(),
+        "endgame": _endgame_stats(),
+    }
+
+
+@router.get("/ready")
+async def readiness_check():
+    """
+    Readiness endpoint cho load balancer
+
+    Trả về 503 cho đến khi solver pool đã warm-up (pruning tables đã load
+    trong mọi worker), kèm thời gian warm-up.
+    """
+    readiness = solver_executor.readiness()
+    if not readiness["ready"]:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content=readiness
+        )
+    return readiness
+
+
+@router.get("/metrics")
+async def solver_metrics_endpoint(admin_user: dict = Depends(get_admin_user)):
+    """
+    Metrics của solver (chỉ admin)
+
+    - latency: histogram theo endpoint và stage (total, validate,
+      queue_wait, search), đơn vị giây
+    - solution_lengths: phân bố số moves (HTM) của solution trả về
+    - pools: queue depth, utilization, timeouts, jobs bị từ chối của
+      solver pool, optimal pool và scramble pool
+    - cache / coalescing / jobs: hit ratio của solution cache, số request
+      được gộp, trạng thái async jobs
+    - endgame: số state và hit ratio của endgame table (None nếu chưa build)
+    """
+    return {
+        **solver_metrics.snapshot(),
+        "solver": SOLVER_NAME,
+        "pools": {
+            executor.name: executor.stats()
+            for executor in (solver_executor, optimal_executor, scramble_executor)
+        },
+        "cache": solution_cache.stats(),
+        "coalescing": solve_flights.stats(),
+        "jobs": solve_jobs.stats(),
+        "endgame": _endgame_stats(),
+    }
 
 
 # ========== HINT ENDPOINT ==========
 class HintRequest(BaseModel):
     """Request model cho hint"""
-    cube_state: str = Field(..., description="Cube state dạng Kociemba (54 characters)")
+    cube_state: str = Field(..., description="Cube state dạng Kociemba (54 characters) hoặc cube key 12 ký tự")
     n_moves: int = Field(default=1, ge=1, le=5, description="Số moves muốn hint (1-5)")
+    max_length: Optional[int] = Field(None, ge=1, le=30, description="Số moves tối đa của solution")
+    timeout_ms: Optional[int] = Field(
+        None, ge=settings.SOLVER_MIN_TIMEOUT_MS, description="Deadline (ms), từ SOLVER_MIN_TIMEOUT_MS tới SOLVER_TIMEOUT_SECONDS"
+    )
+    hint_token: Optional[str] = Field(None, max_length=64, description="hint_token của lần hint trước")
+    applied_moves: Optional[List[str]] = Field(
+        None, max_length=100, description="Moves user đã làm từ lần hint trước"
+    )
 
 
 class HintResponse(BaseModel):
     """Response model cho hint"""
     hint: List[str]  # List of hint moves
     move_count: int
+    deadline_exceeded: bool = False
+    # Phần còn lại của solution path - gửi lại ở lần hint sau để không phải solve lại
+    hint_token: str = ""
+    remaining_moves: int = 0
+    reused_path: bool = False  # True nếu hint lấy từ path cũ (không search)
+
+
+def _remaining_path(
+    cube_state: str,
+    hint_token: str,
+    applied_moves: Optional[List[str]],
+    max_length: Optional[int]
+) -> Optional[List[str]]:
+    """
+    Phần còn lại của solution path cũ (hint_token) tính từ cube_state,
+    None nếu cube_state không nằm trên path (user đi lệch) hoặc token không hợp lệ
+
+    Không tin token: mỗi vị trí trên path được kiểm tra bằng move engine
+    (path[i:] phải đưa cube_state về solved), mỗi lần kiểm tra là một gather.
+    Thử trước vị trí suy ra từ applied_moves nếu đó là prefix của path.
+    """
+    try:
+        path = moves_from_token(hint_token)
+        applied = parse_moves(applied_moves) if applied_moves is not None else None
+    except ValueError:
+        return None
+
+    offsets = list(range(len(path) + 1))
+    if applied is not None and applied == path[:len(applied)]:
+        offsets.insert(0, len(applied))
+    for offset in offsets:
+        remaining = path[offset:]
+        if max_length is not None and len(remaining) > max_length:
+            continue
+        if solves(cube_state, remaining):
+            return remaining
+    return None
 
 
 @router.post("/hint", response_model=HintResponse)
-async def get_hint(request: HintRequest):
+@solver_metrics.track("hint")
+async def get_hint(request: HintRequest, http_request: Request):
     """
     Lấy hint (gợi ý moves) cho Rubik's Cube
     
-    Trả về n_moves đầu tiên của solution
+    Trả về n_moves đầu tiên của solution, kèm hint_token (phần còn lại
+    của solution). Gửi lại hint_token (và applied_moves nếu có) ở lần hint
+    sau: nếu cube state vẫn nằm trên solution path thì hint được lấy từ path
+    đó mà không cần search; user đi lệch path thì mới solve lại.
     """
-    cube_state = request.cube_state.strip().upper()
+    with solver_metrics.stage("validate"):
+        cube_state = _check_solve_request(request)
     n_moves = request.n_moves
     
-    # Validate input
-    if len(cube_state) != 54:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid cube state length. Expected 54 characters, got {len(cube_state)}"
-        )
-    
-    valid_chars = set('URFDLB')
-    if not all(c in valid_chars for c in cube_state):
-        invalid_chars = set(cube_state) - valid_chars
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid characters in cube state: {invalid_chars}"
-        )
-    
-    if not KOCIEMBA_AVAILABLE:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Kociemba solver is not available. Please install kociemba package."
-        )
+    if request.hint_token is not None:
+        remaining = _remaining_path(cube_state, request.hint_token, request.applied_moves, request.max_length)
+        if remaining is not None:
+            hint_moves = remaining[:n_moves]
+            return HintResponse(
+                hint=hint_moves,
+                move_count=len(hint_moves),
+                hint_token=moves_to_token(remaining),
+                remaining_moves=len(remaining),
+                reused_path=True
+            )
     
-    try:
+    async def solve() -> HintResponse:
         # Giải cube để lấy solution
-        solution = kociemba.solve(cube_state)
+        solution, complete = await _run_solver(
+            cube_state, request.max_length, _request_timeout(request.timeout_ms)
+        )
         moves = solution.split() if solution else []
         
         # Lấy n_moves đầu tiên
@@ -165,8 +1014,16 @@ async def get_hint(request: HintRequest):
         
         return HintResponse(
             hint=hint_moves,
-            move_count=len(hint_moves)
+            move_count=len(hint_moves),
+            deadline_exceeded=not complete,
+            hint_token=moves_to_token(moves),
+            remaining_moves=len(moves)
         )
+
+    try:
+        return await _run_until_disconnect(http_request, solve())
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -182,7 +1039,7 @@ async def get_hint(request: HintRequest):
 # ========== VALIDATE ENDPOINT ==========
 class ValidateRequest(BaseModel):
     """Request model để validate cube state"""
-    cube_state: str = Field(..., description="Cube state dạng Kociemba (54 characters)")
+    cube_state: str = Field(..., description="Cube state dạng Kociemba (54 characters) hoặc cube key 12 ký tự")
 
 
 class ValidateResponse(BaseModel):
@@ -193,16 +1050,21 @@ class ValidateResponse(BaseModel):
 
 
 @router.post("/validate", response_model=ValidateResponse)
+@solver_metrics.track("validate")
 async def validate_cube_state(request: ValidateRequest):
     """
     Validate cube state có hợp lệ không
     
-    Kiểm tra:
+    Kiểm tra (không cần chạy solver):
     - Độ dài = 54
     - Chỉ chứa U, R, F, D, L, B
-    - Có thể giải được (nếu có thể)
+    - Centers, số sticker mỗi màu, corners/edges hợp lệ
+    - Orientation (twisted corner, flipped edge) và permutation parity
     """
-    cube_state = request.cube_state.strip().upper()
+    try:
+        cube_state = _resolve_cube_state(request.cube_state)
+    except ValueError as e:
+        return ValidateResponse(is_valid=False, message=str(e))
     
     # Check length
     if len(cube_state) != 54:
@@ -220,33 +1082,166 @@ async def validate_cube_state(request: ValidateRequest):
             message=f"Invalid characters: {invalid_chars}"
         )
     
-    if not KOCIEMBA_AVAILABLE:
-        return ValidateResponse(
-            is_valid=True,
-            message="Cube state format is valid (cannot verify solvability - kociemba not available)",
-            can_solve=None
-        )
-    
-    # Try to solve (check if solvable)
-    try:
-        kociemba.solve(cube_state)
-        return ValidateResponse(
-            is_valid=True,
-            message="Cube state is valid and solvable",
-            can_solve=True
-        )
-    except ValueError as e:
+    # Check solvability (structural validator)
+    with solver_metrics.stage("validate"):
+        error = check_cube_state(cube_state)
+    if error:
         return ValidateResponse(
             is_valid=False,
-            message=f"Cube state is invalid: {str(e)}",
+            message=f"Cube state is invalid: {error}",
             can_solve=False
         )
-    except Exception:
-        return ValidateResponse(
-            is_valid=True,
-            message="Cube state format is valid (cannot verify solvability)",
-            can_solve=None
+    
+    return ValidateResponse(
+        is_valid=True,
+        message="Cube state is valid and solvable",
+        can_solve=True
+    )
+
+
+# ========== SCAN COLOR CLASSIFICATION ==========
+class ScanSample(BaseModel):
+    """54 màu đã sample của một lần scan, theo thứ tự facelet (URFDLB, mỗi face 9 sticker)"""
+    colors: List[Tuple[float, float, float]] = Field(..., min_length=54, max_length=54)
+    color_space: Literal["rgb", "hsv"] = Field(
+        "rgb", description="rgb: 0..255; hsv: h 0..360, s và v 0..1"
+    )
+
+
+class ScanClassifyRequest(BaseModel):
+    """Request model cho scan classification (một hoặc nhiều scan)"""
+    scans: List[ScanSample] = Field(..., min_length=1, max_length=settings.SCAN_BATCH_MAX_SCANS)
+    profile: Optional[str] = Field(
+        None, min_length=1, max_length=50, pattern=r"^[\w\- ]+$",
+        description="Dùng color profile của user làm centroids ban đầu (cần đăng nhập)"
+    )
+
+
+class ScanClassification(BaseModel):
+    """Kết quả phân loại một scan"""
+    cube_state: str  # Luôn đủ 9 sticker mỗi màu, center cố định
+    is_valid: bool  # cube state giải được
+    error: Optional[str] = None  # lý do nếu không giải được
+    repaired: bool = False  # True nếu đã đổi chỗ một cặp sticker confidence thấp để state hợp lệ
+    confidence: List[float]  # 54 giá trị 0..1, thấp = nên để user xác nhận lại
+    iterations: int
+
+
+class ScanClassifyResponse(BaseModel):
+    results: List[ScanClassification]
+    profile_used: bool = False  # False nếu không yêu cầu profile hoặc user chưa có profile đó
+
+
+class ScanCalibrateRequest(ScanSample):
+    """Một scan đã được user xác nhận (cube_state đúng với colors)"""
+    cube_state: str = Field(..., description="Cube state đã xác nhận, cùng thứ tự facelet với colors")
+    profile: str = Field(
+        "default", min_length=1, max_length=50, pattern=r"^[\w\- ]+$",
+        description="Tên color profile (vd: tên cube / điều kiện ánh sáng)"
+    )
+
+
+class ColorProfileResponse(BaseModel):
+    name: str
+    samples: int
+    centroids: List[Tuple[float, float, float]]  # Lab, thứ tự URFDLB lúc học
+    updated_at: Optional[datetime] = None
+
+
+def _scans_to_lab(scans: List[ScanSample]) -> np.ndarray:
+    """Màu của các scan (RGB hoặc HSV) -> Lab, shape (B, 54, 3)"""
+    colors = np.array([scan.colors for scan in scans], dtype=np.float64)
+    is_hsv = np.array([scan.color_space == "hsv" for scan in scans])
+    if is_hsv.any():
+        colors[is_hsv] = hsv_to_rgb(colors[is_hsv])
+    return rgb_to_lab(colors)
+
+
+def _profile_response(profile) -> ColorProfileResponse:
+    return ColorProfileResponse(
+        name=profile.name,
+        samples=profile.samples,
+        centroids=json.loads(profile.centroids),
+        updated_at=profile.updated_at,
+    )
+
+
+@router.post("/scan/classify", response_model=ScanClassifyResponse)
+def classify_scan_colors(
+    request: ScanClassifyRequest,
+    current_user: Optional[dict] = Depends(get_optional_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Phân loại màu sticker của các lần scan thành cube state
+
+    Constrained k-means (xem app/utils/color_classifier.py): 6 cluster, center
+    sticker cố định, mỗi màu đúng 9 sticker; cả batch chạy vectorized cùng lúc.
+    Có profile thì centroids đã học (align theo center sticker của từng scan)
+    là điểm bắt đầu, thường hội tụ sau 1-2 vòng.
+    Endpoint sync (chạy trong threadpool) vì NumPy giữ CPU trong lúc tính.
+    """
+    lab = _scans_to_lab(request.scans)
+    initial_centroids = None
+    if request.profile is not None:
+        if current_user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Login required to use a color profile"
+            )
+        centroids = CalibrationService(db).get_centroids(current_user["id"], request.profile)
+        if centroids is not None:
+            initial_centroids = align_centroids(centroids, lab[:, CENTER_INDICES])
+    results = classify_stickers(lab, initial_centroids)
+    return ScanClassifyResponse(
+        results=[ScanClassification(**result) for result in results],
+        profile_used=initial_centroids is not None,
+    )
+
+
+@router.post("/scan/calibrate", response_model=ColorProfileResponse)
+def calibrate_scan_colors(
+    request: ScanCalibrateRequest,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Học color profile từ một scan đã xác nhận
+
+    Gọi sau khi user xác nhận (hoặc sửa) kết quả của /scan/classify; chỉ nhận
+    cube state giải được để không học từ scan sai.
+    """
+    cube_state = request.cube_state.strip().upper()
+    error = check_cube_state(cube_state)
+    if error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error
         )
+    profile = CalibrationService(db).learn(
+        current_user["id"], request.profile, cube_state, _scans_to_lab([request])[0]
+    )
+    return _profile_response(profile)
+
+
+@router.get("/scan/profiles", response_model=List[ColorProfileResponse])
+def get_color_profiles(
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Danh sách color profiles của user"""
+    return [_profile_response(profile) for profile in CalibrationService(db).list_profiles(current_user["id"])]
+
+
+@router.delete("/scan/profiles/{name}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_color_profile(
+    name: str,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Xoá color profile (scan sau đó dùng lại k-means đầy đủ)"""
+    CalibrationService(db).delete_profile(current_user["id"], name)
+    return None
 
 
 # ========== SOLUTION HISTORY ENDPOINTS ==========
@@ -269,162 +1264,124 @@ class SolutionResponse(BaseModel):
     created_at: datetime
 
 
+def _normalize_moves(moves: List[str]) -> List[str]:
+    """Rút gọn moves của solution được lưu, 400 nếu có move không hợp lệ"""
+    try:
+        return simplify_moves(moves)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+def _solution_response(solution: Solution) -> SolutionResponse:
+    return SolutionResponse(
+        id=solution.id,
+        cube_state=solution.cube_state,
+        solution=solution.solution,
+        moves=solution.solution.split() if solution.solution else [],
+        move_count=solution.move_count,
+        notes=solution.notes,
+        created_at=solution.created_at,
+    )
+
+
 @router.post("/solutions", response_model=SolutionResponse, status_code=status.HTTP_201_CREATED)
-async def save_solution(
+def save_solution(
     solution_data: SolutionCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """
-    Lưu solution vào history (in-memory storage)
-    
-    Note: Trong production nên dùng database
+    Lưu solution vào history
+
+    Cube state được lưu chung (một bản canonical cho mỗi state, không phụ
+    thuộc hướng cầm cube) giữa các solutions.
     """
-    global _solution_counter
-    
-    _solution_counter += 1
-    solution_id = _solution_counter
-    
-    solution_record = {
-        "id": solution_id,
-        "user_id": current_user["id"],
-        "cube_state": solution_data.cube_state,
-        "solution": solution_data.solution,
-        "moves": solution_data.moves,
-        "move_count": len(solution_data.moves),
-        "notes": solution_data.notes,
-        "created_at": datetime.now()
-    }
-    
-    _solutions_storage[solution_id] = solution_record
-    
-    return SolutionResponse(**solution_record)
+    moves = _normalize_moves(solution_data.moves)
+    solution = SolutionService(db).create_solution(
+        current_user["id"], solution_data.cube_state.strip().upper(), moves, solution_data.notes
+    )
+    return _solution_response(solution)
 
 
 @router.get("/solutions", response_model=List[SolutionResponse])
-async def get_solutions(
+def get_solutions(
+    response: Response,
     current_user: dict = Depends(get_current_user),
-    limit: int = 20,
-    offset: int = 0
+    db: Session = Depends(get_db),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Giá trị header X-Next-Cursor của trang trước"),
+    offset: int = Query(0, ge=0, description="Chỉ dùng khi không có cursor (chậm với offset lớn)")
 ):
     """
     Lấy danh sách solutions của user hiện tại
-    
-    Sắp xếp theo thời gian tạo (mới nhất trước)
+
+    Sắp xếp theo thời gian tạo (mới nhất trước). Keyset pagination: gửi lại
+    header X-Next-Cursor (không có header = trang cuối) qua param cursor.
     """
-    user_solutions = [
-        sol for sol in _solutions_storage.values()
-        if sol["user_id"] == current_user["id"]
-    ]
-    
-    # Sort by created_at (newest first)
-    user_solutions.sort(key=lambda x: x["created_at"], reverse=True)
-    
-    # Pagination
-    paginated = user_solutions[offset:offset + limit]
-    
-    return [SolutionResponse(**sol) for sol in paginated]
+    solutions, next_cursor = SolutionService(db).get_user_solutions(
+        current_user["id"], limit=limit, cursor=cursor, offset=offset
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [_solution_response(solution) for solution in solutions]
 
 
 @router.get("/solutions/{solution_id}", response_model=SolutionResponse)
-async def get_solution(
+def get_solution(
     solution_id: int,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """
     Lấy một solution cụ thể theo ID
     """
-    if solution_id not in _solutions_storage:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Solution not found"
-        )
-    
-    solution = _solutions_storage[solution_id]
-    
-    # Check ownership
-    if solution["user_id"] != current_user["id"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to access this solution"
-        )
-    
-    return SolutionResponse(**solution)
+    solution = SolutionService(db).get_solution(solution_id, current_user["id"])
+    return _solution_response(solution)
 
 
 @router.put("/solutions/{solution_id}", response_model=SolutionResponse)
-async def update_solution(
+def update_solution(
     solution_id: int,
     solution_update: SolutionCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """
-    Update một solution (chỉ có thể update notes)
+    Update notes của một solution, và moves nếu gửi moves khác rỗng
+
+    moves là nguồn duy nhất của solution mới (field solution và cube_state
+    được bỏ qua); moves phải solve cube state đã lưu, không thì 400.
     """
-    if solution_id not in _solutions_storage:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Solution not found"
-        )
-    
-    solution = _solutions_storage[solution_id]
-    
-    # Check ownership
-    if solution["user_id"] != current_user["id"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to update this solution"
-        )
-    
-    # Update (chỉ update notes và solution nếu muốn)
-    solution["notes"] = solution_update.notes
-    if solution_update.solution:
-        solution["solution"] = solution_update.solution
-        solution["moves"] = solution_update.moves
-        solution["move_count"] = len(solution_update.moves)
-    
-    return SolutionResponse(**solution)
+    moves = _normalize_moves(solution_update.moves) if solution_update.moves else None
+    solution = SolutionService(db).update_solution(
+        solution_id, current_user["id"], solution_update.notes, moves
+    )
+    return _solution_response(solution)
 
 
 @router.delete("/solutions/{solution_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_solution(
+def delete_solution(
     solution_id: int,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """
     Xóa một solution
     """
-    if solution_id not in _solutions_storage:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Solution not found"
-        )
-    
-    solution = _solutions_storage[solution_id]
-    
-    # Check ownership
-    if solution["user_id"] != current_user["id"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to delete this solution"
-        )
-    
-    del _solutions_storage[solution_id]
+    SolutionService(db).delete_solution(solution_id, current_user["id"])
     return None
 
 
 @router.delete("/solutions", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_all_solutions(
-    current_user: dict = Depends(get_current_user)
+def delete_all_solutions(
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """
     Xóa tất cả solutions của user hiện tại
     """
-    solution_ids_to_delete = [
-        sol_id for sol_id, sol in _solutions_storage.items()
-        if sol["user_id"] == current_user["id"]
-    ]
-    
-    for sol_id in solution_ids_to_delete:
-        del _solutions_storage[sol_id]
-    
+    SolutionService(db).delete_user_solutions(current_user["id"])
     return None
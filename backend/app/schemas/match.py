@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 from app.models.match import MatchStatus
 
@@ -8,6 +8,8 @@ class MatchCreate(BaseModel):
 
 class MatchResult(BaseModel):
     solve_time: int  # milliseconds
+    # Moves player đã dùng (tuỳ chọn); server replay từ scramble state để xác nhận
+    moves: Optional[List[str]] = Field(None, max_length=1000)
 
 class MatchResponse(BaseModel):
     id: int
@@ -15,9 +17,14 @@ class MatchResponse(BaseModel):
     player1_id: int
     player2_id: int
     scramble: str
+    scramble_state: Optional[str] = None
     status: str
     player1_time: Optional[int] = None
     player2_time: Optional[int] = None
+    player1_move_count: Optional[int] = None
+    player2_move_count: Optional[int] = None
+    player1_tps: Optional[float] = None
+    player2_tps: Optional[float] = None
     winner_id: Optional[int] = None
     is_draw: bool = False
     created_at: datetime
@@ -0,0 +1,161 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from fastapi import HTTPException, status
+from app.config import settings
+from app.models.color_profile import ColorProfile
+from app.utils.color_classifier import align_centroids, face_means
+
+ProfileKey = Tuple[int, str]
+
+
+class ProfileCache:
+    """
+    LRU + TTL cache của color profile centroids theo (user_id, name)
+
+    Giữ cả negative entry (user chưa có profile) để request classify không
+    query DB mỗi lần. Chỉ chứa dữ liệu đọc từ DB: mọi thay đổi đều ghi DB
+    trước rồi set/invalidate ở đây, nên entry cũ nhất là TTL (khi chạy
+    nhiều process).
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: float = 600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[ProfileKey, Tuple[Optional[np.ndarray], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: ProfileKey) -> Tuple[bool, Optional[np.ndarray]]:
+        """(found, centroids) - found=False là miss, centroids=None là negative entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def set(self, key: ProfileKey, centroids: Optional[np.ndarray]):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (centroids, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: ProfileKey):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+profile_cache = ProfileCache(
+    max_size=settings.CALIBRATION_CACHE_SIZE,
+    ttl=settings.CALIBRATION_CACHE_TTL_SECONDS,
+)
+
+
+def _load_centroids(profile: ColorProfile) -> np.ndarray:
+    return np.array(json.loads(profile.centroids), dtype=np.float64)
+
+
+class CalibrationService:
+    """
+    Color profiles của user (centroids Lab của 6 màu, thứ tự URFDLB)
+
+    Học từ các scan user đã xác nhận: màu trung bình từng face của scan mới
+    được align theo profile hiện có (user có thể cầm cube theo hướng khác)
+    rồi gộp bằng EMA, trọng số max(1 / (samples + 1), learning_rate) - mấy
+    scan đầu là trung bình cộng, sau đó profile theo kịp thay đổi ánh sáng.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _get_profile(self, user_id: int, name: str, for_update: bool = False) -> Optional[ColorProfile]:
+        query = self.db.query(ColorProfile).filter(
+            ColorProfile.user_id == user_id, ColorProfile.name == name
+        )
+        if for_update:
+            # Lock row tới khi commit; populate_existing để đọc giá trị mới nhất
+            # kể cả khi profile đã có trong session
+            query = query.with_for_update().populate_existing()
+        return query.first()
+
+    def get_centroids(self, user_id: int, name: str) -> Optional[np.ndarray]:
+        """Centroids (6, 3) của profile, None nếu chưa có (đọc qua profile_cache)"""
+        found, centroids = profile_cache.get((user_id, name))
+        if found:
+            return centroids
+        profile = self._get_profile(user_id, name)
+        centroids = _load_centroids(profile) if profile else None
+        profile_cache.set((user_id, name), centroids)
+        return centroids
+
+    def learn(self, user_id: int, name: str, cube_state: str, lab: np.ndarray) -> ColorProfile:
+        """Cập nhật (hoặc tạo) profile từ một scan đã xác nhận; lab: (54, 3)"""
+        means = face_means(lab, cube_state)
+        # Read-modify-write (EMA của centroids): lock row để hai scan cùng lúc
+        # không ghi đè cập nhật của nhau
+        profile = self._get_profile(user_id, name, for_update=True)
+        if profile is None:
+            profile = ColorProfile(user_id=user_id, name=name, centroids=json.dumps(np.round(means, 3).tolist()), samples=1)
+            try:
+                with self.db.begin_nested():
+                    self.db.add(profile)
+            except IntegrityError:
+                # Request khác vừa tạo cùng profile: gộp scan này vào profile đó
+                profile = self._get_profile(user_id, name, for_update=True)
+                if profile is None:
+                    raise
+                self._merge(profile, means)
+        else:
+            self._merge(profile, means)
+        self.db.commit()
+        self.db.refresh(profile)
+        profile_cache.set((user_id, name), _load_centroids(profile))
+        return profile
+
+    @staticmethod
+    def _merge(profile: ColorProfile, means: np.ndarray):
+        current = _load_centroids(profile)
+        rate = max(1.0 / (profile.samples + 1), settings.CALIBRATION_LEARNING_RATE)
+        updated = (1 - rate) * current + rate * align_centroids(means, current)
+        profile.centroids = json.dumps(np.round(updated, 3).tolist())
+        profile.samples += 1
+
+    def list_profiles(self, user_id: int) -> List[ColorProfile]:
+        return self.db.query(ColorProfile).filter(
+            ColorProfile.user_id == user_id
+        ).order_by(ColorProfile.name).all()
+
+    def delete_profile(self, user_id: int, name: str):
+        profile = self._get_profile(user_id, name)
+        if not profile:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Color profile not found"
+            )
+        self.db.delete(profile)
+        self.db.commit()
+        profile_cache.invalidate((user_id, name))
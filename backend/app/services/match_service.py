@@ -4,7 +4,10 @@ from fastapi import HTTPException, status
 from app.models.match import Match, MatchStatus
 from app.models.user import User
 from app.schemas.match import MatchCreate, MatchResult
-from app.utils.scramble_generator import generate_scramble
+from app.services.scramble_pool import scramble_pool
+from app.utils.cube_moves import parse_moves, solves, state_after, to_face_moves
+from app.utils.move_simplifier import simplify_moves
+from typing import List, Optional, Tuple
 import uuid
 import json
 from datetime import datetime
@@ -15,8 +18,8 @@ class MatchService:
 
     def create_match(self, player1_id: int, match_data: MatchCreate) -> Match:
         """Create a new match"""
-        # Generate scramble
-        scramble = generate_scramble()
+        # Random-state scramble sinh sẵn trong pool (O(1), không solve inline)
+        scramble = scramble_pool.pop()
         
         # If opponent_id is provided, create match with that user
         if match_data.opponent_id:
@@ -53,6 +56,7 @@ class MatchService:
             player1_id=player1_id,
             player2_id=player2_id,
             scramble=scramble,
+            scramble_state=state_after(scramble),
             status=MatchStatus.waiting
         )
         
@@ -77,6 +81,13 @@ class MatchService:
             )
         return match
 
+    def get_scramble_state(self, match: Match) -> str:
+        """Cube state sau scramble của match (match cũ chưa có thì tính và lưu lại)"""
+        if match.scramble_state is None:
+            match.scramble_state = state_after(match.scramble)
+            self.db.commit()
+        return match.scramble_state
+
     def start_match(self, match_id: str, user_id: int) -> Match:
         """Start a match"""
         match = self.get_match(match_id)
@@ -100,8 +111,13 @@ class MatchService:
         
         return match
 
-    def submit_result(self, match_id: str, user_id: int, solve_time: int) -> Match:
-        """Submit solve time for a match"""
+    def submit_result(self, match_id: str, user_id: int, solve_time: int, moves: Optional[List[str]] = None) -> Match:
+        """
+        Submit solve time for a match
+
+        Nếu có moves: replay từ scramble state của match, chỉ chấp nhận time
+        khi moves đưa cube về solved; lưu move count và TPS đã xác nhận.
+        """
         match = self.get_match(match_id)
         
         if user_id not in [match.player1_id, match.player2_id]:
@@ -116,21 +132,32 @@ class MatchService:
                 detail="Match is not active"
             )
         
+        already_submitted = (
+            match.player1_time if user_id == match.player1_id else match.player2_time
+        ) is not None
+        if already_submitted:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Result already submitted"
+            )
+
+        move_count = None
+        tps = None
+        if moves is not None:
+            move_count, executed = self._verify_solution(match, moves)
+            if solve_time > 0:
+                # TPS theo số moves player thực sự làm (kể cả moves bị triệt tiêu)
+                tps = round(executed / (solve_time / 1000), 2)
+
         # Update player time
         if user_id == match.player1_id:
-            if match.player1_time is not None:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Result already submitted"
-                )
             match.player1_time = solve_time
+            match.player1_move_count = move_count
+            match.player1_tps = tps
         else:
-            if match.player2_time is not None:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Result already submitted"
-                )
             match.player2_time = solve_time
+            match.player2_move_count = move_count
+            match.player2_tps = tps
         
         # Check if both players submitted
         if match.player1_time is not None and match.player2_time is not None:
@@ -153,6 +180,28 @@ class MatchService:
         
         return match
 
+    def _verify_solution(self, match: Match, moves: List[str]) -> Tuple[int, int]:
+        """
+        Replay moves từ scramble state, trả về (số moves của reconstruction
+        đã rút gọn, số moves đã submit); 400 nếu không solve được
+
+        Nhận cả slice / wide moves và rotations như client gửi; move count
+        tính trên dạng chỉ gồm face moves (rotation không tính).
+        """
+        try:
+            parsed = parse_moves(moves, extended=True)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        if not solves(self.get_scramble_state(match), parsed):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Submitted moves do not solve the scramble"
+            )
+        return len(simplify_moves(to_face_moves(parsed))), len(parsed)
+
     def _update_user_stats(self, match: Match):
         """Update user statistics after match completion"""
         player1 = self.db.query(User).filter(User.id == match.player1_id).first()
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Optional
+from app.config import settings
+from app.services.solver_executor import (
+    SOLVER_AVAILABLE, SolverBusyError, scramble_executor, solver_executor
+)
+from app.utils.cube_moves import parse_moves
+from app.utils.scramble_generator import generate_random_move_scramble
+
+try:
+    import fcntl
+except ImportError:  # Windows: không có flock, chỉ nên chạy một process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class ScramblePool:
+    """
+    Pool random-state scrambles được sinh trước
+
+    - pop() là O(1) và không bao giờ solve inline (gọi được từ cả event loop
+      lẫn threadpool của sync endpoints)
+    - Background task sinh thêm scramble trong scramble_executor (pool riêng,
+      priority thấp) và chỉ khi solver pool còn worker rảnh, cho đến khi đủ
+      max_size
+    - File pool dùng chung giữa các uvicorn workers: load() lấy hẳn các
+      scramble ra khỏi file (có file lock), stop() trả lại phần chưa dùng,
+      nên hai process không bao giờ giữ cùng một scramble
+    - Pool rỗng (vừa khởi động, không có solver) thì trả về random-move scramble
+    """
+
+    IDLE_POLL_SECONDS = 0.5  # chu kỳ kiểm tra solver pool có worker rảnh
+
+    def __init__(self, max_size: int = 200, path: Optional[str] = None):
+        self.max_size = max_size
+        self.path = path or None
+        self._scrambles: Deque[str] = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.generated = 0
+        self.fallbacks = 0
+
+    def __len__(self) -> int:
+        return len(self._scrambles)
+
+    @contextmanager
+    def _file_lock(self):
+        """Lock (flock) trên file .lock cạnh file pool, dùng chung giữa các process"""
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_file(self) -> list:
+        """Các scramble hợp lệ trong file pool (gọi khi đang giữ lock)"""
+        scrambles = []
+        if not os.path.exists(self.path):
+            return scrambles
+        with open(self.path) as f:
+            for line in f:
+                scramble = line.strip()
+                if not scramble:
+                    continue
+                try:
+                    parse_moves(scramble)
+                except ValueError:
+                    continue
+                scrambles.append(scramble)
+        return scrambles
+
+    def _write_file(self, scrambles: list):
+        """Ghi file tạm rồi rename để không bao giờ đọc phải file dở (gọi khi đang giữ lock)"""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.writelines(scramble + "\n" for scramble in scrambles)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """Lấy tối đa max_size scramble ra khỏi file (phần còn lại để cho process khác)"""
+        if not self.path:
+            return
+        try:
+            with self._file_lock():
+                scrambles = self._read_file()
+                taken = scrambles[:self.max_size - len(self._scrambles)]
+                if taken:
+                    self._write_file(scrambles[len(taken):])
+        except OSError as e:
+            logger.warning(f"Could not load scramble pool from {self.path}: {e}")
+            return
+        self._scrambles.extend(taken)
+        logger.info(f"Loaded {len(taken)} scrambles from {self.path}")
+
+    def save(self):
+        """Trả các scramble chưa dùng về file pool (pool trong memory được làm rỗng)"""
+        if not self.path or not self._scrambles:
+            return
+        scrambles = list(self._scrambles)
+        try:
+            with self._file_lock():
+                self._write_file(self._read_file() + scrambles)
+        except OSError as e:
+            logger.warning(f"Could not save scramble pool to {self.path}: {e}")
+            return
+        self._scrambles.clear()
+
+    def pop(self) -> str:
+        """Lấy một scramble đã sinh sẵn (O(1)), đánh thức background refill"""
+        try:
+            scramble = self._scrambles.popleft()
+        except IndexError:
+            self.fallbacks += 1
+            scramble = generate_random_move_scramble()
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return scramble
+
+    def start(self):
+        """Load pool từ file và chạy background refill (gọi trong event loop)"""
+        self.load()
+        if not SOLVER_AVAILABLE:
+            logger.warning("No solver available, matches will use random-move scrambles")
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._refill_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.save()
+
+    async def _wait_for_idle_solver(self):
+        # Chỉ sinh scramble khi solve thường không phải chờ (solver pool còn worker rảnh)
+        while solver_executor.pending >= solver_executor.max_workers:
+            await asyncio.sleep(self.IDLE_POLL_SECONDS)
+
+    async def _refill_forever(self):
+        # Chờ solver warm-up xong (tables của two-phase fallback được generate ở đó)
+        while not solver_executor.ready:
+            await asyncio.sleep(1)
+        while True:
+            # Clear trước khi refill: pop() trong lúc refill vẫn đánh thức vòng sau
+            self._wakeup.clear()
+            while len(self._scrambles) < self.max_size:
+                await self._wait_for_idle_solver()
+                try:
+                    scramble = await scramble_executor.scramble()
+                except SolverBusyError as e:
+                    await asyncio.sleep(e.retry_after)
+                    continue
+                except Exception as e:
+                    logger.warning(f"Scramble generation failed: {e}")
+                    await asyncio.sleep(scramble_executor.retry_after)
+                    continue
+                self._scrambles.append(scramble)
+                self.generated += 1
+            await self._wakeup.wait()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._scrambles),
+            "max_size": self.max_size,
+            "generated": self.generated,
+            "fallbacks": self.fallbacks,
+        }
+
+
+scramble_pool = ScramblePool(
+    max_size=settings.SCRAMBLE_POOL_SIZE,
+    path=settings.SCRAMBLE_POOL_FILE,
+)
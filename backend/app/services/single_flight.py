@@ -0,0 +1,68 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Gộp các lời gọi đồng thời có cùng key thành một lần tính
+
+    Request đầu tiên (leader) chạy factory(), các request cùng key đến trong
+    lúc đó chỉ chờ kết quả (hoặc exception) của nó thay vì chiếm thêm một
+    solver worker. Không cache: key được xoá ngay khi xong (cache là việc
+    của solution_cache).
+
+    Mỗi waiter bị huỷ (client ngắt kết nối) chỉ rời khỏi nhóm; computation
+    chỉ bị huỷ khi không còn ai chờ.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.leaders = 0
+        self.merged = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda _: self._forget(key, task))
+            self.leaders += 1
+        else:
+            self.merged += 1
+
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+                if self._waiters[key] == 0 and not task.done():
+                    # Xoá key ngay để request đến sau bắt đầu computation mới
+                    del self._inflight[key]
+                    del self._waiters[key]
+                    task.cancel()
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._waiters[key]
+        if not task.cancelled():
+            task.exception()  # đánh dấu đã lấy exception (tránh warning khi không còn waiter)
+
+    def stats(self) -> dict:
+        total = self.leaders + self.merged
+        return {
+            "in_flight": len(self._inflight),
+            "computations": self.leaders,
+            "merged": self.merged,
+            "merge_ratio": round(self.merged / total, 4) if total else 0.0,
+        }
+
+
+# Dùng chung cho /solve, /hint, /solve/scramble, batch và jobs (key theo canonical state)
+solve_flights = SingleFlight()
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+from app.config import settings
+from app.utils.cube_codec import encode_state
+from app.utils.cube_moves import pack_moves, unpack_moves
+
+
+class SolutionCache:
+    """
+    LRU + TTL cache cho kết quả solve, dùng chung cho /solve, /hint, /validate
+
+    Key là cube state đã normalize; router dùng dạng canonical theo symmetry
+    (app.utils.cube_symmetry) làm key. State hợp lệ được lưu dưới dạng cubie
+    code (int, xem app.utils.cube_codec) thay cho chuỗi 54 ký tự, solution
+    dạng 1 byte mỗi move. namespace tách các loại kết quả khác nhau
+    (vd: "optimal") cho cùng một state.
+    Value là (solution, error): error != None là negative entry
+    (cube state không hợp lệ), để không phải solve lại state lỗi.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[Optional[bytes], Optional[str], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.negative_hits = 0
+
+    @staticmethod
+    def normalize(cube_state: str, namespace: str = "") -> Hashable:
+        cube_state = cube_state.strip().upper()
+        try:
+            key = encode_state(cube_state)
+        except (ValueError, IndexError, KeyError):
+            # State không mã hoá được (negative entries) giữ nguyên dạng chuỗi
+            key = cube_state
+        return (namespace, key) if namespace else key
+
+    def get(self, cube_state: str, namespace: str = "") -> Optional[Tuple[Optional[str], Optional[str]]]:
+        """Trả về (solution, error) nếu có trong cache, None nếu miss"""
+        key = self.normalize(cube_state, namespace)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            packed, error, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if error is not None:
+                self.negative_hits += 1
+                return None, error
+        return " ".join(unpack_moves(packed)), None
+
+    def _put(self, key: Hashable, solution: Optional[str], error: Optional[str]):
+        if self.max_size <= 0:
+            return
+        packed = pack_moves(solution.split()) if solution is not None else None
+        with self._lock:
+            self._entries[key] = (packed, error, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_solution(self, cube_state: str, solution: str, namespace: str = ""):
+        self._put(self.normalize(cube_state, namespace), solution, None)
+
+    def set_invalid(self, cube_state: str, error: str, namespace: str = ""):
+        """Lưu negative entry cho cube state không giải được"""
+        self._put(self.normalize(cube_state, namespace), None, error)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+solution_cache = SolutionCache(
+    max_size=settings.SOLUTION_CACHE_SIZE,
+    ttl=settings.SOLUTION_CACHE_TTL_SECONDS,
+)
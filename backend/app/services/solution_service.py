@@ -0,0 +1,174 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import and_, or_
+from fastapi import HTTPException, status
+from app.models.solution import CubeState, Solution
+from app.utils.cube_moves import solves
+from app.utils.cube_symmetry import IDENTITY, canonicalize, moves_to_canonical
+from typing import List, Optional, Tuple
+from datetime import datetime
+import base64
+import binascii
+import hashlib
+
+
+def state_hash(cube_state: str) -> str:
+    """Content hash của cube state (key của bảng cube_states)"""
+    return hashlib.sha256(cube_state.encode()).hexdigest()
+
+
+def canonical_state(cube_state: str) -> Tuple[str, int]:
+    """
+    (canonical state, symmetry) của cube state được lưu
+
+    State không đúng dạng 54 facelets URFDLB (history không bắt buộc state
+    hợp lệ) thì giữ nguyên với symmetry IDENTITY.
+    """
+    if len(cube_state) != 54 or not set(cube_state) <= set("URFDLB"):
+        return cube_state, IDENTITY
+    return canonicalize(cube_state)
+
+
+def encode_cursor(solution: Solution) -> str:
+    """Cursor cho keyset pagination: (created_at, id) của record cuối trang"""
+    raw = f"{solution.created_at.isoformat()}|{solution.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raise ValueError nếu cursor không hợp lệ"""
+    try:
+        created_at, solution_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(solution_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+class SolutionService:
+    """
+    Solution history của user
+
+    Cube state được lưu một lần trong bảng cube_states dưới dạng canonical
+    (tra theo sha256), mỗi solution giữ state_id cùng state gốc, symmetry và
+    moves đã map sang hướng canonical. Danh sách dùng keyset pagination trên
+    index (user_id, created_at, id) nên mỗi trang là một index range scan,
+    không phụ thuộc số solutions đã có.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _get_or_create_state(self, cube_state: str) -> CubeState:
+        """cube_state: dạng canonical"""
+        key = state_hash(cube_state)
+        state = self.db.query(CubeState).filter(CubeState.state_hash == key).first()
+        if state:
+            return state
+
+        state = CubeState(state_hash=key, cube_state=cube_state)
+        try:
+            # Savepoint: request khác insert cùng state trước thì chỉ rollback phần này
+            with self.db.begin_nested():
+                self.db.add(state)
+        except IntegrityError:
+            state = self.db.query(CubeState).filter(CubeState.state_hash == key).one()
+        return state
+
+    def create_solution(self, user_id: int, cube_state: str, moves: List[str], notes: Optional[str]) -> Solution:
+        """Lưu solution (moves đã rút gọn)"""
+        canonical, sym = canonical_state(cube_state)
+        solution = Solution(
+            user_id=user_id,
+            state=self._get_or_create_state(canonical),
+            cube_state=cube_state,
+            symmetry=sym,
+            solution=" ".join(moves),
+            canonical_solution=" ".join(moves_to_canonical(moves, sym)),
+            move_count=len(moves),
+            notes=notes,
+        )
+        self.db.add(solution)
+        self.db.commit()
+        self.db.refresh(solution)
+        return solution
+
+    def get_user_solutions(
+        self,
+        user_id: int,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+    ) -> Tuple[List[Solution], Optional[str]]:
+        """
+        Solutions của user (mới nhất trước) và cursor của trang tiếp theo
+
+        Có cursor thì bỏ qua offset; cursor là None khi đã hết.
+        """
+        query = (
+            self.db.query(Solution)
+            .filter(Solution.user_id == user_id)
+            .order_by(Solution.created_at.desc(), Solution.id.desc())
+        )
+        if cursor:
+            try:
+                created_at, solution_id = decode_cursor(cursor)
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e)
+                )
+            query = query.filter(or_(
+                Solution.created_at < created_at,
+                and_(Solution.created_at == created_at, Solution.id < solution_id),
+            ))
+        elif offset:
+            query = query.offset(offset)
+
+        # Lấy thừa một record để biết còn trang sau hay không
+        solutions = query.limit(limit + 1).all()
+        next_cursor = encode_cursor(solutions[limit - 1]) if len(solutions) > limit else None
+        return solutions[:limit], next_cursor
+
+    def get_solution(self, solution_id: int, user_id: int, action: str = "access") -> Solution:
+        """404 nếu không tồn tại, 403 nếu không phải của user"""
+        solution = self.db.query(Solution).filter(Solution.id == solution_id).first()
+        if not solution:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Solution not found"
+            )
+        if solution.user_id != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"You don't have permission to {action} this solution"
+            )
+        return solution
+
+    def update_solution(self, solution_id: int, user_id: int, notes: Optional[str],
+                        moves: Optional[List[str]] = None) -> Solution:
+        """Update notes; moves (đã rút gọn, None = giữ nguyên) phải solve cube state đã lưu"""
+        solution = self.get_solution(solution_id, user_id, action="update")
+        if moves is not None and (len(solution.cube_state) != 54 or not solves(solution.cube_state, moves)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Moves do not solve the stored cube state"
+            )
+        solution.notes = notes
+        if moves is not None:
+            solution.solution = " ".join(moves)
+            solution.canonical_solution = " ".join(moves_to_canonical(moves, solution.symmetry))
+            solution.move_count = len(moves)
+        self.db.commit()
+        self.db.refresh(solution)
+        return solution
+
+    def delete_solution(self, solution_id: int, user_id: int):
+        solution = self.get_solution(solution_id, user_id, action="delete")
+        self.db.delete(solution)
+        self.db.commit()
+
+    def delete_user_solutions(self, user_id: int) -> int:
+        """Xoá tất cả solutions của user (một câu DELETE, dùng index user_id)"""
+        deleted = self.db.query(Solution).filter(Solution.user_id == user_id).delete(synchronize_session=False)
+        self.db.commit()
+        return deleted
@@ -0,0 +1,224 @@
+import asyncio
+import itertools
+import logging
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+from fastapi import HTTPException, status
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+JobRunner = Callable[[], Awaitable[Dict[str, Any]]]
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+class SolveJob:
+    """Một solve job: queued -> running -> done | failed"""
+
+    def __init__(self, user_id: int, kind: str, priority: str, run: JobRunner):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.kind = kind
+        self.priority = priority
+        self.status = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.status_code: Optional[int] = None
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.expires_at: Optional[datetime] = None
+        self._run: Optional[JobRunner] = run
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "priority": self.priority,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "status_code": self.status_code,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
+        }
+
+
+class SolveJobQueue:
+    """
+    Hàng đợi solve jobs chạy nền, kết quả lấy bằng polling hoặc WebSocket
+
+    - Priority queue (high < normal < low, cùng priority thì FIFO), chỉ
+      `workers` job chạy đồng thời nên jobs không lấp đầy solver pool
+    - Mỗi user tối đa max_per_user job chưa xong (429), tổng số job chờ
+      tối đa max_queue (503)
+    - Solver pool quá tải (503 có Retry-After) thì job chờ rồi chạy lại,
+      không fail
+    - Job xong được giữ retention_seconds rồi bị xoá (GET trả về 404)
+    """
+
+    MAX_BUSY_RETRIES = 30
+
+    def __init__(self, workers: int = 2, max_queue: int = 100, max_per_user: int = 3,
+                 retention_seconds: int = 600):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.retention_seconds = retention_seconds
+        self._jobs: Dict[str, SolveJob] = {}
+        self._active_per_user: Dict[int, int] = {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._seq = itertools.count()
+        # (monotonic expiry, job_id) theo thứ tự job xong - retention cố định nên cũng theo thứ tự hết hạn
+        self._expiry: Deque[Tuple[float, str]] = deque()
+        self._tasks = []
+        self._manager = None
+
+    def set_manager(self, manager):
+        """WebSocket manager dùng để push kết quả (ConnectionManager trong main)"""
+        self._manager = manager
+
+    def start(self):
+        """Chạy các dispatcher task (gọi trong event loop)"""
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def submit(self, user_id: int, kind: str, run: JobRunner, priority: str = "normal") -> SolveJob:
+        """Đưa job vào queue, trả về ngay (job.status = queued)"""
+        self._purge_expired()
+        if self._queue is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Job queue is not running"
+            )
+        if self._active_per_user.get(user_id, 0) >= self.max_per_user:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Too many unfinished jobs (max {self.max_per_user}), wait for one to finish"
+            )
+        if self._queue.qsize() >= self.max_queue:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Job queue is full, please retry later",
+                headers={"Retry-After": str(settings.SOLVER_RETRY_AFTER_SECONDS)}
+            )
+
+        job = SolveJob(user_id, kind, priority, run)
+        self._jobs[job.id] = job
+        self._active_per_user[user_id] = self._active_per_user.get(user_id, 0) + 1
+        self._queue.put_nowait((PRIORITIES[priority], next(self._seq), job))
+        return job
+
+    def get(self, job_id: str, user_id: int) -> SolveJob:
+        """404 nếu không có (hoặc đã hết hạn), 403 nếu không phải job của user"""
+        self._purge_expired()
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Job not found or expired"
+            )
+        if job.user_id != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You don't have permission to access this job"
+            )
+        return job
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        while self._expiry and self._expiry[0][0] <= now:
+            _, job_id = self._expiry.popleft()
+            self._jobs.pop(job_id, None)
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await self._execute(job)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, job: SolveJob):
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        try:
+            for attempt in range(self.MAX_BUSY_RETRIES + 1):
+                try:
+                    job.result = await job._run()
+                    job.status = "done"
+                    break
+                except HTTPException as e:
+                    retry_after = (e.headers or {}).get("Retry-After")
+                    if e.status_code != status.HTTP_503_SERVICE_UNAVAILABLE or not retry_after \
+                            or attempt == self.MAX_BUSY_RETRIES:
+                        raise
+                    # Solver pool quá tải: nhường cho requests đồng bộ rồi thử lại
+                    await asyncio.sleep(int(retry_after))
+        except asyncio.CancelledError:
+            raise
+        except HTTPException as e:
+            job.status = "failed"
+            job.error = str(e.detail)
+            job.status_code = e.status_code
+        except Exception as e:
+            logger.exception(f"Solve job {job.id} failed")
+            job.status = "failed"
+            job.error = f"Error solving cube: {e}"
+            job.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        finally:
+            self._finish(job)
+
+        if self._manager is not None:
+            await self._manager.send_personal_message({"type": "solve_job", "job": job.to_dict()}, job.user_id)
+
+    def _finish(self, job: SolveJob):
+        if job.status == "running":
+            # Bị huỷ khi server tắt
+            job.status = "failed"
+            job.error = "Server is shutting down"
+            job.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        job._run = None
+        job.finished_at = datetime.utcnow()
+        job.expires_at = job.finished_at + timedelta(seconds=self.retention_seconds)
+        self._expiry.append((time.monotonic() + self.retention_seconds, job.id))
+        remaining = self._active_per_user.get(job.user_id, 1) - 1
+        if remaining > 0:
+            self._active_per_user[job.user_id] = remaining
+        else:
+            self._active_per_user.pop(job.user_id, None)
+
+    def stats(self) -> dict:
+        self._purge_expired()
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return {**counts, "workers": self.workers}
+
+
+solve_jobs = SolveJobQueue(
+    workers=settings.SOLVE_JOB_WORKERS,
+    max_queue=settings.SOLVE_JOB_MAX_QUEUE,
+    max_per_user=settings.SOLVE_JOB_MAX_PER_USER,
+    retention_seconds=settings.SOLVE_JOB_RETENTION_SECONDS,
+)
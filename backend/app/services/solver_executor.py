@@ -0,0 +1,559 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Optional, Tuple
+from app.config import settings
+from app.services.solver_metrics import solver_metrics
+from app.utils.scramble_generator import generate_scramble
+
+logger = logging.getLogger(__name__)
+
+# Try to import kociemba, but make it optional
+try:
+    import kociemba
+    KOCIEMBA_AVAILABLE = True
+except ImportError:
+    kociemba = None
+    KOCIEMBA_AVAILABLE = False
+    print("WARNING: kociemba module not available. Install it with: pip install kociemba")
+    print("Note: kociemba requires Microsoft Visual C++ Build Tools on Windows")
+
+# Fallback: two-phase solver viết bằng Python + NumPy (app/solver)
+try:
+    from app.solver import optimal, twophase
+    from app.solver.pdb import pdbs_exist
+    from app.solver.tables import ensure_tables
+    TWOPHASE_AVAILABLE = True
+except ImportError:
+    optimal = None
+    twophase = None
+    TWOPHASE_AVAILABLE = False
+    print("WARNING: numpy not available, built-in two-phase solver is disabled")
+
+SOLVER_AVAILABLE = KOCIEMBA_AVAILABLE or TWOPHASE_AVAILABLE
+SOLVER_NAME = "kociemba" if KOCIEMBA_AVAILABLE else ("twophase-numpy" if TWOPHASE_AVAILABLE else "none")
+TABLES_DIR = settings.SOLVER_TABLES_DIR or None
+
+
+class SolverBusyError(Exception):
+    """Raised when the solver queue is full"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Solver queue is full")
+        self.retry_after = retry_after
+
+
+class SolverTimeoutError(Exception):
+    """Raised when a solve job exceeds its deadline"""
+
+    def __init__(self, message: str = "Solver timed out"):
+        super().__init__(message)
+
+
+# Một state bất kỳ (không phải solved) để buộc kociemba load pruning tables
+WARMUP_CUBE_STATE = "DRLUUBFBRBLURRLRUBLRDDFDLFUFUFFDBRDUBRUFLLFDDBFLUBLRBD"
+
+
+# Lỗi warm-up của worker process hiện tại (trả về qua _worker_ready)
+_worker_warmup_error: Optional[str] = None
+
+# Cancel flags dùng chung với process chính (một slot cho mỗi job đang chạy/chờ)
+# và slot của job worker hiện tại đang chạy (xem _timed_call)
+_cancel_flags = None
+_cancel_slot: Optional[int] = None
+
+
+def _init_worker(cancel_flags, initializer, initargs: tuple):
+    """Initializer của mọi pool: nhận cancel flags rồi chạy initializer riêng của pool"""
+    global _cancel_flags
+    _cancel_flags = cancel_flags
+    initializer(*initargs)
+
+
+def _cancelled() -> bool:
+    """Request của job hiện tại đã bỏ (hết deadline / client ngắt kết nối)"""
+    return _cancel_slot is not None and _cancel_flags[_cancel_slot] != 0
+
+
+def _warm_up_worker(tables_dir: Optional[str] = None):
+    """Initializer của mỗi worker process: load pruning tables trước khi nhận job"""
+    global _worker_warmup_error
+    try:
+        if KOCIEMBA_AVAILABLE:
+            kociemba.solve(WARMUP_CUBE_STATE)
+        elif TWOPHASE_AVAILABLE:
+            twophase.load_tables(tables_dir)
+    except Exception as e:
+        _worker_warmup_error = str(e)
+        print(f"Solver worker warm-up failed: {e}")
+
+
+def _init_optimal_worker(tables_dir: Optional[str], niceness: int):
+    """Initializer của optimal pool: hạ priority để không tranh CPU với solve thường"""
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+    try:
+        optimal.load_pdbs(tables_dir)
+    except Exception as e:
+        print(f"Optimal solver worker warm-up failed: {e}")
+
+
+def _init_scramble_worker(tables_dir: Optional[str], niceness: int):
+    """Initializer của scramble pool: hạ priority rồi warm-up như worker thường"""
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+    _warm_up_worker(tables_dir)
+
+
+def optimal_available() -> bool:
+    """Optimal mode cần numpy và pattern databases đã build (python -m app.solver.pdb)"""
+    return TWOPHASE_AVAILABLE and pdbs_exist(TABLES_DIR)
+
+
+def _worker_ready() -> Tuple[int, Optional[str]]:
+    return os.getpid(), _worker_warmup_error
+
+
+def _timed_call(slot: int, fn, *args):
+    """Chạy fn trong worker, trả về (kết quả, thời điểm bắt đầu, thời gian chạy) để đo queue wait / search"""
+    global _cancel_slot
+    started = time.monotonic()  # CLOCK_MONOTONIC dùng chung giữa các process
+    _cancel_slot = slot
+    try:
+        result = fn(*args)
+    finally:
+        _cancel_slot = None
+    return result, started, time.monotonic() - started
+
+
+def _solve_in_worker(cube_state: str, timeout: float) -> str:
+    """Chạy trong worker process - kociemba.solve() là blocking call"""
+    if KOCIEMBA_AVAILABLE:
+        return kociemba.solve(cube_state)
+    try:
+        # Two-phase fallback tự dừng khi hết timeout hoặc job bị huỷ, không cần kill worker
+        return twophase.solve(cube_state, timeout=timeout, tables_dir=TABLES_DIR, should_stop=_cancelled)
+    except TimeoutError:
+        raise SolverTimeoutError()
+
+
+def _solve_bounded_in_worker(cube_state: str, max_length: int, timeout: float) -> Tuple[str, bool]:
+    """
+    Tìm solution <= max_length moves trong timeout giây
+
+    Trả về (solution ngắn nhất tìm được, complete). kociemba (C) không dừng
+    được giữa chừng nên chỉ dùng để lấy solution đầu tiên; việc tìm solution
+    ngắn hơn do two-phase built-in làm (có deadline).
+    """
+    started = time.monotonic()
+    initial = None
+    if KOCIEMBA_AVAILABLE:
+        initial = kociemba.solve(cube_state)
+        if len(initial.split()) <= max_length or not TWOPHASE_AVAILABLE:
+            return initial, len(initial.split()) <= max_length
+    try:
+        return twophase.solve_best(
+            cube_state, max_length,
+            timeout=max(timeout - (time.monotonic() - started), 0.0),
+            tables_dir=TABLES_DIR,
+            initial=initial,
+            should_stop=_cancelled
+        )
+    except TimeoutError:
+        raise SolverTimeoutError()
+
+
+def _solve_stream_in_worker(cube_state: str, max_length: int, timeout: float, initial: Optional[str], progress) -> Tuple[str, bool]:
+    """
+    Như _solve_bounded_in_worker nhưng đẩy mỗi solution mới (ngắn hơn) vào
+    progress (Manager queue) ngay khi tìm được
+    """
+    started = time.monotonic()
+    if initial is None and KOCIEMBA_AVAILABLE:
+        initial = kociemba.solve(cube_state)
+        progress.put(initial)
+    if initial is not None and (len(initial.split()) <= max_length or not TWOPHASE_AVAILABLE):
+        return initial, len(initial.split()) <= max_length
+    try:
+        return twophase.solve_best(
+            cube_state, max_length,
+            timeout=max(timeout - (time.monotonic() - started), 0.0),
+            tables_dir=TABLES_DIR,
+            initial=initial,
+            on_solution=progress.put,
+            should_stop=_cancelled
+        )
+    except TimeoutError:
+        raise SolverTimeoutError()
+
+
+def _solve_optimal_in_worker(cube_state: str, max_length: int, timeout: float) -> str:
+    try:
+        return optimal.solve_optimal(
+            cube_state, max_length, timeout=timeout, tables_dir=TABLES_DIR, should_stop=_cancelled
+        )
+    except TimeoutError:
+        raise SolverTimeoutError("Optimal search timed out")
+
+
+def _scramble_in_worker(timeout: float) -> str:
+    """Random-state scramble (cần một lần solve) - chạy trong worker process"""
+    return generate_scramble(lambda cube_state: _solve_in_worker(cube_state, timeout))
+
+
+class SolverExecutor:
+    """
+    Chạy kociemba trong process pool để không block event loop.
+
+    - Pool size = số CPU cores (hoặc SOLVER_WORKERS)
+    - Queue có giới hạn: vượt quá thì raise SolverBusyError (503 + Retry-After)
+    - Mỗi job có timeout; hết timeout (hoặc request bị huỷ) thì bỏ kết quả
+      và bật cancel flag của job: two-phase / optimal search dừng ở lần kiểm
+      tra deadline kế tiếp, không kill worker đang chạy job của request khác.
+      kociemba (C) không dừng được giữa chừng, chạy nốt (thường vài ms)
+    - Pool được tạo lại sau mỗi SOLVER_RECYCLE_AFTER jobs (pool cũ chạy
+      nốt jobs đã nhận)
+    - Mỗi worker (kể cả worker của pool được tạo lại) warm-up pruning tables
+      ngay khi khởi động; warm_up() khởi động tất cả worker và đo thời gian
+    - Queue wait / search time của mỗi job được ghi vào solver_metrics,
+      counters của pool trong stats()
+    """
+
+    def __init__(
+        self,
+        name: str = "solver",
+        max_workers: int = 0,
+        max_queue: int = 64,
+        timeout: float = 10.0,
+        recycle_after: int = 0,
+        retry_after: int = 2,
+        initializer=_warm_up_worker,
+        initargs: tuple = (TABLES_DIR,),
+    ):
+        self.name = name
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.recycle_after = recycle_after
+        self.retry_after = retry_after
+        self.initializer = initializer
+        self.initargs = initargs
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Mỗi job (đang chạy hoặc chờ) giữ một slot; pending <= capacity nên đủ slot
+        self._cancel_flags = multiprocessing.RawArray("b", self.capacity)
+        self._free_slots = list(range(self.capacity))
+        self._manager = None  # multiprocessing.Manager cho solve_stream (tạo khi cần)
+        self._lock = threading.Lock()
+        self._pending = 0  # jobs đang chạy + đang chờ
+        self._jobs_since_recycle = 0
+
+        # Readiness (xem warm_up())
+        self.ready = False
+        self.warmup_seconds: Optional[float] = None
+        self.warmup_error: Optional[str] = None
+        self.workers_warmed = 0
+
+        # Counters (xem stats())
+        self.started = time.monotonic()
+        self.submitted = 0
+        self.completed = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.recycles = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker,
+                    initargs=(self._cancel_flags, self.initializer, self.initargs)
+                )
+                self._jobs_since_recycle = 0
+            return self._pool
+
+    def recycle(self):
+        """
+        Bỏ pool hiện tại; job mới được gửi sang pool mới (tạo ở job tiếp theo)
+
+        Pool cũ không bị huỷ: jobs đang chạy và đang chờ của nó chạy nốt rồi
+        các worker cũ mới thoát.
+        """
+        with self._lock:
+            old_pool, self._pool = self._pool, None
+        if old_pool is None:
+            return
+        self.recycles += 1
+        old_pool.shutdown(wait=False, cancel_futures=False)
+
+    async def warm_up(self):
+        """
+        Khởi động tất cả worker processes (mỗi worker chạy _warm_up_worker)
+        và chờ đến khi chúng sẵn sàng nhận job
+        """
+        started = time.perf_counter()
+        try:
+            if not KOCIEMBA_AVAILABLE and TWOPHASE_AVAILABLE:
+                # Generate tables một lần ở process chính, workers chỉ mmap
+                await asyncio.to_thread(ensure_tables, TABLES_DIR)
+            pool = self._get_pool()
+            futures = [pool.submit(_worker_ready) for _ in range(self.max_workers)]
+            workers = await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+            self.workers_warmed = len({pid for pid, _ in workers})
+            errors = [error for _, error in workers if error]
+            if errors:
+                raise RuntimeError(errors[0])
+            if not SOLVER_AVAILABLE:
+                raise RuntimeError("No solver is available")
+            # Chỉ ready khi warm-up thành công: /ready giữ 503 để load balancer không gửi traffic
+            self.ready = True
+        except Exception as e:
+            self.warmup_error = str(e)
+            logger.error(f"Solver warm-up failed: {e}")
+        finally:
+            self.warmup_seconds = round(time.perf_counter() - started, 3)
+            if self.ready:
+                logger.info(f"Solver pool ready in {self.warmup_seconds}s ({self.workers_warmed} workers)")
+
+    def readiness(self) -> dict:
+        return {
+            "ready": self.ready,
+            "solver": SOLVER_NAME,
+            "solver_available": SOLVER_AVAILABLE,
+            "tables_loaded": self.workers_warmed > 0 and self.warmup_error is None,
+            "warmup_seconds": self.warmup_seconds,
+            "warmup_error": self.warmup_error,
+            "workers": self.max_workers,
+            "workers_warmed": self.workers_warmed,
+        }
+
+    async def submit(self, fn, *args, timeout: Optional[float] = None):
+        """
+        Chạy fn(*args) trong pool, trả về kết quả hoặc raise exception của fn
+
+        Hết timeout (hoặc request bị huỷ) thì bỏ kết quả và bật cancel flag
+        của job: job còn chờ trong queue bị huỷ, job đang chạy dừng ở lần
+        kiểm tra deadline kế tiếp trong worker (kociemba thì chạy nốt). Worker
+        không bị kill vì các worker khác đang chạy job của request khác. Job
+        vẫn được tính trong pending cho đến khi worker xong thật, để queue
+        limit phản ánh số worker còn bận.
+        """
+        if self._pending >= self.capacity:
+            self.rejected += 1
+            raise SolverBusyError(self.retry_after)
+
+        self._pending += 1
+        self.submitted += 1
+        submitted_at = time.monotonic()
+        if self.recycle_after and self._jobs_since_recycle >= self.recycle_after:
+            self.recycle()
+        slot = self._free_slots.pop()
+        self._cancel_flags[slot] = 0
+        try:
+            pool = self._get_pool()
+            future = pool.submit(_timed_call, slot, fn, *args)
+            self._jobs_since_recycle += 1
+        except BaseException:
+            self._free_slots.append(slot)
+            self._pending -= 1
+            raise
+        job = asyncio.wrap_future(future)
+        job.add_done_callback(partial(self._job_done, slot))
+        try:
+            # shield: wait_for huỷ lúc timeout không được huỷ job (done callback giữ pending đúng)
+            result, started, elapsed = await asyncio.wait_for(asyncio.shield(job), timeout=timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._cancel(slot, future)
+            logger.warning(f"Solver job timed out after {timeout or self.timeout}s, cancelling it")
+            raise SolverTimeoutError("Solver timed out")
+        except SolverTimeoutError:
+            # Two-phase tự dừng ở deadline trong worker
+            self.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            self._cancel(slot, future)
+            raise
+        except BrokenProcessPool:
+            # Worker chết ngoài ý muốn (vd: OOM): pool này không nhận job được nữa
+            self.errors += 1
+            if pool is self._pool:
+                self.recycle()
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        self.completed += 1
+        self.busy_seconds += elapsed
+        solver_metrics.observe("queue_wait", max(started - submitted_at, 0.0))
+        solver_metrics.observe("search", elapsed)
+        return result
+
+    def _cancel(self, slot: int, future):
+        """Bỏ job: huỷ nếu còn trong queue, không thì báo worker dừng search"""
+        if not future.cancel():
+            self._cancel_flags[slot] = 1
+
+    def _job_done(self, slot: int, job: asyncio.Future):
+        """Worker đã xong job (kể cả job mà request đã bỏ) - chạy trong event loop"""
+        if not job.cancelled():
+            job.exception()  # kết quả trễ không ai chờ: tránh warning "exception was never retrieved"
+        self._free_slots.append(slot)
+        self._pending -= 1
+
+    async def solve(self, cube_state: str, timeout: Optional[float] = None) -> str:
+        """Giải cube state (Kociemba format) trong worker process"""
+        timeout = timeout or self.timeout
+        # Worker tự dừng sớm hơn một chút so với deadline phía event loop
+        return await self.submit(_solve_in_worker, cube_state, timeout * 0.9, timeout=timeout)
+
+    async def solve_optimal(self, cube_state: str, max_length: int, timeout: Optional[float] = None) -> str:
+        """Solution ngắn nhất (IDA*), chỉ dùng với optimal_executor"""
+        timeout = timeout or self.timeout
+        return await self.submit(
+            _solve_optimal_in_worker, cube_state, max_length, timeout * 0.9, timeout=timeout
+        )
+
+    async def scramble(self, timeout: Optional[float] = None) -> str:
+        """Sinh một random-state scramble trong worker process"""
+        timeout = timeout or self.timeout
+        return await self.submit(_scramble_in_worker, timeout * 0.9, timeout=timeout)
+
+    async def solve_bounded(
+        self, cube_state: str, max_length: int, timeout: Optional[float] = None
+    ) -> Tuple[str, bool]:
+        """
+        Tìm solution <= max_length moves; hết timeout thì trả về solution
+        ngắn nhất đã tìm được với complete=False
+        """
+        timeout = timeout or self.timeout
+        return await self.submit(
+            _solve_bounded_in_worker, cube_state, max_length, timeout * 0.9, timeout=timeout
+        )
+
+    def _get_manager(self):
+        with self._lock:
+            if self._manager is None:
+                self._manager = multiprocessing.Manager()
+            return self._manager
+
+    async def solve_stream(
+        self,
+        cube_state: str,
+        max_length: int,
+        timeout: Optional[float] = None,
+        initial: Optional[str] = None,
+        poll_interval: float = 0.05,
+    ) -> AsyncIterator[Tuple[str, Optional[bool]]]:
+        """
+        Anytime search: yield (solution, None) cho mỗi solution mới ngay khi
+        worker tìm được (mỗi cái ngắn hơn cái trước), cuối cùng yield
+        (solution tốt nhất, complete)
+
+        initial: solution đã có (vd: từ cache), chỉ tìm solution ngắn hơn.
+        Raise như solve_bounded(); đóng generator sớm thì không chờ worker
+        (worker tự dừng ở deadline).
+        """
+        timeout = timeout or self.timeout
+        manager = await asyncio.to_thread(self._get_manager)
+        progress = await asyncio.to_thread(manager.Queue)
+        task = asyncio.ensure_future(self.submit(
+            _solve_stream_in_worker, cube_state, max_length, timeout * 0.9, initial, progress, timeout=timeout
+        ))
+        try:
+            while True:
+                done = task.done()
+                # Đọc hết solutions đã có (get_nowait qua Manager là một IPC call ngắn)
+                while True:
+                    try:
+                        yield progress.get_nowait(), None
+                    except queue.Empty:
+                        break
+                if done:
+                    break
+                await asyncio.wait({task}, timeout=poll_interval)
+            solution, complete = task.result()
+            yield solution, complete
+        finally:
+            if not task.done():
+                task.cancel()
+
+    def stats(self) -> dict:
+        """Queue depth, utilization và counters của pool"""
+        running = min(self._pending, self.max_workers)
+        uptime = time.monotonic() - self.started
+        return {
+            "workers": self.max_workers,
+            "running": running,
+            "queue_depth": self._pending - running,
+            "max_queue": self.max_queue,
+            "utilization": round(running / self.max_workers, 3),
+            # Tỉ lệ thời gian workers thực sự search từ khi khởi động
+            "avg_utilization": round(self.busy_seconds / (self.max_workers * uptime), 4) if uptime > 0 else 0.0,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "recycles": self.recycles,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+
+solver_executor = SolverExecutor(
+    max_workers=settings.SOLVER_WORKERS,
+    max_queue=settings.SOLVER_MAX_QUEUE,
+    timeout=settings.SOLVER_TIMEOUT_SECONDS,
+    recycle_after=settings.SOLVER_RECYCLE_AFTER,
+    retry_after=settings.SOLVER_RETRY_AFTER_SECONDS,
+)
+
+# Pool riêng cho mode=optimal (ít worker, priority thấp): search lâu không chiếm
+# chỗ của các solve thường
+optimal_executor = SolverExecutor(
+    name="optimal",
+    max_workers=settings.OPTIMAL_SOLVER_WORKERS,
+    max_queue=settings.OPTIMAL_SOLVER_MAX_QUEUE,
+    timeout=settings.OPTIMAL_SOLVER_TIMEOUT_SECONDS,
+    retry_after=settings.SOLVER_RETRY_AFTER_SECONDS,
+    initializer=_init_optimal_worker,
+    initargs=(TABLES_DIR, settings.OPTIMAL_SOLVER_NICE),
+)
+
+# Pool riêng (priority thấp) cho background refill của scramble pool: không
+# chiếm worker / queue của solve thường và không tính vào recycle của nó
+scramble_executor = SolverExecutor(
+    name="scramble",
+    max_workers=settings.SCRAMBLE_WORKERS,
+    max_queue=1,
+    timeout=settings.SOLVER_TIMEOUT_SECONDS,
+    retry_after=settings.SOLVER_RETRY_AFTER_SECONDS,
+    initializer=_init_scramble_worker,
+    initargs=(TABLES_DIR, settings.SCRAMBLE_NICE),
+)
@@ -0,0 +1,129 @@
+import functools
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence
+
+# Upper bounds (giây) của các bucket latency, bucket cuối là +Inf
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Endpoint đang xử lý (set bởi track()), để executor ghi queue wait / search time đúng endpoint.
+# asyncio task copy context khi được tạo nên giá trị đi theo cả batch items và single-flight leader.
+current_endpoint: ContextVar[str] = ContextVar("solver_endpoint", default="background")
+
+
+class Histogram:
+    """Histogram với bucket cố định (O(log buckets) mỗi observe, bộ nhớ cố định)"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Ước lượng bằng upper bound của bucket chứa quantile (không vượt quá max)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for upper, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(upper, self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for upper, n in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += n
+            buckets[str(upper)] = cumulative
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "max": round(self.max, 6),
+            **{
+                name: round(value, 6) if value is not None else None
+                for name, value in (("p50", self.quantile(0.5)), ("p95", self.quantile(0.95)), ("p99", self.quantile(0.99)))
+            },
+            "buckets": buckets,  # cumulative, dạng Prometheus (le)
+        }
+
+
+class SolverMetrics:
+    """
+    Metrics của solve path (in-process, reset khi restart)
+
+    - latency[endpoint][stage]: total, validate, queue_wait, search
+    - solution_lengths[mode]: phân bố số moves (HTM) của solution trả về
+    Số liệu của pool (queue depth, utilization, timeouts) nằm trong
+    SolverExecutor.stats(), cache trong solution_cache.stats().
+    """
+
+    def __init__(self):
+        self.latency: Dict[str, Dict[str, Histogram]] = defaultdict(lambda: defaultdict(Histogram))
+        self.solution_lengths: Dict[str, Counter] = defaultdict(Counter)
+        self.started = time.monotonic()
+
+    def observe(self, stage: str, seconds: float, endpoint: Optional[str] = None):
+        self.latency[endpoint or current_endpoint.get()][stage].observe(seconds)
+
+    @contextmanager
+    def stage(self, stage: str):
+        """Đo thời gian của một stage trong endpoint hiện tại"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    @contextmanager
+    def endpoint(self, name: str):
+        """Gắn các stage bên trong vào endpoint name và đo total latency"""
+        token = current_endpoint.set(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("total", time.perf_counter() - started, name)
+            current_endpoint.reset(token)
+
+    def track(self, name: str):
+        """Decorator cho async endpoint: with self.endpoint(name)"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with self.endpoint(name):
+                    return await fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record_solution(self, move_count: int, mode: str = "default"):
+        self.solution_lengths[mode][move_count] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "uptime_seconds": round(time.monotonic() - self.started, 1),
+            "latency": {
+                endpoint: {stage: histogram.snapshot() for stage, histogram in stages.items()}
+                for endpoint, stages in self.latency.items()
+            },
+            "solution_lengths": {
+                mode: dict(sorted(lengths.items())) for mode, lengths in self.solution_lengths.items()
+            },
+        }
+
+
+solver_metrics = SolverMetrics()
@@ -0,0 +1,81 @@
+"""
+Coordinates cho two-phase solver
+
+Mọi encoder nhận mảng NumPy 2 chiều (mỗi hàng là một cube) để có thể tính
+move tables cho toàn bộ không gian coordinate trong một lần.
+
+Phase 1: twist (2187), flip (2048), slice (495 - vị trí của 4 edge FR, FL, BL, BR)
+Phase 2: corners (8! = 40320), ud_edges (8! = 40320), slice_sorted < 24
+"""
+from math import comb
+import numpy as np
+from app.utils.cubie_cube import CubieCube
+
+N_TWIST = 3 ** 7
+N_FLIP = 2 ** 11
+N_SLICE = comb(12, 4)
+N_SLICE_SORTED = N_SLICE * 24
+N_PERM_8 = 40320
+N_SLICE_PERM = 24
+
+# C(n, k) cho n < 12, k <= 4 (dùng trong slice_sorted_coord)
+_COMB = np.array([[comb(n, k) for k in range(5)] for n in range(12)], dtype=np.int64)
+
+
+def perm_coord(perms: np.ndarray) -> np.ndarray:
+    """Lexicographic rank của mỗi hàng permutation (hàng đã sắp xếp -> 0)"""
+    perms = np.asarray(perms)
+    n = perms.shape[1]
+    rank = np.zeros(perms.shape[0], dtype=np.int64)
+    for i in range(n):
+        smaller = (perms[:, i + 1:] < perms[:, i:i + 1]).sum(axis=1)
+        rank = rank * (n - i) + smaller
+    return rank
+
+
+def twist_coord(co: np.ndarray) -> np.ndarray:
+    """Corner orientation của 7 corner đầu, cơ số 3"""
+    co = np.asarray(co, dtype=np.int64)
+    return co[:, :7] @ (3 ** np.arange(6, -1, -1, dtype=np.int64))
+
+
+def flip_coord(eo: np.ndarray) -> np.ndarray:
+    """Edge orientation của 11 edge đầu, cơ số 2"""
+    eo = np.asarray(eo, dtype=np.int64)
+    return eo[:, :11] @ (2 ** np.arange(10, -1, -1, dtype=np.int64))
+
+
+def slice_sorted_coord(ep: np.ndarray) -> np.ndarray:
+    """
+    Vị trí và thứ tự của 4 edge FR, FL, BL, BR (edge 8..11)
+
+    24 * (tổ hợp vị trí, 0..494) + (thứ tự của 4 edge, 0..23).
+    Khi 4 edge nằm trong slice (phase 2), coordinate < 24.
+    Các edge khác có thể là -1 (không quan tâm).
+    """
+    ep = np.asarray(ep, dtype=np.int64)
+    is_slice = ep >= 8
+    a = np.zeros(ep.shape[0], dtype=np.int64)
+    x = np.zeros(ep.shape[0], dtype=np.int64)
+    for j in range(11, -1, -1):
+        found = is_slice[:, j]
+        a += np.where(found, _COMB[11 - j][np.minimum(x + 1, 4)], 0)
+        x += found
+    edge4 = ep[is_slice].reshape(-1, 4) - 8
+    return 24 * a + perm_coord(edge4)
+
+
+def coords_of(cube: CubieCube) -> dict:
+    """Tất cả coordinates (phase 1 + phase 2) của một CubieCube"""
+    cp = np.array([cube.cp])
+    ep = np.array([cube.ep])
+    slice_sorted = int(slice_sorted_coord(ep)[0])
+    return {
+        "twist": int(twist_coord(np.array([cube.co]))[0]),
+        "flip": int(flip_coord(np.array([cube.eo]))[0]),
+        "slice": slice_sorted // 24,
+        "slice_sorted": slice_sorted,
+        "corners": int(perm_coord(cp)[0]),
+        # Chỉ có ý nghĩa khi cube đã ở phase 2 (edge 0..7 nằm ở vị trí 0..7)
+        "ud_edges": int(perm_coord(ep[:, :8])[0]),
+    }
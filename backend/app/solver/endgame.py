@@ -0,0 +1,282 @@
+"""
+Endgame table: mọi state cách solved <= N moves (HTM) cùng move đầu tiên
+của một solution ngắn nhất
+
+Chỉ lưu dạng canonical theo 48 symmetries (app.utils.cube_symmetry), key là
+cubie code 9 bytes big-endian (app.utils.cube_codec). File gồm header 16 bytes
+rồi các record 10 bytes sắp xếp theo key:
+
+    key (9 bytes) | depth << 5 | move index (1 byte, move theo hướng canonical)
+
+Server mở file bằng mmap và tra bằng binary search (~21 lần so sánh 9 bytes
+với N = 7), không load vào memory, không cần solver pool. Mỗi move của
+solution là một lookup; depth cho biết ngay số moves tối thiểu.
+
+    N = 6: ~170k records (1.7 MB); N = 7: ~2.2M records (22 MB)
+
+Build offline (BFS trên các state canonical, song song trên nhiều process):
+    python -m app.solver.endgame [--depth 7] [--dir DIR] [--workers N]
+"""
+import argparse
+import mmap
+import os
+import struct
+import time
+from bisect import bisect_left
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.solver.tables import DEFAULT_TABLES_DIR
+from app.utils.cube_codec import ENCODED_BYTES, encode_state
+from app.utils.cube_moves import MOVE_PERMUTATIONS, apply_moves
+from app.utils.cube_symmetry import SYMMETRIES, canonicalize, moves_from_canonical, moves_to_canonical
+from app.utils.cubie_cube import MOVE_INDEX, MOVE_NAMES, SOLVED_FACELETS
+
+ENDGAME_FILE = "endgame.bin"
+DEFAULT_DEPTH = 7
+MAX_DEPTH = 7  # depth dùng 3 bit của byte info
+
+MAGIC = b"RBENDGM1"
+HEADER = struct.Struct("<8sBxxxI")  # magic, depth, count
+RECORD_BYTES = ENCODED_BYTES + 1
+MOVE_BITS = 5
+
+_CHUNK = 20000  # số states được expand mỗi job (giới hạn bộ nhớ tạm: x18 moves x 54 bytes)
+
+
+def _inverse_move(index: int) -> int:
+    face, turn = divmod(index, 3)
+    return face * 3 + 2 - turn
+
+
+# ---------- Build ----------
+
+_MOVE_GATHERS = np.stack([MOVE_PERMUTATIONS[name] for name in MOVE_NAMES])
+_SYM_GATHERS = np.array([sym.gather for sym in SYMMETRIES], dtype=np.intp)
+_SYM_COLORS = np.tile(np.arange(256, dtype=np.uint8), (len(SYMMETRIES), 1))
+for _s, _sym in enumerate(SYMMETRIES):
+    for _old, _new in _sym.face_map.items():
+        _SYM_COLORS[_s, ord(_old)] = ord(_new)
+# move (index) theo hướng gốc -> cùng move theo hướng đã áp dụng symmetry
+_SYM_MOVES = np.array([
+    [MOVE_INDEX[moves_to_canonical([name], s)[0]] for name in MOVE_NAMES]
+    for s in range(len(SYMMETRIES))
+], dtype=np.uint8)
+# Thứ tự ký tự (B < D < F < L < R < U) -> 3 bit, so sánh 3 word = so sánh chuỗi
+_RANK = np.zeros(256, dtype=np.uint64)
+for _r, _c in enumerate(sorted(SOLVED_FACELETS[::9])):
+    _RANK[ord(_c)] = _r
+_WEIGHTS = np.uint64(1) << (np.uint64(3) * np.arange(17, -1, -1, dtype=np.uint64))
+KEY_DTYPE = np.dtype([("w0", np.uint64), ("w1", np.uint64), ("w2", np.uint64)])
+
+
+def _lex_keys(states: np.ndarray) -> np.ndarray:
+    """(n, 54) ký tự ASCII -> structured key (3 x uint64) cùng thứ tự với so sánh chuỗi"""
+    ranks = _RANK[states].reshape(-1, 3, 18)
+    words = (ranks * _WEIGHTS).sum(axis=2)
+    keys = np.empty(len(states), dtype=KEY_DTYPE)
+    keys["w0"], keys["w1"], keys["w2"] = words[:, 0], words[:, 1], words[:, 2]
+    return keys
+
+
+def _canonicalize_batch(states: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized canonicalize(): (canonical states, sym, keys), cùng kết quả với bản cho một state"""
+    best = states.copy()
+    best_keys = _lex_keys(states)
+    best_sym = np.zeros(len(states), dtype=np.intp)
+    for s in range(1, len(SYMMETRIES)):
+        candidate = _SYM_COLORS[s][states[:, _SYM_GATHERS[s]]]
+        keys = _lex_keys(candidate)
+        smaller = (keys["w0"] < best_keys["w0"]) | (keys["w0"] == best_keys["w0"]) & (
+            (keys["w1"] < best_keys["w1"]) | (keys["w1"] == best_keys["w1"]) & (keys["w2"] < best_keys["w2"])
+        )
+        best[smaller] = candidate[smaller]
+        best_keys[smaller] = keys[smaller]
+        best_sym[smaller] = s
+    return best, best_sym, best_keys
+
+
+def _expand_chunk(states: np.ndarray):
+    """
+    Mọi state con (18 moves) của states, dạng canonical và không trùng nhau,
+    kèm move (theo hướng canonical) đưa state con về state cha
+    """
+    children = states[:, _MOVE_GATHERS].reshape(-1, 54)
+    solving = np.tile([_inverse_move(m) for m in range(len(MOVE_NAMES))], len(states))
+    canonical, sym, keys = _canonicalize_batch(children)
+    keys, first = np.unique(keys, return_index=True)
+    return keys, canonical[first], _SYM_MOVES[sym[first], solving[first]]
+
+
+def _encode_chunk(states: np.ndarray) -> List[bytes]:
+    return [encode_state(row.tobytes().decode()).to_bytes(ENCODED_BYTES, "big") for row in states]
+
+
+def _map(pool: Optional[Pool], fn, chunks):
+    return pool.map(fn, chunks) if pool is not None else [fn(chunk) for chunk in chunks]
+
+
+def _chunks(array: np.ndarray) -> List[np.ndarray]:
+    return [array[i:i + _CHUNK] for i in range(0, len(array), _CHUNK)]
+
+
+def generate_endgame(depth: int = DEFAULT_DEPTH, pool: Optional[Pool] = None) -> bytes:
+    """BFS từ solved trên các state canonical, trả về nội dung file (header + records đã sort)"""
+    if not 0 <= depth <= MAX_DEPTH:
+        raise ValueError(f"Depth must be between 0 and {MAX_DEPTH}")
+    solved = np.frombuffer(SOLVED_FACELETS.encode(), dtype=np.uint8)[None, :]
+    frontier = solved
+    visited = _lex_keys(solved)
+    levels = [(solved, np.zeros(1, dtype=np.uint8))]
+
+    for d in range(1, depth + 1):
+        started = time.perf_counter()
+        results = _map(pool, _expand_chunk, _chunks(frontier))
+        keys, first = np.unique(np.concatenate([r[0] for r in results]), return_index=True)
+        states = np.concatenate([r[1] for r in results])[first]
+        moves = np.concatenate([r[2] for r in results])[first]
+
+        # Bỏ state đã có ở depth nhỏ hơn (visited luôn sorted)
+        pos = np.minimum(np.searchsorted(visited, keys), len(visited) - 1)
+        new = visited[pos] != keys
+        frontier = states[new]
+        levels.append((frontier, moves[new]))
+        visited = np.sort(np.concatenate([visited, keys[new]]))
+        print(f"  depth {d}: {len(frontier)} states, {time.perf_counter() - started:.1f}s")
+
+    records = []
+    for d, (states, moves) in enumerate(levels):
+        codes = [code for chunk in _map(pool, _encode_chunk, _chunks(states)) for code in chunk]
+        records.extend(code + bytes([d << MOVE_BITS | int(m)]) for code, m in zip(codes, moves))
+    records.sort()
+    return HEADER.pack(MAGIC, depth, len(records)) + b"".join(records)
+
+
+def build_endgame(depth: int = DEFAULT_DEPTH, directory: Optional[str] = None, workers: int = 0) -> str:
+    """Build endgame table vào directory (mặc định thư mục solver tables), trả về đường dẫn file"""
+    directory = directory or DEFAULT_TABLES_DIR
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(directory, exist_ok=True)
+    pool = Pool(workers) if workers > 1 else None
+    try:
+        data = generate_endgame(depth, pool)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    path = endgame_path(directory)
+    tmp_path = os.path.join(directory, f"{ENDGAME_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+def endgame_path(directory: Optional[str] = None) -> str:
+    return os.path.join(directory or DEFAULT_TABLES_DIR, ENDGAME_FILE)
+
+
+# ---------- Lookup ----------
+
+class _Keys:
+    """Sequence các key 9 bytes trong mmap, cho bisect"""
+
+    def __init__(self, data: mmap.mmap, count: int):
+        self.data = data
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> bytes:
+        offset = HEADER.size + i * RECORD_BYTES
+        return self.data[offset:offset + ENCODED_BYTES]
+
+
+class EndgameTable:
+    """Endgame table đã mmap (read-only, dùng chung page cache giữa các process)"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.depth, count = HEADER.unpack_from(self._data)
+        if magic != MAGIC or len(self._data) != HEADER.size + count * RECORD_BYTES:
+            raise ValueError(f"Invalid endgame table: {path}")
+        self.path = path
+        self._keys = _Keys(self._data, count)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def lookup(self, canonical: str) -> Optional[Tuple[int, str]]:
+        """(số moves tối thiểu, move đầu tiên) của state canonical (state hợp lệ), None nếu ngoài table"""
+        key = encode_state(canonical).to_bytes(ENCODED_BYTES, "big")
+        i = bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            return None
+        info = self._data[HEADER.size + i * RECORD_BYTES + ENCODED_BYTES]
+        return info >> MOVE_BITS, MOVE_NAMES[info & ((1 << MOVE_BITS) - 1)]
+
+    def solve(self, cube_state: str) -> Optional[List[str]]:
+        """
+        Solution ngắn nhất (theo hướng của caller) nếu state cách solved <= depth moves
+
+        Cube state phải đã được validate. Mỗi move một lookup: áp dụng move
+        rồi tra tiếp, depth giảm đúng 1 mỗi bước.
+        """
+        moves: List[str] = []
+        while True:
+            canonical, sym = canonicalize(cube_state)
+            found = self.lookup(canonical)
+            if found is None:
+                self.misses += 1
+                return None
+            remaining, move = found
+            if remaining == 0:
+                self.hits += 1
+                return moves
+            move = moves_from_canonical([move], sym)[0]
+            moves.append(move)
+            cube_state = apply_moves(cube_state, [move])
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "depth": self.depth,
+            "states": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+_loaded: Dict[str, EndgameTable] = {}
+
+
+def load_endgame(directory: Optional[str] = None) -> Optional[EndgameTable]:
+    """
+    Mmap endgame table, mỗi process chỉ mở một lần
+
+    Không tự build: None nếu chưa build (python -m app.solver.endgame).
+    """
+    path = endgame_path(directory)
+    if path not in _loaded:
+        if not os.path.exists(path):
+            return None
+        _loaded[path] = EndgameTable(path)
+    return _loaded[path]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the near-solved endgame table")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help=f"Số moves tối đa (HTM, <= {MAX_DEPTH})")
+    parser.add_argument("--dir", default=None, help="Output directory (mặc định: thư mục solver tables)")
+    parser.add_argument("--workers", type=int, default=0, help="Số process (0 = số CPU cores)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    print(f"Building endgame table (depth {args.depth})...")
+    path = build_endgame(args.depth, args.dir, args.workers)
+    print(f"Wrote {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB) in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,115 @@
+"""
+Optimal solver: IDA* với heuristic từ pattern databases (app.solver.pdb)
+
+Heuristic = max của corners PDB và ba PDB nhóm edge (admissible), mỗi node
+tính 18 node con một lần bằng vectorized lookup như two-phase solver.
+Chạy bằng Python nên chỉ thực tế với state cần tới khoảng 13-14 moves;
+state khó hơn sẽ hết timeout (TimeoutError).
+"""
+import time
+from typing import Callable, List, Optional
+import numpy as np
+from app.solver.coord import N_FLIP, N_TWIST, flip_coord, perm_coord, twist_coord
+from app.solver.pdb import EDGE_GROUPS, SOLVED_EDGE_COORDS, edge_group_coord, load_pdbs, lookup
+from app.solver.tables import load_tables
+from app.solver.twophase import ALLOWED_MOVES
+from app.utils.cube_validator import check_cube_state
+from app.utils.cubie_cube import MOVE_NAMES, CubieCube
+
+GODS_NUMBER = 20  # mọi state giải được trong <= 20 moves (HTM)
+
+_EDGE_PDBS = list(EDGE_GROUPS)
+_GOAL = (0, 0, 0) + tuple(SOLVED_EDGE_COORDS[name] for name in _EDGE_PDBS)
+
+
+class _IDAStar:
+    """Node = (corners, twist, flip, edges_ud_u, edges_ud_d, edges_slice)"""
+
+    def __init__(self, tables_dir: Optional[str], deadline: float,
+                 should_stop: Optional[Callable[[], bool]] = None):
+        t = load_tables(tables_dir)
+        pdbs = load_pdbs(tables_dir)
+        self.corners_move = t.corners_move
+        self.twist_move = t.twist_move
+        self.flip_move = t.flip_move
+        self.edges_move = t.slice_sorted_move
+        self.corner_pdb = pdbs["corners"]
+        self.edge_pdbs = [pdbs[name] for name in _EDGE_PDBS]
+        self.deadline = deadline
+        self.should_stop = should_stop
+        self.moves: List[int] = []
+        self.nodes = 0
+
+    def heuristic(self, node) -> int:
+        corners, twist, flip = node[:3]
+        return int(max(
+            [lookup(self.corner_pdb, corners * N_TWIST + twist)]
+            + [lookup(pdb, e * N_FLIP + flip) for pdb, e in zip(self.edge_pdbs, node[3:])]
+        ))
+
+    def search(self, node, depth: int, last_face: int) -> bool:
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and (
+            time.monotonic() > self.deadline or (self.should_stop is not None and self.should_stop())
+        ):
+            raise TimeoutError("Optimal search timed out")
+        if depth == 0:
+            return node == _GOAL
+
+        corners, twist, flip = node[:3]
+        corner_children = self.corners_move[corners].astype(np.int64)
+        twist_children = self.twist_move[twist]
+        flip_children = self.flip_move[flip]
+        edge_children = [self.edges_move[e].astype(np.int64) for e in node[3:]]
+        h = lookup(self.corner_pdb, corner_children * N_TWIST + twist_children)
+        for pdb, children in zip(self.edge_pdbs, edge_children):
+            h = np.maximum(h, lookup(pdb, children * N_FLIP + flip_children))
+
+        candidates = np.flatnonzero((h < depth) & ALLOWED_MOVES[last_face])
+        for m in candidates.tolist():
+            self.moves.append(m)
+            child = (
+                int(corner_children[m]), int(twist_children[m]), int(flip_children[m]),
+                *(int(children[m]) for children in edge_children)
+            )
+            if self.search(child, depth - 1, m // 3):
+                return True
+            self.moves.pop()
+        return False
+
+
+def _start_node(cube: CubieCube) -> tuple:
+    ep = np.array([cube.ep])
+    return (
+        int(perm_coord(np.array([cube.cp]))[0]),
+        int(twist_coord(np.array([cube.co]))[0]),
+        int(flip_coord(np.array([cube.eo]))[0]),
+        *(int(edge_group_coord(ep, EDGE_GROUPS[name])[0]) for name in _EDGE_PDBS),
+    )
+
+
+def solve_optimal(
+    cube_state: str,
+    max_length: int = GODS_NUMBER,
+    timeout: float = 60.0,
+    tables_dir: Optional[str] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> str:
+    """
+    Solution ngắn nhất (HTM) của cube state, dạng "R U2 F' ..."
+
+    Raise ValueError nếu cube state không hợp lệ hoặc không có solution
+    <= max_length moves, TimeoutError nếu quá timeout giây (hoặc should_stop()
+    trả về True),
+    FileNotFoundError nếu pattern databases chưa được build.
+    """
+    error = check_cube_state(cube_state)
+    if error:
+        raise ValueError(f"Invalid cube state: {error}")
+
+    search = _IDAStar(tables_dir, time.monotonic() + timeout, should_stop)
+    node = _start_node(CubieCube.from_facelets(cube_state))
+    for depth in range(search.heuristic(node), max_length + 1):
+        if search.search(node, depth, 6):
+            return " ".join(MOVE_NAMES[m] for m in search.moves)
+    raise ValueError(f"No solution found within {max_length} moves")
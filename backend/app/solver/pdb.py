@@ -0,0 +1,206 @@
+"""
+Pattern databases cho optimal solver (IDA*, xem app.solver.optimal)
+
+Mỗi pattern database lưu số moves tối thiểu (HTM) để giải một phần của cube,
+mỗi entry 4 bit (2 entry / byte):
+- corners: corner permutation x corner orientation (40320 x 2187 = 88M entries, 42 MB)
+- edges_ud_u / edges_ud_d / edges_slice: vị trí + thứ tự của 4 edge trong
+  một layer (U, D, hoặc slice giữa) x edge orientation (11880 x 2048, 12 MB mỗi file)
+
+Bốn coordinate nhóm edge + flip + corners xác định hoàn toàn cube, nên
+heuristic = 0 khi và chỉ khi cube đã solved.
+
+Build một lần (BFS song song trên nhiều process, dùng chung một file memmap),
+sau đó workers mở bằng np.load(mmap_mode="r") nên chỉ tốn một bản trong page cache:
+    python -m app.solver.pdb [--dir DIR] [--workers N]
+"""
+import argparse
+import os
+import time
+from multiprocessing import Pool
+from typing import Dict, Optional
+import numpy as np
+from app.solver.coord import N_FLIP, N_PERM_8, N_SLICE_SORTED, N_TWIST, slice_sorted_coord
+from app.solver.tables import DEFAULT_TABLES_DIR, SolverTables, load_tables
+
+# Các nhóm edge (theo thứ tự edge của CubieCube): UR UF UL UB | DR DF DL DB | FR FL BL BR
+EDGE_GROUPS = {
+    "edges_ud_u": (0, 1, 2, 3),
+    "edges_ud_d": (4, 5, 6, 7),
+    "edges_slice": (8, 9, 10, 11),
+}
+PDB_NAMES = ["corners"] + list(EDGE_GROUPS)
+
+_CHUNK = 1 << 20  # số states được expand mỗi lần (giới hạn bộ nhớ tạm)
+
+
+def edge_group_coord(ep: np.ndarray, group) -> np.ndarray:
+    """
+    Vị trí + thứ tự của 4 edge trong group (0..11879)
+
+    Đánh lại nhãn 4 edge của group thành 8..11 rồi dùng slice_sorted_coord,
+    nên move table của coordinate này chính là slice_sorted_move.
+    """
+    relabel = np.full(13, -1, dtype=np.int64)  # relabel[-1] = -1 cho edge "không quan tâm"
+    for k, edge in enumerate(group):
+        relabel[edge] = 8 + k
+    return slice_sorted_coord(relabel[np.asarray(ep, dtype=np.int64)])
+
+
+SOLVED_EDGE_COORDS = {
+    name: int(edge_group_coord(np.arange(12)[None, :], group)[0])
+    for name, group in EDGE_GROUPS.items()
+}
+
+
+def _pdb_spec(name: str, tables: SolverTables):
+    """(move table của coordinate a, move table của coordinate b, index của solved)"""
+    if name == "corners":
+        return tables.corners_move, tables.twist_move, 0
+    return tables.slice_sorted_move, tables.flip_move, SOLVED_EDGE_COORDS[name] * N_FLIP
+
+
+def pdb_size(name: str) -> int:
+    return N_PERM_8 * N_TWIST if name == "corners" else N_SLICE_SORTED * N_FLIP
+
+
+# ---------- Build ----------
+
+_worker_tables: Optional[SolverTables] = None
+
+
+def _init_build_worker(tables_dir: Optional[str]):
+    global _worker_tables
+    _worker_tables = load_tables(tables_dir)
+
+
+def _expand_range(args) -> int:
+    """
+    Expand mọi state có distance == depth trong [start, stop), ghi depth + 1
+    cho các state con chưa thăm
+
+    Các process cùng ghi vào một memmap: mỗi entry 1 byte và mọi process chỉ
+    ghi cùng một giá trị (depth + 1) ở level này, nên ghi trùng không sao.
+    """
+    name, dist_path, depth, start, stop = args
+    move_a, move_b, _ = _pdb_spec(name, _worker_tables)
+    n_b = move_b.shape[0]
+    dist = np.memmap(dist_path, dtype=np.int8, mode="r+", shape=(pdb_size(name),))
+    states = np.flatnonzero(dist[start:stop] == depth) + start
+    for offset in range(0, states.size, _CHUNK):
+        chunk = states[offset:offset + _CHUNK]
+        children = (move_a[chunk // n_b].astype(np.int64) * n_b + move_b[chunk % n_b]).ravel()
+        children = children[dist[children] < 0]
+        dist[children] = depth + 1
+    dist.flush()
+    return int(states.size)
+
+
+def _bfs(name: str, directory: str, tables_dir: Optional[str], pool: Optional[Pool], workers: int) -> np.ndarray:
+    """BFS từ solved, trả về mảng distance (int8) đầy đủ"""
+    size = pdb_size(name)
+    dist_path = os.path.join(directory, f"{name}.{os.getpid()}.dist.tmp")
+    dist = np.memmap(dist_path, dtype=np.int8, mode="w+", shape=(size,))
+    try:
+        dist[:] = -1
+        dist[_pdb_spec(name, load_tables(tables_dir))[2]] = 0
+        dist.flush()
+
+        step = -(-size // (workers * 8))
+        ranges = [(start, min(start + step, size)) for start in range(0, size, step)]
+        depth = 0
+        while True:
+            jobs = [(name, dist_path, depth, start, stop) for start, stop in ranges]
+            if pool is not None:
+                pool.map(_expand_range, jobs)
+            else:
+                for job in jobs:
+                    _expand_range(job)
+            if not np.any(dist == depth + 1):
+                break
+            depth += 1
+        return np.array(dist)
+    finally:
+        del dist
+        os.remove(dist_path)
+
+
+def _pack(dist: np.ndarray) -> np.ndarray:
+    """2 entry / byte: entry chẵn ở 4 bit thấp, entry lẻ ở 4 bit cao"""
+    values = dist.astype(np.uint8)
+    if values.size % 2:
+        values = np.append(values, np.uint8(0))
+    return values[0::2] | (values[1::2] << 4)
+
+
+def _pdb_path(directory: str, name: str) -> str:
+    return os.path.join(directory, f"pdb_{name}.npy")
+
+
+def build_pdbs(directory: Optional[str] = None, workers: int = 0, tables_dir: Optional[str] = None):
+    """Build tất cả pattern databases vào directory (mặc định cùng thư mục với solver tables)"""
+    directory = directory or tables_dir or DEFAULT_TABLES_DIR
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(directory, exist_ok=True)
+    load_tables(tables_dir)  # generate move tables một lần trước khi fork workers
+
+    pool = Pool(workers, initializer=_init_build_worker, initargs=(tables_dir,)) if workers > 1 else None
+    if pool is None:
+        _init_build_worker(tables_dir)
+    try:
+        for name in PDB_NAMES:
+            started = time.perf_counter()
+            dist = _bfs(name, directory, tables_dir, pool, workers)
+            tmp_path = os.path.join(directory, f"pdb_{name}.{os.getpid()}.tmp.npy")
+            np.save(tmp_path, _pack(dist))
+            os.replace(tmp_path, _pdb_path(directory, name))
+            print(f"  {name}: {dist.size} entries, max depth {int(dist.max())}, "
+                  f"{time.perf_counter() - started:.1f}s")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def pdbs_exist(directory: Optional[str] = None) -> bool:
+    directory = directory or DEFAULT_TABLES_DIR
+    return all(os.path.exists(_pdb_path(directory, name)) for name in PDB_NAMES)
+
+
+# ---------- Load ----------
+
+_loaded: Dict[str, Dict[str, np.ndarray]] = {}
+
+
+def load_pdbs(directory: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Mmap các pattern databases (packed), mỗi process chỉ load một lần
+
+    Không tự build (mất vài phút): raise FileNotFoundError nếu chưa build.
+    """
+    directory = directory or DEFAULT_TABLES_DIR
+    if directory not in _loaded:
+        if not pdbs_exist(directory):
+            raise FileNotFoundError(
+                f"Pattern databases not found in {directory}, build them with: python -m app.solver.pdb"
+            )
+        _loaded[directory] = {name: np.load(_pdb_path(directory, name), mmap_mode="r") for name in PDB_NAMES}
+    return _loaded[directory]
+
+
+def lookup(packed: np.ndarray, index):
+    """Giá trị 4 bit tại index (int hoặc mảng index)"""
+    return (packed[index >> 1] >> ((index & 1) << 2)) & 15
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build pattern databases for the optimal solver")
+    parser.add_argument("--dir", default=None, help="Output directory (mặc định: thư mục solver tables)")
+    parser.add_argument("--tables-dir", default=None, help="Thư mục solver tables (move tables)")
+    parser.add_argument("--workers", type=int, default=0, help="Số process (0 = số CPU cores)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    print("Building pattern databases...")
+    build_pdbs(args.dir, args.workers, args.tables_dir)
+    print(f"Done in {time.perf_counter() - started:.1f}s")
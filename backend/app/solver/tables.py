@@ -0,0 +1,183 @@
+"""
+Move tables và pruning tables cho two-phase solver (NumPy)
+
+Tables được generate một lần ra file .npy rồi mở bằng np.load(mmap_mode="r"):
+các worker process cùng map một file nên chỉ tốn một bản trong page cache.
+
+Generate trước (vd: khi build Docker image):
+    python -m app.solver.tables [--dir DIR]
+"""
+import argparse
+import os
+import time
+from itertools import permutations
+from typing import Dict, Optional
+import numpy as np
+from app.solver.coord import (
+    N_FLIP, N_PERM_8, N_SLICE_PERM, N_SLICE_SORTED, N_TWIST,
+    flip_coord, perm_coord, slice_sorted_coord, twist_coord,
+)
+from app.utils.cubie_cube import MOVE_CUBES, MOVE_NAMES
+
+DEFAULT_TABLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+N_MOVES = len(MOVE_NAMES)
+# Moves giữ cube trong phase 2 subgroup: U, U2, U', R2, F2, D, D2, D', L2, B2
+PHASE2_MOVES = [i for i, name in enumerate(MOVE_NAMES) if name[0] in "UD" or name[1:] == "2"]
+
+TABLE_NAMES = [
+    "twist_move", "flip_move", "slice_sorted_move", "slice_move",
+    "corners_move", "ud_edges_move",
+    "slice_twist_prune", "slice_flip_prune",
+    "slice_corners_prune", "slice_edges_prune",
+]
+
+
+def _twist_move_table() -> np.ndarray:
+    values = np.arange(N_TWIST)
+    co = np.zeros((N_TWIST, 8), dtype=np.int64)
+    for i in range(6, -1, -1):
+        co[:, i] = values % 3
+        values //= 3
+    co[:, 7] = (-co[:, :7].sum(axis=1)) % 3
+    table = np.zeros((N_TWIST, N_MOVES), dtype=np.uint16)
+    for m, move in enumerate(MOVE_CUBES):
+        table[:, m] = twist_coord((co[:, move.cp] + move.co) % 3)
+    return table
+
+
+def _flip_move_table() -> np.ndarray:
+    values = np.arange(N_FLIP)
+    eo = np.zeros((N_FLIP, 12), dtype=np.int64)
+    for i in range(10, -1, -1):
+        eo[:, i] = values % 2
+        values //= 2
+    eo[:, 11] = eo[:, :11].sum(axis=1) % 2
+    table = np.zeros((N_FLIP, N_MOVES), dtype=np.uint16)
+    for m, move in enumerate(MOVE_CUBES):
+        table[:, m] = flip_coord((eo[:, move.ep] + move.eo) % 2)
+    return table
+
+
+def _slice_sorted_move_table() -> np.ndarray:
+    positions = np.array(list(permutations(range(12), 4)))
+    ep = np.full((len(positions), 12), -1, dtype=np.int64)
+    rows = np.arange(len(positions))
+    for k in range(4):
+        ep[rows, positions[:, k]] = 8 + k
+    coords = slice_sorted_coord(ep)
+    table = np.zeros((N_SLICE_SORTED, N_MOVES), dtype=np.uint16)
+    for m, move in enumerate(MOVE_CUBES):
+        table[coords, m] = slice_sorted_coord(ep[:, move.ep])
+    return table
+
+
+def _perm8_move_table(moves, edges: bool) -> np.ndarray:
+    perms = np.array(list(permutations(range(8))), dtype=np.int64)  # hàng i có coordinate i
+    table = np.zeros((N_PERM_8, len(moves)), dtype=np.uint16)
+    for col, m in enumerate(moves):
+        gather = MOVE_CUBES[m].ep[:8] if edges else MOVE_CUBES[m].cp
+        table[:, col] = perm_coord(perms[:, gather])
+    return table
+
+
+def _pruning_table(move1: np.ndarray, move2: np.ndarray) -> np.ndarray:
+    """
+    BFS từ solved trên không gian (c1, c2), index = c1 * n2 + c2
+
+    move1, move2 phải có cùng danh sách moves (cùng số cột).
+    Giá trị là số moves tối thiểu để đưa cả hai coordinate về 0.
+    """
+    n2 = move2.shape[0]
+    dist = np.full(move1.shape[0] * n2, -1, dtype=np.int8)
+    dist[0] = 0
+    frontier = np.array([0], dtype=np.int64)
+    depth = 0
+    while frontier.size:
+        c1 = frontier // n2
+        c2 = frontier % n2
+        nxt = (move1[c1].astype(np.int64) * n2 + move2[c2]).ravel()
+        nxt = np.unique(nxt[dist[nxt] < 0])
+        depth += 1
+        dist[nxt] = depth
+        frontier = nxt
+    return dist
+
+
+def generate_tables() -> Dict[str, np.ndarray]:
+    tables = {}
+    tables["twist_move"] = _twist_move_table()
+    tables["flip_move"] = _flip_move_table()
+    tables["slice_sorted_move"] = _slice_sorted_move_table()
+    tables["slice_move"] = (tables["slice_sorted_move"][::N_SLICE_PERM] // N_SLICE_PERM).astype(np.uint16)
+    tables["corners_move"] = _perm8_move_table(range(N_MOVES), edges=False)
+    tables["ud_edges_move"] = _perm8_move_table(PHASE2_MOVES, edges=True)
+
+    tables["slice_twist_prune"] = _pruning_table(tables["slice_move"], tables["twist_move"])
+    tables["slice_flip_prune"] = _pruning_table(tables["slice_move"], tables["flip_move"])
+
+    slice2_move = tables["slice_sorted_move"][:N_SLICE_PERM, PHASE2_MOVES]
+    tables["slice_corners_prune"] = _pruning_table(slice2_move, tables["corners_move"][:, PHASE2_MOVES])
+    tables["slice_edges_prune"] = _pruning_table(slice2_move, tables["ud_edges_move"])
+    return tables
+
+
+def _table_path(directory: str, name: str) -> str:
+    return os.path.join(directory, f"{name}.npy")
+
+
+def save_tables(tables: Dict[str, np.ndarray], directory: str):
+    """Ghi từng table ra file tạm rồi rename, để process khác không đọc file dở"""
+    os.makedirs(directory, exist_ok=True)
+    for name, table in tables.items():
+        tmp_path = os.path.join(directory, f"{name}.{os.getpid()}.tmp.npy")
+        np.save(tmp_path, table)
+        os.replace(tmp_path, _table_path(directory, name))
+
+
+def tables_exist(directory: Optional[str] = None) -> bool:
+    directory = directory or DEFAULT_TABLES_DIR
+    return all(os.path.exists(_table_path(directory, name)) for name in TABLE_NAMES)
+
+
+def ensure_tables(directory: Optional[str] = None) -> str:
+    """Generate tables nếu chưa có, trả về thư mục chứa tables"""
+    directory = directory or DEFAULT_TABLES_DIR
+    if not tables_exist(directory):
+        save_tables(generate_tables(), directory)
+    return directory
+
+
+class SolverTables:
+    """Các tables đã mmap, truy cập như attribute (vd: tables.twist_move)"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        for name in TABLE_NAMES:
+            setattr(self, name, np.load(_table_path(directory, name), mmap_mode="r"))
+        # Bảng nhỏ dùng ở mỗi node của phase 2: slice_sorted < 24 với phase 2 moves
+        self.slice2_move = np.ascontiguousarray(self.slice_sorted_move[:N_SLICE_PERM, PHASE2_MOVES])
+        self.corners2_move = self.corners_move[:, PHASE2_MOVES]
+
+
+_loaded: Dict[str, SolverTables] = {}
+
+
+def load_tables(directory: Optional[str] = None) -> SolverTables:
+    """Load (và generate nếu cần) tables, mỗi process chỉ load một lần"""
+    directory = ensure_tables(directory)
+    if directory not in _loaded:
+        _loaded[directory] = SolverTables(directory)
+    return _loaded[directory]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate two-phase solver tables")
+    parser.add_argument("--dir", default=DEFAULT_TABLES_DIR, help="Output directory")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    save_tables(generate_tables(), args.dir)
+    total = sum(os.path.getsize(_table_path(args.dir, name)) for name in TABLE_NAMES)
+    print(f"Generated {len(TABLE_NAMES)} tables in {args.dir} "
+          f"({total / 1024 / 1024:.1f} MB, {time.perf_counter() - started:.1f}s)")
@@ -0,0 +1,234 @@
+"""
+Two-phase solver (Kociemba) viết bằng Python + NumPy
+
+Dùng khi thư viện kociemba (C extension) không cài được. Mỗi node của
+IDA* tính cả 18 (hoặc 10) node con một lần bằng vectorized lookup trên
+move tables và pruning tables (xem app.solver.tables).
+"""
+import time
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from app.solver.coord import N_FLIP, N_PERM_8, N_TWIST, coords_of
+from app.solver.tables import PHASE2_MOVES, SolverTables, load_tables
+from app.utils.cube_validator import check_cube_state
+from app.utils.cubie_cube import MOVE_NAMES, CubieCube
+
+PHASE1_MAX_DEPTH = 12
+PHASE2_MAX_DEPTH = 18
+DEFAULT_MAX_LENGTH = 25
+
+_MOVE_FACE = np.arange(len(MOVE_NAMES)) // 3
+_PHASE2_FACE = _MOVE_FACE[PHASE2_MOVES]
+_PHASE2_MOVE_SET = set(PHASE2_MOVES)
+
+
+def _allowed_faces(last_face: int) -> np.ndarray:
+    """Không quay cùng face liên tiếp; với 2 face đối diện chỉ cho phép thứ tự U-D, R-L, F-B"""
+    faces = np.arange(6)
+    allowed = faces != last_face
+    if last_face >= 3:
+        allowed &= faces != last_face - 3
+    return allowed
+
+
+_ALLOWED = [_allowed_faces(face) for face in range(6)] + [np.ones(6, dtype=bool)]
+# ALLOWED_MOVES[last_face]: mask 18 moves được phép sau một move của last_face (6 = chưa có move)
+ALLOWED_MOVES = [allowed[_MOVE_FACE] for allowed in _ALLOWED]
+_ALLOWED_PHASE2 = [allowed[_PHASE2_FACE] for allowed in _ALLOWED]
+
+
+class _TargetReached(Exception):
+    pass
+
+
+class _Search:
+    """
+    IDA* hai phase; mỗi solution tìm được làm giảm bound (chỉ tìm solution
+    ngắn hơn), dừng khi đạt target_length
+    """
+
+    def __init__(
+        self,
+        cube: CubieCube,
+        tables: SolverTables,
+        bound: int,
+        target_length: int,
+        deadline: float,
+        on_solution: Optional[Callable[[str], None]] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ):
+        self.cube = cube
+        self.t = tables
+        self.bound = bound  # độ dài tối đa của solution tiếp theo
+        self.target_length = target_length
+        self.deadline = deadline
+        self.on_solution = on_solution
+        self.should_stop = should_stop
+        self.best: Optional[List[int]] = None
+        self.moves: List[int] = []
+        self.nodes = 0
+
+    def _check_deadline(self):
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and (
+            time.monotonic() > self.deadline or (self.should_stop is not None and self.should_stop())
+        ):
+            raise TimeoutError("Two-phase search timed out")
+
+    def phase1(self, twist: int, flip: int, slice_: int, depth: int, last_face: int):
+        self._check_deadline()
+        if depth == 0:
+            # Nếu move cuối là phase 2 move thì solution ngắn hơn đã được thử
+            if twist == 0 and flip == 0 and slice_ == 0 and not (
+                self.moves and self.moves[-1] in _PHASE2_MOVE_SET
+            ):
+                self._start_phase2()
+            return
+
+        t = self.t
+        twists = t.twist_move[twist]
+        flips = t.flip_move[flip]
+        slices = t.slice_move[slice_].astype(np.int64)
+        h = np.maximum(
+            t.slice_twist_prune[slices * N_TWIST + twists],
+            t.slice_flip_prune[slices * N_FLIP + flips],
+        )
+        candidates = np.flatnonzero((h < depth) & ALLOWED_MOVES[last_face])
+        for m in candidates.tolist():
+            self.moves.append(m)
+            self.phase1(int(twists[m]), int(flips[m]), int(slices[m]), depth - 1, m // 3)
+            self.moves.pop()
+
+    def _start_phase2(self):
+        cube = self.cube.copy()
+        cube.apply_moves([MOVE_NAMES[m] for m in self.moves])
+        coords = coords_of(cube)
+        corners = coords["corners"]
+        ud_edges = coords["ud_edges"]
+        slice2 = coords["slice_sorted"]
+
+        max_depth = min(self.bound - len(self.moves), PHASE2_MAX_DEPTH)
+        h = max(
+            self.t.slice_corners_prune[slice2 * N_PERM_8 + corners],
+            self.t.slice_edges_prune[slice2 * N_PERM_8 + ud_edges],
+        )
+        last_face = self.moves[-1] // 3 if self.moves else 6
+        phase1_length = len(self.moves)
+        for depth in range(int(h), max_depth + 1):
+            if self.phase2(corners, ud_edges, slice2, depth, last_face):
+                self._record(list(self.moves))
+                del self.moves[phase1_length:]
+                return
+            del self.moves[phase1_length:]
+
+    def _record(self, solution: List[int]):
+        self.best = solution
+        self.bound = len(solution) - 1
+        if self.on_solution is not None:
+            self.on_solution(" ".join(MOVE_NAMES[m] for m in solution))
+        if len(solution) <= self.target_length:
+            raise _TargetReached()
+
+    def run(self, coords: dict):
+        h = max(
+            self.t.slice_twist_prune[coords["slice"] * N_TWIST + coords["twist"]],
+            self.t.slice_flip_prune[coords["slice"] * N_FLIP + coords["flip"]],
+        )
+        depth = int(h)
+        while depth <= min(PHASE1_MAX_DEPTH, self.bound):
+            self.phase1(coords["twist"], coords["flip"], coords["slice"], depth, 6)
+            depth += 1
+
+    def phase2(self, corners: int, ud_edges: int, slice2: int, depth: int, last_face: int) -> bool:
+        self._check_deadline()
+        if depth == 0:
+            return corners == 0 and ud_edges == 0 and slice2 == 0
+
+        t = self.t
+        corner_children = t.corners2_move[corners]
+        edge_children = t.ud_edges_move[ud_edges]
+        slice_children = t.slice2_move[slice2].astype(np.int64)
+        h = np.maximum(
+            t.slice_corners_prune[slice_children * N_PERM_8 + corner_children],
+            t.slice_edges_prune[slice_children * N_PERM_8 + edge_children],
+        )
+        candidates = np.flatnonzero((h < depth) & _ALLOWED_PHASE2[last_face])
+        for i in candidates.tolist():
+            m = PHASE2_MOVES[i]
+            self.moves.append(m)
+            if self.phase2(
+                int(corner_children[i]), int(edge_children[i]), int(slice_children[i]),
+                depth - 1, m // 3
+            ):
+                return True
+            self.moves.pop()
+        return False
+
+
+def solve_best(
+    cube_state: str,
+    max_length: int,
+    timeout: float = 10.0,
+    tables_dir: Optional[str] = None,
+    initial: Optional[str] = None,
+    on_solution: Optional[Callable[[str], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> Tuple[str, bool]:
+    """
+    Tìm solution <= max_length moves, liên tục tìm solution ngắn hơn
+    cho đến khi đạt max_length hoặc hết timeout (anytime search)
+
+    initial: solution đã có sẵn (vd: từ kociemba), chỉ tìm solution ngắn hơn nó.
+    on_solution được gọi với mỗi solution mới (ngắn hơn solution trước).
+    should_stop (kiểm tra cùng lúc với deadline) trả về True thì dừng như hết timeout.
+    Trả về (solution ngắn nhất tìm được, complete) - complete=False nếu
+    chưa đạt max_length. Raise ValueError nếu cube state không hợp lệ,
+    TimeoutError nếu hết timeout mà chưa có solution nào.
+    """
+    error = check_cube_state(cube_state)
+    if error:
+        raise ValueError(f"Invalid cube state: {error}")
+
+    cube = CubieCube.from_facelets(cube_state)
+    if cube.is_solved():
+        return "", True
+    if initial is not None and len(initial.split()) <= max_length:
+        return initial, True
+
+    tables = load_tables(tables_dir)
+    bound = len(initial.split()) - 1 if initial is not None else max(max_length, DEFAULT_MAX_LENGTH)
+    search = _Search(cube, tables, bound, max_length, time.monotonic() + timeout, on_solution, should_stop)
+    try:
+        search.run(coords_of(cube))
+    except _TargetReached:
+        pass
+    except TimeoutError:
+        if search.best is None and initial is None:
+            raise
+
+    if search.best is not None:
+        best = " ".join(MOVE_NAMES[m] for m in search.best)
+    elif initial is not None:
+        best = initial
+    else:
+        raise ValueError(f"No solution found within {max_length} moves")
+    return best, len(best.split()) <= max_length
+
+
+def solve(
+    cube_state: str,
+    max_length: int = DEFAULT_MAX_LENGTH,
+    timeout: float = 10.0,
+    tables_dir: Optional[str] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> str:
+    """
+    Giải cube state (Kociemba format), trả về solution dạng "R U2 F' ..."
+
+    Raise ValueError nếu cube state không hợp lệ hoặc không tìm được
+    solution <= max_length moves, TimeoutError nếu quá timeout giây.
+    """
+    solution, complete = solve_best(cube_state, max_length, timeout, tables_dir, should_stop=should_stop)
+    if not complete:
+        raise TimeoutError("Two-phase search timed out")
+    return solution
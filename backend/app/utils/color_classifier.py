@@ -0,0 +1,241 @@
+"""
+Phân loại màu sticker khi scan cube: constrained k-means (NumPy, vectorized theo batch)
+
+Input mỗi scan: 54 màu đã sample, theo thứ tự facelet của cube state
+(URFDLB, mỗi face 9 sticker). Ràng buộc của cube được đưa vào k-means:
+- 6 cluster, center sticker (index 4, 13, 22, 31, 40, 49) cố định vào cluster
+  của face đó và là centroid ban đầu (nếu không có centroids từ calibration)
+- Mỗi cluster đúng 9 sticker: assignment = greedy theo khoảng cách (có
+  capacity), sau đó đổi chỗ từng cặp sticker khi tổng khoảng cách giảm
+
+Khoảng cách là Delta E (CIE76) trong Lab, cùng công thức với color_utils.dart.
+Kết quả luôn đủ 9 sticker mỗi màu; nếu cube state vẫn không giải được (vd:
+hai sticker gần màu nhau bị đổi chỗ) thì thử đổi chỗ từng cặp sticker có
+confidence thấp nhất, chọn cặp tốn ít khoảng cách nhất mà cho state hợp lệ.
+
+Centroids học từ các scan trước (color profile) dùng làm centroids ban đầu
+thì thường hội tụ sau 1-2 vòng; align_centroids đổi thứ tự của chúng theo
+center sticker vì user có thể cầm cube theo hướng khác lúc học.
+"""
+from typing import List, Optional
+import numpy as np
+from app.utils.cube_validator import check_cube_state
+
+FACES = "URFDLB"
+N_STICKERS = 54
+N_FACES = 6
+STICKERS_PER_FACE = 9
+CENTER_INDICES = np.arange(N_FACES) * STICKERS_PER_FACE + 4
+
+DEFAULT_MAX_ITERATIONS = 10
+CONVERGENCE_TOLERANCE = 0.5  # Delta E: centroids dịch chuyển ít hơn thì dừng
+REPAIR_CANDIDATES = 12  # số sticker confidence thấp nhất được thử đổi chỗ
+
+
+def hsv_to_rgb(hsv: np.ndarray) -> np.ndarray:
+    """HSV (h: 0..360, s, v: 0..1, như HSVColor của Flutter) -> RGB 0..255"""
+    hsv = np.asarray(hsv, dtype=np.float64)
+    h = (hsv[..., 0] % 360.0) / 60.0
+    s = np.clip(hsv[..., 1], 0.0, 1.0)
+    v = np.clip(hsv[..., 2], 0.0, 1.0)
+    c = v * s
+    x = c * (1 - np.abs(h % 2 - 1))
+    m = v - c
+    sector = np.floor(h).astype(np.int64) % 6
+    zeros = np.zeros_like(c)
+    # (r, g, b) theo từng sector 60°
+    table = np.stack([
+        np.stack([c, x, zeros], -1), np.stack([x, c, zeros], -1), np.stack([zeros, c, x], -1),
+        np.stack([zeros, x, c], -1), np.stack([x, zeros, c], -1), np.stack([c, zeros, x], -1),
+    ], axis=-2)
+    rgb = np.take_along_axis(table, sector[..., None, None], axis=-2)[..., 0, :]
+    return (rgb + m[..., None]) * 255.0
+
+
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """RGB 0..255 (sRGB, D65) -> CIE Lab, shape [..., 3]"""
+    c = np.clip(np.asarray(rgb, dtype=np.float64), 0.0, 255.0) / 255.0
+    c = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+    xyz = c @ np.array([
+        [0.4124564, 0.2126729, 0.0193339],
+        [0.3575761, 0.7151522, 0.1191920],
+        [0.1804375, 0.0721750, 0.9503041],
+    ]) / np.array([0.95047, 1.0, 1.08883])
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16.0 / 116.0)
+    return np.stack([
+        116.0 * f[..., 1] - 16.0,
+        500.0 * (f[..., 0] - f[..., 1]),
+        200.0 * (f[..., 1] - f[..., 2]),
+    ], axis=-1)
+
+
+def _distances(lab: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """(B, 54, 3) x (B, 6, 3) -> Delta E (B, 54, 6)"""
+    return np.linalg.norm(lab[:, :, None, :] - centroids[:, None, :, :], axis=-1)
+
+
+def _balanced_assign(dist: np.ndarray) -> np.ndarray:
+    """
+    Greedy assignment mỗi cluster đúng 9 sticker (center cố định)
+
+    Duyệt các cặp (sticker, cluster) theo khoảng cách tăng dần, cùng lúc cho
+    cả batch. Luôn gán đủ: cluster còn chỗ ở cuối thì cũng còn chỗ khi cặp
+    của sticker chưa gán với nó được duyệt.
+    """
+    batch = dist.shape[0]
+    rows = np.arange(batch)
+    labels = np.full((batch, N_STICKERS), -1, dtype=np.int64)
+    labels[:, CENTER_INDICES] = np.arange(N_FACES)
+    capacity = np.full((batch, N_FACES), STICKERS_PER_FACE - 1)
+
+    pair_dist = dist.copy()
+    pair_dist[:, CENTER_INDICES, :] = np.inf
+    order = np.argsort(pair_dist.reshape(batch, -1), axis=1, kind="stable")
+    n_pairs = (N_STICKERS - N_FACES) * N_FACES
+    for pair in order[:, :n_pairs].T:
+        sticker, cluster = pair // N_FACES, pair % N_FACES
+        free = (labels[rows, sticker] < 0) & (capacity[rows, cluster] > 0)
+        labels[rows[free], sticker[free]] = cluster[free]
+        capacity[rows[free], cluster[free]] -= 1
+    return labels
+
+
+def _refine_swaps(dist: np.ndarray, labels: np.ndarray, max_rounds: int = N_STICKERS) -> np.ndarray:
+    """Mỗi vòng đổi chỗ cặp sticker giảm tổng khoảng cách nhiều nhất (mỗi scan), đến khi không còn cặp nào"""
+    batch = dist.shape[0]
+    rows = np.arange(batch)
+    not_center = np.ones(N_STICKERS, dtype=bool)
+    not_center[CENTER_INDICES] = False
+    movable = not_center[:, None] & not_center[None, :]
+    for _ in range(max_rounds):
+        current = np.take_along_axis(dist, labels[:, :, None], axis=2)[:, :, 0]
+        # cross[b, i, j] = khoảng cách từ sticker i tới cluster của sticker j
+        cross = np.take_along_axis(dist, np.broadcast_to(labels[:, None, :], (batch, N_STICKERS, N_STICKERS)), axis=2)
+        gain = current[:, :, None] + current[:, None, :] - cross - cross.transpose(0, 2, 1)
+        gain = np.where(movable, gain, -np.inf).reshape(batch, -1)
+        best = gain.argmax(axis=1)
+        active = gain[rows, best] > 1e-9
+        if not active.any():
+            break
+        r, i, j = rows[active], best[active] // N_STICKERS, best[active] % N_STICKERS
+        labels[r, i], labels[r, j] = labels[r, j], labels[r, i].copy()
+    return labels
+
+
+def _confidence(dist: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """(d2 - d1) / (d2 + d1): d1 = tới cluster được gán, d2 = tới cluster gần nhất còn lại; 0 nếu bị ép vào cluster xa hơn"""
+    assigned = np.take_along_axis(dist, labels[:, :, None], axis=2)[:, :, 0]
+    others = dist.copy()
+    np.put_along_axis(others, labels[:, :, None], np.inf, axis=2)
+    nearest_other = others.min(axis=2)
+    return np.clip((nearest_other - assigned) / (nearest_other + assigned + 1e-9), 0.0, 1.0)
+
+
+def align_centroids(centroids: np.ndarray, anchors: np.ndarray) -> np.ndarray:
+    """
+    Đổi thứ tự 6 centroids (6, 3) cho khớp với anchors (..., 6, 3)
+
+    Kết quả [..., k] là centroid được ghép với anchors[..., k]: ghép greedy
+    theo cặp gần nhất trước (mỗi centroid dùng một lần).
+    """
+    centroids = np.asarray(centroids, dtype=np.float64)
+    anchors = np.asarray(anchors, dtype=np.float64)
+    flat = anchors.reshape(-1, N_FACES, 3)
+    aligned = np.empty_like(flat)
+    # dist[b, k, c] = Delta E giữa anchor k và centroid c
+    dist = np.linalg.norm(flat[:, :, None, :] - centroids[None, None, :, :], axis=-1)
+    for b in range(flat.shape[0]):
+        free_anchors, free_centroids = set(range(N_FACES)), set(range(N_FACES))
+        for pair in np.argsort(dist[b], axis=None, kind="stable"):
+            k, c = divmod(int(pair), N_FACES)
+            if k in free_anchors and c in free_centroids:
+                aligned[b, k] = centroids[c]
+                free_anchors.discard(k)
+                free_centroids.discard(c)
+    return aligned.reshape(anchors.shape)
+
+
+def face_means(lab: np.ndarray, cube_state: str) -> np.ndarray:
+    """Màu Lab trung bình của từng face (URFDLB) theo cube state đã xác nhận, (54, 3) -> (6, 3)"""
+    labels = np.array([FACES.index(c) for c in cube_state])
+    members = labels[:, None] == np.arange(N_FACES)
+    return members.T.astype(np.float64) @ np.asarray(lab, dtype=np.float64) / members.sum(axis=0)[:, None]
+
+
+def _to_state(labels: np.ndarray) -> str:
+    return "".join(FACES[label] for label in labels)
+
+
+def _repair(labels: np.ndarray, dist: np.ndarray, confidence: np.ndarray):
+    """
+    State không giải được: thử đổi chỗ các cặp sticker (khác màu) có
+    confidence thấp nhất, ít tốn khoảng cách nhất trước
+
+    Trả về (labels, error, repaired) - error là None nếu state hợp lệ.
+    """
+    error = check_cube_state(_to_state(labels))
+    if error is None:
+        return labels, None, False
+
+    candidates = [i for i in np.argsort(confidence) if i not in CENTER_INDICES][:REPAIR_CANDIDATES]
+    swaps = []
+    for a, i in enumerate(candidates):
+        for j in candidates[a + 1:]:
+            li, lj = labels[i], labels[j]
+            if li != lj:
+                swaps.append((dist[i, lj] + dist[j, li] - dist[i, li] - dist[j, lj], i, j))
+    for _, i, j in sorted(swaps):
+        repaired = labels.copy()
+        repaired[i], repaired[j] = labels[j], labels[i]
+        if check_cube_state(_to_state(repaired)) is None:
+            return repaired, None, True
+    return labels, error, False
+
+
+def classify_stickers(
+    lab: np.ndarray,
+    initial_centroids: Optional[np.ndarray] = None,
+    max_iterations: int = DEFAULT_MAX_ITERATIONS,
+) -> List[dict]:
+    """
+    Constrained k-means cho một batch scan
+
+    lab: (B, 54, 3) màu Lab theo thứ tự facelet; initial_centroids: (B, 6, 3)
+    hoặc (6, 3) theo thứ tự URFDLB (mặc định: màu của các center sticker).
+    Trả về mỗi scan một dict: cube_state, is_valid, error, repaired,
+    confidence (54 giá trị 0..1), iterations, centroids (Lab, 6 x 3).
+    """
+    lab = np.asarray(lab, dtype=np.float64)
+    if lab.ndim != 3 or lab.shape[1:] != (N_STICKERS, 3):
+        raise ValueError(f"Expected colors of shape (batch, {N_STICKERS}, 3), got {lab.shape}")
+    batch = lab.shape[0]
+    if initial_centroids is None:
+        centroids = lab[:, CENTER_INDICES].copy()
+    else:
+        centroids = np.broadcast_to(np.asarray(initial_centroids, dtype=np.float64), (batch, N_FACES, 3)).copy()
+
+    for iterations in range(1, max_iterations + 1):
+        dist = _distances(lab, centroids)
+        labels = _refine_swaps(dist, _balanced_assign(dist))
+        members = labels[:, :, None] == np.arange(N_FACES)
+        updated = np.einsum("bsk,bsc->bkc", members, lab) / STICKERS_PER_FACE
+        shift = np.linalg.norm(updated - centroids, axis=-1).max()
+        centroids = updated
+        if shift < CONVERGENCE_TOLERANCE:
+            break
+
+    confidence = _confidence(dist, labels)
+    results = []
+    for b in range(batch):
+        scan_labels, error, repaired = _repair(labels[b], dist[b], confidence[b])
+        scan_confidence = confidence[b] if not repaired else _confidence(dist[b:b + 1], scan_labels[None])[0]
+        results.append({
+            "cube_state": _to_state(scan_labels),
+            "is_valid": error is None,
+            "error": error,
+            "repaired": repaired,
+            "confidence": np.round(scan_confidence, 4).tolist(),
+            "iterations": iterations,
+            "centroids": np.round(centroids[b], 3).tolist(),
+        })
+    return results
@@ -0,0 +1,124 @@
+"""
+Mã hoá cube state (đã validate) thành cubie coordinates
+
+    code = ((cp * 3^7 + co) * 12! + ep) * 2^11 + eo   (< 2^67, vừa 9 bytes)
+
+- cp, ep: lexicographic rank của corner / edge permutation
+- co, eo: orientation của 7 corner / 11 edge đầu (cái cuối suy ra được)
+
+Dùng làm key cho cache và storage thay cho chuỗi 54 ký tự: int so sánh và
+hash rẻ hơn, key dạng base64 (12 ký tự) dùng được trong URL/API.
+Chỉ state giải được mới mã hoá được (center cố định, orientation/parity hợp lệ).
+"""
+import base64
+import binascii
+from math import factorial
+from typing import List
+from app.utils.cubie_cube import CubieCube, CubeStateError
+
+N_CORNER_PERM = factorial(8)
+N_CORNER_ORI = 3 ** 7
+N_EDGE_PERM = factorial(12)
+N_EDGE_ORI = 2 ** 11
+N_CODES = N_CORNER_PERM * N_CORNER_ORI * N_EDGE_PERM * N_EDGE_ORI
+
+ENCODED_BYTES = 9
+KEY_LENGTH = 12  # base64 của 9 bytes, không cần padding
+
+
+def _rank(perm: List[int]) -> int:
+    rank = 0
+    n = len(perm)
+    for i in range(n):
+        rank = rank * (n - i) + sum(1 for x in perm[i + 1:] if x < perm[i])
+    return rank
+
+
+def _unrank(rank: int, n: int) -> List[int]:
+    digits = []
+    for base in range(1, n + 1):
+        digits.append(rank % base)
+        rank //= base
+    remaining = list(range(n))
+    return [remaining.pop(d) for d in reversed(digits)]
+
+
+def encode_cubie(cube: CubieCube) -> int:
+    """CubieCube (đã verify) -> int trong [0, N_CODES)"""
+    co = 0
+    for o in cube.co[:7]:
+        co = co * 3 + o
+    eo = 0
+    for o in cube.eo[:11]:
+        eo = eo * 2 + o
+    return ((_rank(cube.cp) * N_CORNER_ORI + co) * N_EDGE_PERM + _rank(cube.ep)) * N_EDGE_ORI + eo
+
+
+def decode_cubie(code: int) -> CubieCube:
+    """Ngược lại của encode_cubie; raise ValueError nếu code nằm ngoài phạm vi"""
+    if not 0 <= code < N_CODES:
+        raise ValueError("Invalid cube code")
+    code, eo_value = divmod(code, N_EDGE_ORI)
+    code, ep_rank = divmod(code, N_EDGE_PERM)
+    cp_rank, co_value = divmod(code, N_CORNER_ORI)
+
+    co = []
+    for _ in range(7):
+        co_value, o = divmod(co_value, 3)
+        co.append(o)
+    co.reverse()
+    co.append(-sum(co) % 3)
+    eo = []
+    for _ in range(11):
+        eo_value, o = divmod(eo_value, 2)
+        eo.append(o)
+    eo.reverse()
+    eo.append(sum(eo) % 2)
+    return CubieCube(_unrank(cp_rank, 8), co, _unrank(ep_rank, 12), eo)
+
+
+def encode_state(cube_state: str) -> int:
+    """Facelet string -> code; raise CubeStateError nếu state không giải được"""
+    cube = CubieCube.from_facelets(cube_state)
+    cube.verify()
+    return encode_cubie(cube)
+
+
+def decode_state(code: int) -> str:
+    """
+    Code -> facelet string
+
+    Raise ValueError nếu code nằm ngoài phạm vi hoặc không phải state
+    giải được (parity sai).
+    """
+    cube = decode_cubie(code)
+    try:
+        cube.verify()
+    except CubeStateError as e:
+        raise ValueError(f"Invalid cube code: {e.reason}")
+    return cube.to_facelets()
+
+
+def code_to_key(code: int) -> str:
+    return base64.urlsafe_b64encode(code.to_bytes(ENCODED_BYTES, "big")).decode()
+
+
+def key_to_code(key: str) -> int:
+    """Raise ValueError nếu key không phải base64 của 9 bytes"""
+    if len(key) != KEY_LENGTH:
+        raise ValueError("Invalid cube key")
+    try:
+        data = base64.b64decode(key, altchars=b"-_", validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError("Invalid cube key")
+    return int.from_bytes(data, "big")
+
+
+def state_to_key(cube_state: str) -> str:
+    """Facelet string -> key 12 ký tự (URL-safe)"""
+    return code_to_key(encode_state(cube_state))
+
+
+def key_to_state(key: str) -> str:
+    """Key 12 ký tự -> facelet string; raise ValueError nếu key không hợp lệ"""
+    return decode_state(key_to_code(key))
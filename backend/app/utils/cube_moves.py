@@ -0,0 +1,234 @@
+"""
+Move engine ở mức facelet: mỗi move là một gather permutation 54 phần tử
+
+    new_state[i] = state[perm[i]]
+
+Áp dụng move A rồi B tương đương một gather duy nhất A[B], nên cả một
+sequence được precompose thành một permutation (có cache) và áp dụng lên
+một state hoặc cả batch state (mảng NumPy N x 54) bằng một phép gather.
+
+Solver chỉ dùng 18 face moves (MOVE_PERMUTATIONS). Moves của player
+(parse_moves(..., extended=True)) còn có slice (M, E, S), wide (Rw, hoặc r)
+và rotation (x, y, z): các move này làm center đổi chỗ, nên solves() coi
+cube là solved khi mỗi face một màu, ở bất kỳ hướng nào.
+"""
+import base64
+import binascii
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from app.utils.cube_symmetry import FACE_NORMALS, FACELET_NORMALS, FACELET_POSITIONS, FACELET_INDEX
+from app.utils.cubie_cube import FACES, MOVE_INDEX, MOVE_NAMES, SOLVED_FACELETS
+
+IDENTITY = np.arange(54, dtype=np.intp)
+SOLVED_ARRAY = np.frombuffer(SOLVED_FACELETS.encode(), dtype=np.uint8)
+
+Moves = Union[str, Sequence[str]]
+
+
+def _quarter_turn_gather(face: str, layers: Tuple[int, ...] = (1,)) -> np.ndarray:
+    """
+    Quay 90° theo chiều kim đồng hồ (nhìn từ ngoài vào face) các layer có
+    n.pos trong layers: (1,) = face, (0,) = slice giữa, (1, 0) = wide,
+    (1, 0, -1) = cả cube
+    """
+    n = FACE_NORMALS[face]
+
+    def rotate(v):
+        # Quay -90° quanh trục n: v -> (n.v) n - n x v
+        cross = (n[1] * v[2] - n[2] * v[1], n[2] * v[0] - n[0] * v[2], n[0] * v[1] - n[1] * v[0])
+        dot = n[0] * v[0] + n[1] * v[1] + n[2] * v[2]
+        return tuple(dot * a - c for a, c in zip(n, cross))
+
+    gather = IDENTITY.copy()
+    for i, (pos, normal) in enumerate(zip(FACELET_POSITIONS, FACELET_NORMALS)):
+        if pos[0] * n[0] + pos[1] * n[1] + pos[2] * n[2] in layers:
+            gather[FACELET_INDEX[(rotate(pos), rotate(normal))]] = i
+    return gather
+
+
+def _build_move_permutations(layers: Tuple[int, ...] = (1,), axes: Optional[dict] = None) -> dict:
+    """axes: tên move -> face xác định trục và chiều quay (mặc định: 6 face)"""
+    perms = {}
+    for name, face in (axes or {face: face for face in FACES}).items():
+        quarter = _quarter_turn_gather(face, layers)
+        perm = IDENTITY
+        for suffix in ("", "2", "'"):
+            perm = perm[quarter]
+            perms[name + suffix] = perm
+    return perms
+
+
+MOVE_PERMUTATIONS = _build_move_permutations()
+
+# Slice theo chiều của L, D, F; rotation theo chiều của R, U, F (quy ước WCA)
+SLICE_AXES = {"M": "L", "E": "D", "S": "F"}
+ROTATION_AXES = {"x": "R", "y": "U", "z": "F"}
+EXTENDED_MOVE_PERMUTATIONS = {
+    **MOVE_PERMUTATIONS,
+    **_build_move_permutations((0,), SLICE_AXES),
+    **_build_move_permutations((1, 0), {face + "w": face for face in FACES}),
+    **_build_move_permutations((1, 0, -1), ROTATION_AXES),
+}
+for _perm in EXTENDED_MOVE_PERMUTATIONS.values():
+    _perm.setflags(write=False)
+
+
+def parse_moves(moves: Moves, extended: bool = False) -> List[str]:
+    """
+    Chuẩn hoá move sequence (chuỗi cách nhau bởi khoảng trắng hoặc list)
+    về dạng "R", "R'", "R2". Raise ValueError nếu có move không hợp lệ.
+
+    extended=True: nhận thêm slice (M, E, S), wide ("Rw" hoặc "r", chuẩn
+    hoá thành "Rw") và rotation (x, y, z) - moves của player, không dùng
+    cho solver.
+    """
+    tokens = moves.split() if isinstance(moves, str) else list(moves)
+    valid = EXTENDED_MOVE_PERMUTATIONS if extended else MOVE_PERMUTATIONS
+    result = []
+    for token in tokens:
+        move = token.strip().replace("’", "'")
+        if move.endswith("2'"):
+            move = move[:-1]
+        if extended and move[:1] in "urfdlb" and move[:1]:
+            move = move[0].upper() + "w" + move[1:]
+        if move not in valid:
+            raise ValueError(f"Invalid move: {token}")
+        result.append(move)
+    return result
+
+
+def invert_moves(moves: Moves) -> List[str]:
+    """Sequence đảo ngược (undo)"""
+    inverse = {"": "'", "'": "", "2": "2"}
+    return [m[0] + inverse[m[1:]] for m in reversed(parse_moves(moves))]
+
+
+def _face_equivalent(move: str) -> Tuple[List[str], Optional[str]]:
+    """Slice / wide move = face moves cùng trục + một rotation (vd: Rw = L x, M = L' R x')"""
+    base, suffix = (move[:2], move[2:]) if move[1:2] == "w" else (move[:1], move[1:])
+    inverse = {"": "'", "'": "", "2": "2"}
+    rotation = {face: name for name, face in ROTATION_AXES.items()}
+    opposite = dict(zip(FACES, "DLBURF"))
+    if base in SLICE_AXES:
+        face = SLICE_AXES[base]
+        faces = [face + inverse[suffix], opposite[face] + suffix]
+        if face in rotation:
+            return faces, rotation[face] + suffix
+        return faces, rotation[opposite[face]] + inverse[suffix]
+    if base[1:] == "w":
+        face = base[0]
+        if face in rotation:
+            return [opposite[face] + suffix], rotation[face] + suffix
+        return [opposite[face] + suffix], rotation[opposite[face]] + inverse[suffix]
+    if base in ROTATION_AXES:
+        return [], move
+    return [move], None
+
+
+def to_face_moves(moves: Sequence[str]) -> List[str]:
+    """
+    Moves của player (parse_moves(..., extended=True)) -> chỉ gồm 18 face
+    moves, theo hướng cầm cube ban đầu
+
+    Slice / wide move được thay bằng face moves + rotation, rotation chỉ
+    đổi tên face của các move sau đó. Kết quả khác sequence gốc đúng một
+    rotation của cả cube nên cùng solve (hoặc không solve) một state.
+    """
+    frame = IDENTITY  # hướng hiện tại: rotation đã áp dụng, dạng gather
+    result = []
+    for move in moves:
+        faces, rotation = _face_equivalent(move)
+        for face_move in faces:
+            # Face đang ở vị trí của face_move[0] là face nào của hướng ban đầu
+            current = SOLVED_ARRAY[frame].tobytes().decode()
+            result.append(current[4 + 9 * FACES.index(face_move[0])] + face_move[1:])
+        if rotation is not None:
+            frame = frame[EXTENDED_MOVE_PERMUTATIONS[rotation]]
+    return result
+
+
+@lru_cache(maxsize=4096)
+def _compose_cached(moves: Tuple[str, ...]) -> np.ndarray:
+    perm = IDENTITY
+    for move in moves:
+        perm = perm[MOVE_PERMUTATIONS[move]]
+    perm.setflags(write=False)
+    return perm
+
+
+def compose(moves: Moves) -> np.ndarray:
+    """Precompose sequence thành một gather permutation (cache theo sequence)"""
+    return _compose_cached(tuple(parse_moves(moves)))
+
+
+def to_array(states: Union[str, Iterable[str]]) -> np.ndarray:
+    """Facelet string -> mảng uint8 (54,), list strings -> (N, 54)"""
+    if isinstance(states, str):
+        return np.frombuffer(states.encode(), dtype=np.uint8)
+    return np.frombuffer("".join(states).encode(), dtype=np.uint8).reshape(-1, 54)
+
+
+def to_states(array: np.ndarray) -> List[str]:
+    return [row.tobytes().decode() for row in np.atleast_2d(array)]
+
+
+def apply_moves(cube_state: str, moves: Moves) -> str:
+    return to_array(cube_state)[compose(moves)].tobytes().decode()
+
+
+def apply_moves_batch(states: np.ndarray, moves: Moves) -> np.ndarray:
+    """Áp dụng cùng một sequence lên batch states (N x 54) bằng một gather"""
+    return states[..., compose(moves)]
+
+
+def state_after(moves: Moves) -> str:
+    """Cube state nhận được khi áp dụng moves lên cube đã giải (vd: scramble)"""
+    return SOLVED_ARRAY[compose(moves)].tobytes().decode()
+
+
+def is_solved(cube_state: str) -> bool:
+    return cube_state == SOLVED_FACELETS
+
+
+def solves(cube_state: str, moves: Sequence[str]) -> bool:
+    """
+    Kiểm tra moves (đã parse_moves, có thể extended) có đưa cube_state về
+    solved không - mỗi face một màu, ở bất kỳ hướng nào (sau rotation /
+    slice moves center không còn ở vị trí ban đầu)
+
+    Compose trực tiếp từ EXTENDED_MOVE_PERMUTATIONS, không qua cache của
+    compose(): sequence của player hầu như không lặp lại, cache chỉ bị đẩy
+    mất entry của scramble.
+    """
+    perm = IDENTITY
+    for move in moves:
+        perm = perm[EXTENDED_MOVE_PERMUTATIONS[move]]
+    faces = to_array(cube_state)[perm].reshape(6, 9)
+    return bool((faces == faces[:, 4:5]).all())
+
+
+def pack_moves(moves: Sequence[str]) -> bytes:
+    """Sequence (đã parse_moves) -> bytes, 1 byte mỗi move (index trong MOVE_NAMES)"""
+    return bytes(MOVE_INDEX[m] for m in moves)
+
+
+def unpack_moves(data: bytes) -> List[str]:
+    """Ngược lại của pack_moves; raise ValueError nếu có byte không phải move"""
+    if any(b >= len(MOVE_NAMES) for b in data):
+        raise ValueError("Invalid packed moves")
+    return [MOVE_NAMES[b] for b in data]
+
+
+def moves_to_token(moves: Sequence[str]) -> str:
+    """Sequence (đã parse_moves) -> token ngắn, URL-safe"""
+    return base64.urlsafe_b64encode(pack_moves(moves)).decode().rstrip("=")
+
+
+def moves_from_token(token: str) -> List[str]:
+    """Ngược lại của moves_to_token; raise ValueError nếu token không hợp lệ"""
+    try:
+        data = base64.b64decode(token + "=" * (-len(token) % 4), altchars=b"-_", validate=True)
+        return unpack_moves(data)
+    except (binascii.Error, ValueError):
+        raise ValueError("Invalid move token")
@@ -0,0 +1,156 @@
+"""
+48 symmetries của Rubik's Cube (24 rotations x reflection) ở mức facelet
+
+Cùng một position có thể tới server dưới nhiều dạng khác nhau (user cầm cube
+theo hướng khác khi scan). Mỗi symmetry là một phép biến đổi không gian
+(signed permutation matrix) kèm đổi nhãn màu theo center, nên kết quả vẫn là
+một facelet string Kociemba hợp lệ.
+
+canonicalize() trả về representative nhỏ nhất (theo thứ tự chuỗi) cùng index
+của symmetry; solution của dạng canonical được map ngược về hướng của caller
+bằng moves_from_canonical().
+"""
+from itertools import permutations, product
+from typing import List, Tuple
+from app.utils.cubie_cube import FACES
+
+# Hệ trục: x = phải (R), y = trên (U), z = trước (F)
+FACE_NORMALS = {
+    "U": (0, 1, 0), "R": (1, 0, 0), "F": (0, 0, 1),
+    "D": (0, -1, 0), "L": (-1, 0, 0), "B": (0, 0, -1),
+}
+
+
+def _facelet_geometry() -> Tuple[List[Tuple[int, int, int]], List[Tuple[int, int, int]]]:
+    """Vị trí cubie (x, y, z trong -1..1) và normal của từng facelet 0..53"""
+    positions = []
+    normals = []
+    for face in FACES:
+        for r in range(3):
+            for c in range(3):
+                if face == "U":
+                    pos = (c - 1, 1, r - 1)
+                elif face == "R":
+                    pos = (1, 1 - r, 1 - c)
+                elif face == "F":
+                    pos = (c - 1, 1 - r, 1)
+                elif face == "D":
+                    pos = (c - 1, -1, 1 - r)
+                elif face == "L":
+                    pos = (-1, 1 - r, c - 1)
+                else:  # B
+                    pos = (1 - c, 1 - r, -1)
+                positions.append(pos)
+                normals.append(FACE_NORMALS[face])
+    return positions, normals
+
+
+FACELET_POSITIONS, FACELET_NORMALS = _facelet_geometry()
+FACELET_INDEX = {
+    (pos, normal): i
+    for i, (pos, normal) in enumerate(zip(FACELET_POSITIONS, FACELET_NORMALS))
+}
+_NORMAL_FACE = {normal: face for face, normal in FACE_NORMALS.items()}
+
+
+def _apply_matrix(matrix, vector) -> Tuple[int, int, int]:
+    return tuple(sum(matrix[r][k] * vector[k] for k in range(3)) for r in range(3))
+
+
+def facelet_permutation(matrix) -> List[int]:
+    """perm[i] = facelet mà facelet i di chuyển tới dưới phép biến đổi matrix"""
+    return [
+        FACELET_INDEX[(_apply_matrix(matrix, pos), _apply_matrix(matrix, normal))]
+        for pos, normal in zip(FACELET_POSITIONS, FACELET_NORMALS)
+    ]
+
+
+class Symmetry:
+    """Một symmetry: facelet gather + đổi nhãn màu + ánh xạ face của moves"""
+
+    __slots__ = ("matrix", "gather", "color_table", "face_map", "inverse_face_map", "is_reflection")
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        perm = facelet_permutation(matrix)
+        # transformed[perm[i]] = relabel(facelets[i])  =>  transformed[j] = relabel(facelets[gather[j]])
+        self.gather = [0] * 54
+        for i, j in enumerate(perm):
+            self.gather[j] = i
+        self.face_map = {
+            face: _NORMAL_FACE[_apply_matrix(matrix, normal)]
+            for face, normal in FACE_NORMALS.items()
+        }
+        self.inverse_face_map = {new: old for old, new in self.face_map.items()}
+        self.color_table = str.maketrans(self.face_map)
+        det = (
+            matrix[0][0] * (matrix[1][1] * matrix[2][2] - matrix[1][2] * matrix[2][1])
+            - matrix[0][1] * (matrix[1][0] * matrix[2][2] - matrix[1][2] * matrix[2][0])
+            + matrix[0][2] * (matrix[1][0] * matrix[2][1] - matrix[1][1] * matrix[2][0])
+        )
+        self.is_reflection = det < 0
+
+    def apply(self, facelets: str) -> str:
+        return "".join([facelets[i] for i in self.gather]).translate(self.color_table)
+
+
+def _all_symmetries() -> List[Symmetry]:
+    symmetries = []
+    for perm in permutations(range(3)):
+        for signs in product((1, -1), repeat=3):
+            matrix = [[0] * 3 for _ in range(3)]
+            for row in range(3):
+                matrix[row][perm[row]] = signs[row]
+            symmetries.append(Symmetry(matrix))
+    # Identity luôn là index 0
+    symmetries.sort(key=lambda s: s.gather != list(range(54)))
+    return symmetries
+
+
+SYMMETRIES = _all_symmetries()
+IDENTITY = 0
+
+
+def apply_symmetry(facelets: str, sym: int) -> str:
+    return SYMMETRIES[sym].apply(facelets)
+
+
+def canonicalize(facelets: str) -> Tuple[str, int]:
+    """
+    Trả về (canonical_facelets, sym) với canonical_facelets = apply_symmetry(facelets, sym)
+    là dạng nhỏ nhất trong 48 symmetries
+    """
+    best = facelets
+    best_sym = IDENTITY
+    for sym in range(1, len(SYMMETRIES)):
+        candidate = SYMMETRIES[sym].apply(facelets)
+        if candidate < best:
+            best = candidate
+            best_sym = sym
+    return best, best_sym
+
+
+def _invert_suffix(suffix: str) -> str:
+    if suffix == "'":
+        return ""
+    if suffix == "":
+        return "'"
+    return suffix
+
+
+def moves_to_canonical(moves: List[str], sym: int) -> List[str]:
+    """Map moves từ hướng gốc sang hướng đã áp dụng symmetry sym"""
+    symmetry = SYMMETRIES[sym]
+    return [
+        symmetry.face_map[m[0]] + (_invert_suffix(m[1:]) if symmetry.is_reflection else m[1:])
+        for m in moves
+    ]
+
+
+def moves_from_canonical(moves: List[str], sym: int) -> List[str]:
+    """Map moves (vd: solution của dạng canonical) về hướng gốc của caller"""
+    symmetry = SYMMETRIES[sym]
+    return [
+        symmetry.inverse_face_map[m[0]] + (_invert_suffix(m[1:]) if symmetry.is_reflection else m[1:])
+        for m in moves
+    ]
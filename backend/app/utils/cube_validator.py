@@ -0,0 +1,44 @@
+from collections import Counter
+from typing import Optional
+from app.utils.cubie_cube import (
+    CENTER_FACELETS, FACES, CubeStateError, CubieCube
+)
+
+
+def check_cube_state(cube_state: str) -> Optional[str]:
+    """
+    Kiểm tra cấu trúc cube state (Kociemba format) mà không cần solve
+
+    Trả về None nếu cube giải được, ngược lại trả về lý do cụ thể:
+    độ dài/ký tự sai, center trùng, sai số sticker, corner/edge không tồn tại
+    hoặc bị trùng, "twisted corner", "flipped edge", "parity error".
+    """
+    if len(cube_state) != 54:
+        return f"expected 54 characters, got {len(cube_state)}"
+
+    invalid_chars = set(cube_state) - set(FACES)
+    if invalid_chars:
+        return f"invalid characters {invalid_chars}, only U, R, F, D, L, B are allowed"
+
+    centers = [cube_state[i] for i in CENTER_FACELETS]
+    if len(set(centers)) != 6:
+        return "duplicate center colors"
+    for face, center in zip(FACES, centers):
+        if face != center:
+            return f"center of face {face} must be {face}, got {center}"
+
+    counts = Counter(cube_state)
+    for face in FACES:
+        if counts[face] != 9:
+            return f"color {face} has {counts[face]} stickers (expected 9)"
+
+    try:
+        cube = CubieCube.from_facelets(cube_state)
+        cube.verify()
+    except CubeStateError as e:
+        return e.reason
+    return None
+
+
+def is_solvable(cube_state: str) -> bool:
+    return check_cube_state(cube_state) is None
@@ -0,0 +1,254 @@
+"""
+Cubie-level model của Rubik's Cube (theo quy ước của Kociemba)
+
+Facelet string: 54 ký tự theo thứ tự face U, R, F, D, L, B,
+mỗi face 9 sticker đọc từ trái sang phải, trên xuống dưới:
+
+             |U1 U2 U3|
+             |U4 U5 U6|
+             |U7 U8 U9|
+    |L1 L2 L3|F1 F2 F3|R1 R2 R3|B1 B2 B3|
+    |L4 L5 L6|F4 F5 F6|R4 R5 R6|B4 B5 B6|
+    |L7 L8 L9|F7 F8 F9|R7 R8 R9|B7 B8 B9|
+             |D1 D2 D3|
+             |D4 D5 D6|
+             |D7 D8 D9|
+
+CubieCube lưu corner permutation/orientation (cp, co) và
+edge permutation/orientation (ep, eo): cp[i] là corner đang nằm ở vị trí i.
+"""
+import random
+from typing import List, Optional
+
+FACES = "URFDLB"
+CENTER_FACELETS = [4, 13, 22, 31, 40, 49]
+SOLVED_FACELETS = "".join(face * 9 for face in FACES)
+
+# Corners: URF, UFL, ULB, UBR, DFR, DLF, DBL, DRB
+CORNER_NAMES = ["URF", "UFL", "ULB", "UBR", "DFR", "DLF", "DBL", "DRB"]
+CORNER_FACELETS = [
+    [8, 9, 20], [6, 18, 38], [0, 36, 47], [2, 45, 11],
+    [29, 26, 15], [27, 44, 24], [33, 53, 42], [35, 17, 51],
+]
+CORNER_COLORS = [
+    "URF", "UFL", "ULB", "UBR", "DFR", "DLF", "DBL", "DRB",
+]
+
+# Edges: UR, UF, UL, UB, DR, DF, DL, DB, FR, FL, BL, BR
+EDGE_NAMES = ["UR", "UF", "UL", "UB", "DR", "DF", "DL", "DB", "FR", "FL", "BL", "BR"]
+EDGE_FACELETS = [
+    [5, 10], [7, 19], [3, 37], [1, 46], [32, 16], [28, 25],
+    [30, 43], [34, 52], [23, 12], [21, 41], [50, 39], [48, 14],
+]
+EDGE_COLORS = EDGE_NAMES
+
+
+class CubeStateError(ValueError):
+    """Cube state không hợp lệ, reason là lý do cụ thể (vd: 'twisted corner')"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def permutation_parity(perm: List[int]) -> int:
+    """0 nếu permutation chẵn, 1 nếu lẻ"""
+    parity = 0
+    seen = [False] * len(perm)
+    for start in range(len(perm)):
+        if seen[start]:
+            continue
+        length = 0
+        i = start
+        while not seen[i]:
+            seen[i] = True
+            i = perm[i]
+            length += 1
+        parity ^= (length - 1) & 1
+    return parity
+
+
+class CubieCube:
+    """Cube ở mức cubie: 8 corners + 12 edges"""
+
+    __slots__ = ("cp", "co", "ep", "eo")
+
+    def __init__(
+        self,
+        cp: Optional[List[int]] = None,
+        co: Optional[List[int]] = None,
+        ep: Optional[List[int]] = None,
+        eo: Optional[List[int]] = None,
+    ):
+        self.cp = list(cp) if cp is not None else list(range(8))
+        self.co = list(co) if co is not None else [0] * 8
+        self.ep = list(ep) if ep is not None else list(range(12))
+        self.eo = list(eo) if eo is not None else [0] * 12
+
+    @classmethod
+    def random(cls, rng: Optional[random.Random] = None) -> "CubieCube":
+        """Cube ngẫu nhiên phân phối đều trên tất cả các state giải được"""
+        rng = rng or random
+        cp = list(range(8))
+        ep = list(range(12))
+        rng.shuffle(cp)
+        rng.shuffle(ep)
+        if permutation_parity(cp) != permutation_parity(ep):
+            ep[0], ep[1] = ep[1], ep[0]
+        co = [rng.randrange(3) for _ in range(7)]
+        co.append(-sum(co) % 3)
+        eo = [rng.randrange(2) for _ in range(11)]
+        eo.append(sum(eo) % 2)
+        return cls(cp, co, ep, eo)
+
+    @classmethod
+    def from_facelets(cls, facelets: str) -> "CubieCube":
+        """
+        Chuyển facelet string sang cubies
+
+        Raise CubeStateError nếu có sticker không tạo thành corner/edge hợp lệ.
+        Không kiểm tra orientation sum và parity (xem verify()).
+        """
+        cube = cls()
+        for i, positions in enumerate(CORNER_FACELETS):
+            for ori in range(3):
+                if facelets[positions[ori]] in "UD":
+                    break
+            else:
+                raise CubeStateError(f"invalid corner at {CORNER_NAMES[i]}")
+            col1 = facelets[positions[(ori + 1) % 3]]
+            col2 = facelets[positions[(ori + 2) % 3]]
+            for j, colors in enumerate(CORNER_COLORS):
+                if col1 == colors[1] and col2 == colors[2]:
+                    cube.cp[i] = j
+                    cube.co[i] = ori
+                    break
+            else:
+                raise CubeStateError(f"invalid corner at {CORNER_NAMES[i]}")
+
+        for i, positions in enumerate(EDGE_FACELETS):
+            col0 = facelets[positions[0]]
+            col1 = facelets[positions[1]]
+            for j, colors in enumerate(EDGE_COLORS):
+                if col0 == colors[0] and col1 == colors[1]:
+                    cube.ep[i] = j
+                    cube.eo[i] = 0
+                    break
+                if col0 == colors[1] and col1 == colors[0]:
+                    cube.ep[i] = j
+                    cube.eo[i] = 1
+                    break
+            else:
+                raise CubeStateError(f"invalid edge at {EDGE_NAMES[i]}")
+        return cube
+
+    def to_facelets(self) -> str:
+        facelets = list(SOLVED_FACELETS)
+        for i, positions in enumerate(CORNER_FACELETS):
+            colors = CORNER_COLORS[self.cp[i]]
+            ori = self.co[i]
+            for n in range(3):
+                facelets[positions[(n + ori) % 3]] = colors[n]
+        for i, positions in enumerate(EDGE_FACELETS):
+            colors = EDGE_COLORS[self.ep[i]]
+            ori = self.eo[i]
+            for n in range(2):
+                facelets[positions[(n + ori) % 2]] = colors[n]
+        return "".join(facelets)
+
+    def copy(self) -> "CubieCube":
+        return CubieCube(self.cp, self.co, self.ep, self.eo)
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, CubieCube)
+            and self.cp == other.cp and self.co == other.co
+            and self.ep == other.ep and self.eo == other.eo
+        )
+
+    def __hash__(self) -> int:
+        return hash((tuple(self.cp), tuple(self.co), tuple(self.ep), tuple(self.eo)))
+
+    def corner_parity(self) -> int:
+        return permutation_parity(self.cp)
+
+    def edge_parity(self) -> int:
+        return permutation_parity(self.ep)
+
+    def verify(self):
+        """Raise CubeStateError nếu cube không giải được"""
+        if sorted(self.cp) != list(range(8)):
+            raise CubeStateError("duplicate corner")
+        if sorted(self.ep) != list(range(12)):
+            raise CubeStateError("duplicate edge")
+        if sum(self.co) % 3 != 0:
+            raise CubeStateError("twisted corner")
+        if sum(self.eo) % 2 != 0:
+            raise CubeStateError("flipped edge")
+        if self.corner_parity() != self.edge_parity():
+            raise CubeStateError("parity error")
+
+    def is_solved(self) -> bool:
+        return self == CubieCube()
+
+    def multiply(self, other: "CubieCube"):
+        """self = self * other (áp dụng other sau self, vd: other là một move)"""
+        cp = self.cp
+        co = self.co
+        ep = self.ep
+        eo = self.eo
+        self.cp = [cp[i] for i in other.cp]
+        self.co = [(co[i] + o) % 3 for i, o in zip(other.cp, other.co)]
+        self.ep = [ep[i] for i in other.ep]
+        self.eo = [(eo[i] + o) % 2 for i, o in zip(other.ep, other.eo)]
+
+    def apply_moves(self, moves: List[str]) -> "CubieCube":
+        """Áp dụng danh sách moves (vd: ["R", "U'", "F2"]) lên cube, trả về self"""
+        for move in moves:
+            self.multiply(MOVE_CUBES[MOVE_INDEX[move]])
+        return self
+
+
+# Các move cơ bản (quay 90° theo chiều kim đồng hồ) ở mức cubie
+_BASIC_MOVES = {
+    "U": CubieCube(
+        cp=[3, 0, 1, 2, 4, 5, 6, 7], co=[0] * 8,
+        ep=[3, 0, 1, 2, 4, 5, 6, 7, 8, 9, 10, 11], eo=[0] * 12,
+    ),
+    "R": CubieCube(
+        cp=[4, 1, 2, 0, 7, 5, 6, 3], co=[2, 0, 0, 1, 1, 0, 0, 2],
+        ep=[8, 1, 2, 3, 11, 5, 6, 7, 4, 9, 10, 0], eo=[0] * 12,
+    ),
+    "F": CubieCube(
+        cp=[1, 5, 2, 3, 0, 4, 6, 7], co=[1, 2, 0, 0, 2, 1, 0, 0],
+        ep=[0, 9, 2, 3, 4, 8, 6, 7, 1, 5, 10, 11], eo=[0, 1, 0, 0, 0, 1, 0, 0, 1, 1, 0, 0],
+    ),
+    "D": CubieCube(
+        cp=[0, 1, 2, 3, 5, 6, 7, 4], co=[0] * 8,
+        ep=[0, 1, 2, 3, 5, 6, 7, 4, 8, 9, 10, 11], eo=[0] * 12,
+    ),
+    "L": CubieCube(
+        cp=[0, 2, 6, 3, 4, 1, 5, 7], co=[0, 1, 2, 0, 0, 2, 1, 0],
+        ep=[0, 1, 10, 3, 4, 5, 9, 7, 8, 2, 6, 11], eo=[0] * 12,
+    ),
+    "B": CubieCube(
+        cp=[0, 1, 3, 7, 4, 5, 2, 6], co=[0, 0, 1, 2, 0, 0, 2, 1],
+        ep=[0, 1, 2, 11, 4, 5, 6, 10, 8, 9, 3, 7], eo=[0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 1, 1],
+    ),
+}
+
+
+def _build_move_cubes() -> List[CubieCube]:
+    cubes = []
+    for face in FACES:
+        cube = CubieCube()
+        for _ in range(3):
+            cube.multiply(_BASIC_MOVES[face])
+            cubes.append(cube.copy())
+    return cubes
+
+
+# 18 moves theo thứ tự face*3 + (power-1): U, U2, U', R, R2, R', ...
+MOVE_NAMES = [face + suffix for face in FACES for suffix in ("", "2", "'")]
+MOVE_INDEX = {name: i for i, name in enumerate(MOVE_NAMES)}
+MOVE_CUBES = _build_move_cubes()
@@ -5,11 +5,13 @@ from app.database import get_db
 from app.models.user import User
 from app.utils.security import decode_access_token
 from app.utils.permissions import PermissionChecker
+from typing import Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
 async def get_current_user(
@@ -74,6 +76,16 @@ async def get_current_user(
     }
 
 
+async def get_optional_user(
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+        db: Session = Depends(get_db)
+) -> Optional[dict]:
+    """Như get_current_user nhưng trả về None nếu request không gửi token"""
+    if credentials is None:
+        return None
+    return await get_current_user(credentials, db)
+
+
 async def get_admin_user(
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -0,0 +1,61 @@
+"""
+Rút gọn move sequence và tính độ dài theo các metric chuẩn
+
+simplify_moves() gộp/triệt tiêu các move liên tiếp trên cùng một trục:
+hai face đối diện (U/D, R/L, F/B) giao hoán với nhau nên "R L R'" -> "L",
+"U U U" -> "U'", "R R'" -> "". Kết quả là dạng chuẩn: không có hai move
+cùng face đứng cạnh nhau, face đối diện luôn theo thứ tự U-D, R-L, F-B.
+
+Metrics:
+- HTM (half turn metric): mỗi move tính 1
+- QTM (quarter turn metric): move 180° tính 2
+- STM (slice turn metric): slice move tính 1; notation hiện tại chỉ có
+  face moves nên STM bằng HTM
+"""
+from typing import Dict, List, Sequence, Union
+from app.utils.cube_moves import parse_moves
+
+Moves = Union[str, Sequence[str]]
+
+# Thứ tự face trong mỗi trục (cùng quy ước với two-phase solver)
+AXES = ("UD", "RL", "FB")
+_AXIS_OF = {face: axis for axis, faces in enumerate(AXES) for face in faces}
+_AMOUNT = {"": 1, "2": 2, "'": 3}
+_SUFFIX = {1: "", 2: "2", 3: "'"}
+
+
+def simplify_moves(moves: Moves) -> List[str]:
+    """
+    Dạng rút gọn của sequence (cùng tác dụng lên cube)
+
+    Raise ValueError nếu có move không hợp lệ.
+    """
+    # Mỗi block: [axis, {face: số quarter turns mod 4}] - các block liền kề khác trục
+    blocks: List[list] = []
+    for move in parse_moves(moves):
+        face = move[0]
+        axis = _AXIS_OF[face]
+        if blocks and blocks[-1][0] == axis:
+            turns = blocks[-1][1]
+            turns[face] = (turns.get(face, 0) + _AMOUNT[move[1:]]) % 4
+            if not any(turns.values()):
+                # Block triệt tiêu hết: block trước đó có thể gộp với move tiếp theo
+                blocks.pop()
+        else:
+            blocks.append([axis, {face: _AMOUNT[move[1:]]}])
+
+    result = []
+    for axis, turns in blocks:
+        for face in AXES[axis]:
+            amount = turns.get(face, 0)
+            if amount:
+                result.append(face + _SUFFIX[amount])
+    return result
+
+
+def move_metrics(moves: Moves) -> Dict[str, int]:
+    """Độ dài sequence theo HTM, QTM, STM (không rút gọn trước)"""
+    parsed = parse_moves(moves)
+    htm = len(parsed)
+    qtm = sum(2 if move.endswith("2") else 1 for move in parsed)
+    return {"htm": htm, "qtm": qtm, "stm": htm}
@@ -1,12 +1,39 @@
 import random
+from typing import Callable, Optional
+from app.utils.cube_moves import invert_moves
+from app.utils.cubie_cube import CubieCube
 
 # WCA scramble notation moves
 MOVES = ['R', 'L', 'U', 'D', 'F', 'B']
 PRIME = "'"
 DOUBLE = "2"
 
-def generate_scramble(length: int = 3) -> str:
-    """Generate a random WCA-compliant scramble"""
+# WCA: state của scramble không được giải được trong ít hơn 2 moves
+MIN_SOLUTION_LENGTH = 2
+
+
+def generate_scramble(solve: Callable[[str], str], rng: Optional[random.Random] = None) -> str:
+    """
+    Generate a WCA-style random-state scramble
+
+    Chọn state ngẫu nhiên phân phối đều trên tất cả state giải được, giải nó
+    bằng solve (vd: kociemba.solve) và đảo ngược solution. solve là blocking
+    call nên chỉ gọi trong solver worker (xem app.services.scramble_pool).
+    """
+    rng = rng or random.SystemRandom()
+    while True:
+        cube = CubieCube.random(rng)
+        solution = solve(cube.to_facelets())
+        if len(solution.split()) >= MIN_SOLUTION_LENGTH:
+            return ' '.join(invert_moves(solution))
+
+
+def generate_random_move_scramble(length: int = 25) -> str:
+    """
+    Generate a random-move scramble (không cần solver)
+
+    Chỉ dùng khi pool random-state scrambles rỗng hoặc không có solver.
+    """
     scramble = []
     last_move = None
     
@@ -23,4 +50,3 @@ def generate_scramble(length: int = 3) -> str:
         last_move = move
     
     return ' '.join(scramble)
-
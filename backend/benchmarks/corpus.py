@@ -0,0 +1,55 @@
+"""
+Corpus cube states ngẫu nhiên (random-state, có seed) cho benchmark solver
+
+    python -m benchmarks.corpus --size 200 --seed 42 --out corpus.json
+"""
+import argparse
+import hashlib
+import json
+import random
+from typing import List
+from app.utils.cube_symmetry import SYMMETRIES, apply_symmetry
+from app.utils.cubie_cube import CubieCube
+
+
+def generate_corpus(size: int, seed: int, symmetric_fraction: float = 0.0) -> List[str]:
+    """
+    size cube states phân phối đều, tái lập được với cùng seed
+
+    symmetric_fraction: tỉ lệ state là bản xoay/phản chiếu của một state
+    trước đó trong corpus (giống user scan cùng cube theo hướng khác),
+    dùng để đo hiệu quả của cache theo symmetry.
+    """
+    rng = random.Random(seed)
+    states: List[str] = []
+    for _ in range(size):
+        if states and rng.random() < symmetric_fraction:
+            base = rng.choice(states)
+            states.append(apply_symmetry(base, rng.randrange(1, len(SYMMETRIES))))
+        else:
+            states.append(CubieCube.random(rng).to_facelets())
+    return states
+
+
+def corpus_digest(states: List[str]) -> str:
+    return hashlib.sha256("\n".join(states).encode()).hexdigest()[:16]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a seeded random-state cube corpus")
+    parser.add_argument("--size", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--symmetric-fraction", type=float, default=0.0)
+    parser.add_argument("--out", default="corpus.json")
+    args = parser.parse_args()
+
+    states = generate_corpus(args.size, args.seed, args.symmetric_fraction)
+    with open(args.out, "w") as f:
+        json.dump({
+            "seed": args.seed,
+            "size": args.size,
+            "symmetric_fraction": args.symmetric_fraction,
+            "digest": corpus_digest(states),
+            "states": states,
+        }, f, indent=2)
+    print(f"Wrote {len(states)} states to {args.out}")
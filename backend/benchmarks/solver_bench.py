@@ -0,0 +1,231 @@
+"""
+Benchmark solver: latency (p50/p95/p99), throughput ở concurrency 1, N, 2N
+(N = số solver workers), hiệu quả cache và phân bố số moves
+
+    cd backend
+    python -m benchmarks.solver_bench --size 200 --seed 42 --out bench.json
+    python -m benchmarks.solver_bench --modes asgi --compare bench.json
+
+Modes:
+- inprocess: gọi thẳng solver_executor (process pool, không cache, không HTTP)
+- asgi: POST /api/rubik/solve qua ASGI app (validate + canonicalize + cache),
+  cần httpx
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# Benchmark không cần JWT; cho phép chạy mà không có .env
+os.environ.setdefault("SECRET_KEY", "benchmark-only-secret")
+
+from benchmarks.corpus import corpus_digest, generate_corpus
+from app.services.solution_cache import solution_cache
+from app.services.solver_executor import SOLVER_NAME, solver_executor
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+def summarize(latencies: List[float], move_counts: List[int], errors: int, wall: float) -> dict:
+    ms = [latency * 1000 for latency in latencies]
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "throughput_per_s": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(ms, 50), 2),
+            "p95": round(percentile(ms, 95), 2),
+            "p99": round(percentile(ms, 99), 2),
+            "mean": round(sum(ms) / len(ms), 2) if ms else 0.0,
+            "max": round(max(ms), 2) if ms else 0.0,
+        },
+        "move_count": {
+            "min": min(move_counts) if move_counts else None,
+            "max": max(move_counts) if move_counts else None,
+            "mean": round(sum(move_counts) / len(move_counts), 2) if move_counts else None,
+            "histogram": dict(sorted(Counter(move_counts).items())),
+        },
+    }
+
+
+async def run_level(
+    states: List[str],
+    concurrency: int,
+    solve_one: Callable[[str], Awaitable[Optional[int]]],
+) -> dict:
+    """Chạy toàn bộ corpus với tối đa concurrency requests đồng thời"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    move_counts: List[int] = []
+    errors = 0
+
+    async def one(state: str):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                move_count = await solve_one(state)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - started)
+            if move_count is not None:
+                move_counts.append(move_count)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(state) for state in states))
+    return summarize(latencies, move_counts, errors, time.perf_counter() - started)
+
+
+async def bench_inprocess(states: List[str], levels: List[int]) -> List[dict]:
+    async def solve_one(state: str) -> int:
+        solution = await solver_executor.solve(state)
+        return len(solution.split())
+
+    results = []
+    for concurrency in levels:
+        result = await run_level(states, concurrency, solve_one)
+        results.append({"mode": "inprocess", "concurrency": concurrency, **result})
+    return results
+
+
+async def bench_asgi(states: List[str], levels: List[int]) -> List[dict]:
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def solve_one(state: str) -> int:
+            response = await client.post("/api/rubik/solve", json={"cube_state": state})
+            response.raise_for_status()
+            return response.json()["move_count"]
+
+        results = []
+        for concurrency in levels:
+            # Mỗi level bắt đầu với cache rỗng (cold), sau đó chạy lại corpus (warm)
+            for phase in ("cold", "warm"):
+                if phase == "cold":
+                    solution_cache.clear()
+                before = solution_cache.stats()
+                result = await run_level(states, concurrency, solve_one)
+                after = solution_cache.stats()
+                hits = after["hits"] - before["hits"]
+                misses = after["misses"] - before["misses"]
+                result["cache"] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                }
+                results.append({"mode": "asgi", "cache_phase": phase, "concurrency": concurrency, **result})
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def _result_key(result: dict) -> str:
+    return f"{result['mode']}/{result.get('cache_phase', '-')}/c{result['concurrency']}"
+
+
+def print_results(results: List[dict], baseline: Optional[Dict[str, dict]] = None):
+    print(f"{'run':<22}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'moves':>8}{'err':>6}")
+    for result in results:
+        key = _result_key(result)
+        latency = result["latency_ms"]
+        line = (
+            f"{key:<22}{latency['p50']:>10}{latency['p95']:>10}{latency['p99']:>10}"
+            f"{result['throughput_per_s']:>10}{str(result['move_count']['mean']):>8}{result['errors']:>6}"
+        )
+        if baseline and key in baseline:
+            old = baseline[key]
+            p50_delta = (latency["p50"] / old["latency_ms"]["p50"] - 1) * 100 if old["latency_ms"]["p50"] else 0
+            tput_delta = (result["throughput_per_s"] / old["throughput_per_s"] - 1) * 100 if old["throughput_per_s"] else 0
+            line += f"   p50 {p50_delta:+.1f}%  req/s {tput_delta:+.1f}%"
+        print(line)
+
+
+async def main_async(args) -> dict:
+    states = generate_corpus(args.size, args.seed, args.symmetric_fraction)
+    workers = solver_executor.max_workers
+    levels = sorted({1, workers, 2 * workers})
+
+    await solver_executor.warm_up()
+
+    results = []
+    if "inprocess" in args.modes:
+        results += await bench_inprocess(states, levels)
+    if "asgi" in args.modes:
+        results += await bench_asgi(states, levels)
+    solver_executor.shutdown()
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "solver": SOLVER_NAME,
+            "workers": workers,
+            "warmup_seconds": solver_executor.warmup_seconds,
+        },
+        "corpus": {
+            "seed": args.seed,
+            "size": args.size,
+            "symmetric_fraction": args.symmetric_fraction,
+            "digest": corpus_digest(states),
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Rubik solver path")
+    parser.add_argument("--size", type=int, default=200, help="Số cube states trong corpus")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--symmetric-fraction", type=float, default=0.2)
+    parser.add_argument("--modes", nargs="+", default=["inprocess", "asgi"], choices=["inprocess", "asgi"])
+    parser.add_argument("--out", default=None, help="Lưu kết quả ra file JSON")
+    parser.add_argument("--compare", default=None, help="File JSON của lần chạy trước để so sánh")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if previous["corpus"]["digest"] != report["corpus"]["digest"]:
+            print("WARNING: corpus khác với lần chạy được so sánh")
+        baseline = {_result_key(result): result for result in previous["results"]}
+    print_results(report["results"], baseline)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
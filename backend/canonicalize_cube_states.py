@@ -0,0 +1,71 @@
+"""
+Script chuyển các cube_states cũ (lưu theo state gốc) sang dạng canonical
+Chạy một lần sau migration_add_solution_symmetry.sql
+Chạy: python canonicalize_cube_states.py
+
+Mỗi row chưa canonical được đổi thành row canonical (hoặc gộp vào row
+canonical đã có), các solutions trỏ tới nó được cập nhật symmetry và
+canonical_solution theo state gốc của chúng. Chạy lại nhiều lần không sao.
+"""
+
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.solution import CubeState, Solution
+from app.services.solution_service import canonical_state, state_hash
+from app.utils.cube_symmetry import moves_to_canonical
+
+
+def canonicalize_cube_states():
+    """Re-key cube_states theo canonical state và re-point solutions"""
+    print("=" * 60)
+    print("CANONICALIZE CUBE STATES")
+    print("=" * 60)
+
+    db: Session = SessionLocal()
+
+    try:
+        rekeyed = 0
+        merged = 0
+        solutions_updated = 0
+
+        for state_id, in db.query(CubeState.id).order_by(CubeState.id).all():
+            state = db.get(CubeState, state_id)
+            canonical, _ = canonical_state(state.cube_state)
+            key = state_hash(canonical)
+            if state.state_hash == key:
+                continue  # đã canonical (hoặc state không đúng dạng, giữ nguyên)
+
+            target = db.query(CubeState).filter(CubeState.state_hash == key).first()
+
+            # Symmetry tính lại từ state gốc của từng solution
+            for solution in db.query(Solution).filter(Solution.state_id == state.id).all():
+                _, sym = canonical_state(solution.cube_state)
+                solution.symmetry = sym
+                solution.canonical_solution = " ".join(moves_to_canonical(solution.solution.split(), sym))
+                if target is not None:
+                    solution.state_id = target.id
+                solutions_updated += 1
+
+            if target is None:
+                state.state_hash = key
+                state.cube_state = canonical
+                rekeyed += 1
+            else:
+                db.flush()
+                db.delete(state)
+                merged += 1
+            db.commit()
+
+        print(f"\n✓ Đổi sang canonical: {rekeyed} states")
+        print(f"✓ Gộp vào state canonical đã có: {merged} states")
+        print(f"✓ Cập nhật: {solutions_updated} solutions")
+    except Exception as e:
+        db.rollback()
+        print(f"\n✗ LỖI: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    canonicalize_cube_states()
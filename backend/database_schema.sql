@@ -50,9 +50,14 @@ CREATE TABLE IF NOT EXISTS matches (
     player1_id INT NOT NULL,
     player2_id INT NOT NULL,
     scramble TEXT NOT NULL,
+    scramble_state CHAR(54) DEFAULT NULL COMMENT 'Kociemba facelets after scramble',
     status ENUM('waiting', 'active', 'completed', 'cancelled') DEFAULT 'waiting',
     player1_time INT DEFAULT NULL COMMENT 'milliseconds',
     player2_time INT DEFAULT NULL COMMENT 'milliseconds',
+    player1_move_count INT DEFAULT NULL COMMENT 'verified by server replay',
+    player2_move_count INT DEFAULT NULL COMMENT 'verified by server replay',
+    player1_tps FLOAT DEFAULT NULL COMMENT 'turns per second',
+    player2_tps FLOAT DEFAULT NULL COMMENT 'turns per second',
     winner_id INT DEFAULT NULL,
     is_draw BOOLEAN DEFAULT FALSE,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
@@ -97,6 +102,44 @@ CREATE TABLE IF NOT EXISTS match_invitations (
     INDEX idx_invitee (invitee_id),
     INDEX idx_status (status)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Cube states table (dạng canonical, dùng chung giữa các solutions, tra theo sha256)
+CREATE TABLE IF NOT EXISTS cube_states (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    state_hash CHAR(64) UNIQUE NOT NULL,
+    cube_state TEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Solutions table (solution history của user)
+CREATE TABLE IF NOT EXISTS solutions (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    user_id INT NOT NULL,
+    state_id INT NOT NULL,
+    cube_state TEXT NOT NULL,
+    symmetry SMALLINT NOT NULL DEFAULT 0,
+    solution TEXT NOT NULL,
+    canonical_solution TEXT NOT NULL,
+    move_count INT NOT NULL,
+    notes TEXT DEFAULT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (state_id) REFERENCES cube_states(id),
+    INDEX idx_solutions_user_created (user_id, created_at, id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Color calibration profiles (centroids màu Lab học từ các scan đã xác nhận)
+CREATE TABLE IF NOT EXISTS color_profiles (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    user_id INT NOT NULL,
+    name VARCHAR(50) NOT NULL DEFAULT 'default',
+    centroids TEXT NOT NULL,
+    samples INT NOT NULL DEFAULT 0,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    UNIQUE KEY unique_color_profile (user_id, name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 -- Migration: Add ELO rating column to users table
 -- Run this SQL script to add elo_rating column to existing database
 
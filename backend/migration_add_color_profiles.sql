@@ -0,0 +1,14 @@
+-- Migration: Add color calibration profiles table
+
+-- Color calibration profiles (centroids màu Lab học từ các scan đã xác nhận)
+CREATE TABLE IF NOT EXISTS color_profiles (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    user_id INT NOT NULL,
+    name VARCHAR(50) NOT NULL DEFAULT 'default',
+    centroids TEXT NOT NULL,
+    samples INT NOT NULL DEFAULT 0,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    UNIQUE KEY unique_color_profile (user_id, name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,8 @@
+-- Migration: Add verified move count and TPS columns to matches table
+-- Chỉ được ghi khi player gửi kèm moves và server replay xác nhận cube đã solved
+
+ALTER TABLE matches
+ADD COLUMN player1_move_count INT DEFAULT NULL AFTER player2_time,
+ADD COLUMN player2_move_count INT DEFAULT NULL AFTER player1_move_count,
+ADD COLUMN player1_tps FLOAT DEFAULT NULL AFTER player2_move_count,
+ADD COLUMN player2_tps FLOAT DEFAULT NULL AFTER player1_tps;
@@ -0,0 +1,8 @@
+-- Migration: Add scramble_state column to matches table
+-- Cube state (Kociemba facelets, 54 ký tự) sau khi áp dụng scramble, tính sẵn khi tạo match
+
+ALTER TABLE matches
+ADD COLUMN scramble_state CHAR(54) DEFAULT NULL
+AFTER scramble;
+
+-- Matches cũ: scramble_state được tính lại khi cần (NULL = chưa tính)
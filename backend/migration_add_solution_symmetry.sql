@@ -0,0 +1,23 @@
+-- Migration: Key cube_states by the canonical state (under 48 cube symmetries)
+-- cube_states giờ lưu dạng canonical; mỗi solution giữ state gốc của user,
+-- symmetry (canonical = apply_symmetry(cube_state, symmetry)) và moves đã map
+-- sang hướng canonical
+
+ALTER TABLE solutions
+ADD COLUMN cube_state TEXT DEFAULT NULL AFTER state_id,
+ADD COLUMN symmetry SMALLINT NOT NULL DEFAULT 0 AFTER cube_state,
+ADD COLUMN canonical_solution TEXT DEFAULT NULL AFTER solution;
+
+-- Solutions cũ trỏ tới state gốc (chưa canonical): tạm thời symmetry = 0
+-- (identity), moves giữ nguyên. Sau migration chạy
+-- python canonicalize_cube_states.py để đổi các cube_states cũ sang canonical
+-- (gộp state trùng) và tính lại symmetry / canonical_solution.
+UPDATE solutions s
+JOIN cube_states c ON c.id = s.state_id
+SET s.cube_state = c.cube_state,
+    s.canonical_solution = s.solution
+WHERE s.cube_state IS NULL;
+
+ALTER TABLE solutions
+MODIFY COLUMN cube_state TEXT NOT NULL,
+MODIFY COLUMN canonical_solution TEXT NOT NULL;
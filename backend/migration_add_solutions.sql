@@ -0,0 +1,24 @@
+-- Migration: Add solution history tables
+-- Solution history trước đây chỉ lưu trong memory (mất khi restart), không có dữ liệu cần chuyển
+
+-- Cube states table (dùng chung giữa các solutions, tra theo sha256)
+CREATE TABLE IF NOT EXISTS cube_states (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    state_hash CHAR(64) UNIQUE NOT NULL,
+    cube_state TEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Solutions table (solution history của user)
+CREATE TABLE IF NOT EXISTS solutions (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    user_id INT NOT NULL,
+    state_id INT NOT NULL,
+    solution TEXT NOT NULL,
+    move_count INT NOT NULL,
+    notes TEXT DEFAULT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (state_id) REFERENCES cube_states(id),
+    INDEX idx_solutions_user_created (user_id, created_at, id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;